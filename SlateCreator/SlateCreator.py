@@ -1,11 +1,50 @@
 import os
 import re
+import copy
 import logging
 import subprocess
+import tempfile
 import json
 import platform
-import opentimelineio as otio
 from html2image import Html2Image
+from .batch import BatchScheduler
+from .template import template_cache
+from .probe import probe_command, parse_probe, is_movie, ProbeResult
+from .headers import read_header, HeaderError
+from .probe_cache import get_probe_cache
+from .render_cache import get_render_cache
+from .runner import AsyncRunner
+from .render_pool import RenderPool, devtools_pipe_available
+from .trace import default_tracer
+from .tools import tool_registry
+from . import color
+from . import raster
+from . import timecode as tc_utils
+from .sequence import frame_path, is_sequence, frame_range, first_frame
+from .prepend import (
+    streams_command,
+    parse_streams,
+    can_stream_copy,
+    segment_command,
+    reencode_command,
+    write_concat_list,
+    concat_command
+)
+from .burnin import (
+    BurninRenderer,
+    default_charsets,
+    field_marker,
+    burnin_command,
+    write_frames
+)
+from .thumbnail import (
+    measure_script,
+    thumbnail_selector,
+    box_widths,
+    thumbnail_key,
+    thumbnail_command,
+    spread_frames
+)
 
 
 class SlateCreator:
@@ -29,7 +68,10 @@ class SlateCreator:
         resources_path="",
         log=None,
         data={},
-        env={}
+        env={},
+        render_pool=None,
+        inline_resources=False,
+        tracer=None
     ):
         self.staging_dir = ""
         self.template_path = ""
@@ -37,27 +79,28 @@ class SlateCreator:
         self.log = None
         self.data = {}
         self.env = {}
+        self.render_pool = None
+        self.probe_cache = None
+        self.render_cache = None
+        self.runner = None
+        self.tracer = None
+        self.tool_registry = tool_registry
+        self._template = None
         self._template_string = ""
         self._template_string_computed = ""
         self._html_thumb_match_regex = re.compile(
             r"{thumbnail(.*?)}"
         )
-        self._html_optional_match_regex = re.compile(
-            r"{(.*?)_optional}"
-        )
-        self._html_path_match_regex = re.compile(
-            r"src=\"(.*?)\"|href=\"(.*?)\"|{(thumbnail.*?)}"
-        )
-        self._html_comment_open_regex = re.compile(
-            r"<!--(.*?)"
-        )
-        self._html_comment_close_regex = re.compile(
-            r"(.*?)-->"
-        )
         self.platform = platform.system().lower()
         self.exec_ext = ".exe" if self.platform == "windows" else ""
         self.slate_temp_name = "slate_staged"
         self.slate_temp_ext = ".png"
+        self.cache_subfolder = ".slate_cache"
+        self.thumbnail_ext = ".jpg"
+        self.convert_backend = "oiio"
+        self.render_backend = "browser"
+        self.numpy_colorspaces = ("srgb", "acescg")
+        self.inline_resources = inline_resources
         self.set_logger(logger=log)
         self.set_template_paths(
             template_path,
@@ -65,6 +108,8 @@ class SlateCreator:
         )
         self.set_data(data)
         self.set_env(env)
+        self.set_render_pool(render_pool)
+        self.set_tracer(tracer)
         self.set_staging_dir(
             staging_dir,
             subfolder=staging_subfolder
@@ -75,6 +120,22 @@ class SlateCreator:
         )
 
 
+    def clone(self, data=None):
+        """
+        Returns a new SlateCreator sharing template, paths,
+        logger and render pool with this one, without reading
+        the template again. Provided data gets merged on top
+        of a copy of the current data.
+        """
+
+        slate = copy.copy(self)
+        slate.data = self.data.copy()
+        slate.data.update(data or {})
+        slate._template_string_computed = ""
+
+        return slate
+
+
     def set_logger(self, logger=None):
         """
         Sets the logger for SlateCreator
@@ -161,9 +222,10 @@ class SlateCreator:
 
         self.data = data.copy()
 
-        self.log.debug(
-            "Data: '{}'".format(self.data)
-        )
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(
+                "Data: '{}'".format(self.data)
+            )
 
 
     def set_resolution(self, width, height):
@@ -180,17 +242,115 @@ class SlateCreator:
 
     def set_env(self, env={}):
         """
-        Sets custom environment for oiio if needed.
+        Sets custom environment for the tools if needed.
+        Values of existing keys get appended, PATH like,
+        unless already there, so calling it again with the
+        same env changes nothing. The env is never modified
+        in place, a changed one is a new dict, so clones
+        can share it.
         """
 
-        self.env = self.env if self.env else os.environ.copy()
+        current = self.env or os.environ.copy()
+        changes = {}
         for k, v in env.items():
-            if self.env[k]:
-                self.env[k] += os.pathsep + v
-            else:
-                self.env[k] = v
+            old = current.get(k)
+            if not old:
+                changes[k] = v
+                continue
+            parts = old.split(os.pathsep)
+            missing = [p for p in v.split(os.pathsep) if p not in parts]
+            if missing:
+                changes[k] = os.pathsep.join([old] + missing)
+
+        if not changes and self.env:
+            return
+        self.env = dict(current, **changes)
+
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("Env: '{}'".format(self.env))
+
+
+    def set_render_pool(self, render_pool=None):
+        """
+        Sets a RenderPool of warm browsers to render slates
+        with. If no pool is set every render starts its own
+        browser through Html2Image.
+        """
+
+        self.render_pool = render_pool
+
+        self.log.debug("Render pool: '{}'".format(self.render_pool))
+
+
+    def set_tracer(self, tracer=None):
+        """
+        Sets the Tracer timing templates, renders, probes,
+        conversions and tool calls. If none is set the process
+        wide default_tracer is used, which does nothing until
+        a sink is added to it.
+        """
 
-        self.log.debug("Env: '{}'".format(self.env))
+        self.tracer = tracer if tracer is not None else default_tracer
+
+        self.log.debug("Tracer: '{}'".format(self.tracer))
+
+
+    def set_probe_cache(self, probe_cache=None):
+        """
+        Sets the ProbeCache used by probe. If none is set
+        a cache gets created in the staging dir on first use.
+        """
+
+        self.probe_cache = probe_cache
+
+        self.log.debug("Probe cache: '{}'".format(self.probe_cache))
+
+
+    def get_probe_cache(self):
+        """
+        Returns the probe cache, creating the default one
+        in the staging dir if needed.
+        """
+
+        if self.probe_cache is None:
+            self.probe_cache = get_probe_cache(
+                os.path.join(
+                    self.staging_dir,
+                    self.cache_subfolder,
+                    "probe.sqlite3"
+                )
+            )
+
+        return self.probe_cache
+
+
+    def set_render_cache(self, render_cache=None):
+        """
+        Sets the RenderCache used by render_slate. If none is
+        set a cache gets created in the staging dir on first use.
+        """
+
+        self.render_cache = render_cache
+
+        self.log.debug("Render cache: '{}'".format(self.render_cache))
+
+
+    def get_render_cache(self):
+        """
+        Returns the render cache, creating the default one
+        in the staging dir if needed.
+        """
+
+        if self.render_cache is None:
+            self.render_cache = get_render_cache(
+                os.path.join(
+                    self.staging_dir,
+                    self.cache_subfolder,
+                    "renders"
+                )
+            )
+
+        return self.render_cache
 
 
     def set_staging_dir(self, path, subfolder=""):
@@ -226,7 +386,11 @@ class SlateCreator:
         Reads template from file and normalizes/absolutizes
         any relative paths in html. The paths gets expanded with
         the resources directory as base. Stores template in an
-        internal var for further use.
+        internal var for further use. Compiled templates are
+        cached process wide and only read again if the file
+        changes on disk. With inline_resources the css, fonts
+        and images of the template are embedded in it once, so
+        renders don't read them from disk again.
         """
 
         if template_path:
@@ -239,65 +403,24 @@ class SlateCreator:
         if not self.template_res_path:
             raise ValueError("Please Specify a resources path!")
 
-        with open(self.template_path, 'r') as t:
-            template = t.readlines()
-
-        template_computed = []
-        html_comment_open = False
-        
-        for line in template:
-            
-            if self._html_comment_open_regex.search(line) is not None:
-                html_comment_open = True
-            
-            if self._html_comment_close_regex.search(line) is not None:
-                html_comment_open = False
-                continue
-            
-            if html_comment_open:
-                continue
-            
-            search = self._html_path_match_regex.search(line)
-            
-            if search is not None:
-                
-                path_tuple = self._html_path_match_regex.findall(line)[0]
-                path = ""
-                
-                for element in path_tuple:
-                    if element:
-                        path = element
-                        break
-                
-                if not path.find("{"):
-                    template_computed.append(line)
-                    continue
+        with self.tracer.span(
+            "read_template",
+            template=self.template_path
+        ) as span:
+            compiled, hit = template_cache.lookup(
+                self.template_path,
+                self.template_res_path,
+                inline=self.inline_resources
+            )
+            span.set(cache="template", hit=hit)
+            self.tracer.event("cache", cache="template", hit=hit)
+        template = compiled.string
 
-                base, file = os.path.split(path)
-                
-                if self.template_res_path:
-                    path_computed = os.path.normpath(
-                        os.path.join(
-                            self.template_res_path,
-                            file
-                        )
-                    )
-                else:
-                    path_computed = os.path.normpath(
-                        file
-                    )
-                
-                template_computed.append(
-                    line.replace(path, path_computed)
-                )
-            else:
-                template_computed.append(line)
-        
-        template = "".join(template_computed)
-        
+        self._template = compiled
         self._template_string = template
-        
-        self.log.debug("Template string: '{}'".format(template))
+
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("Template string: '{}'".format(template))
 
 
     def compute_template(
@@ -306,13 +429,16 @@ class SlateCreator:
     ):
         """
         Computes template by substituting template strings.
-        Needs keys to be at the root of data dict, no support
-        for nested dicts for now, just for lists.
+        Nested lookups like {project[name]} are supported, the
+        template is formatted with its precompiled chunks and
+        data is left untouched.
         Keys in template with "_optional" are substituted
         with "display:None" in the style property, this
         enables to hide selectively any block if any
         corresponding key is empty.
         example: {scope} -> {scope_optional} 
+        Relative paths in {thumbnail*} keys are expanded
+        with the resources path.
         """
 
         if not self._template_string:
@@ -321,26 +447,16 @@ class SlateCreator:
                 "reread template or check source file."
             )
         
-        if process_optionals:
-            
-            hidden_string = "style=\"display:None;\""
-
-            optional_matches = self._html_optional_match_regex.findall(
-                self._template_string
-            )
-
-            for m in optional_matches:
-                self.data["{}_optional".format(m)] = ""
-                if not self.data[m]:
-                    self.data["{}_optional".format(m)] = hidden_string
-        
         try:
-            self._template_string_computed = self._template_string.format_map(
-                self.data
-            )
-            self.log.debug("Computed Template string: '{}'".format(
-                self._template_string_computed
-            ))
+            with self.tracer.span("compute_template"):
+                self._template_string_computed = self._template.render(
+                    self.data,
+                    process_optionals=process_optionals
+                )
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug("Computed Template string: '{}'".format(
+                    self._template_string_computed
+                ))
         except KeyError as err:
             msg = "Missing {} Key in instance data. ".format(err)
             msg += "Template formatting cannot be completed successfully!"
@@ -353,13 +469,23 @@ class SlateCreator:
         self,
         slate_path="",
         slate_specifier="",
-        resolution=()
+        resolution=(),
+        compute=True,
+        use_cache=True
     ):
         """
         Renders out the slate. Templates are rendered using
         Screen color space, usually Rec.709 or sRGB. Any
         HTML that needs to respect color needs to take that
-        into account.
+        into account. If a render pool is set the slate is
+        rendered by one of its warm browsers. Set compute
+        to False to render the already computed template.
+        Slates whose html, resolution and referenced files
+        didn't change are taken from the render cache without
+        starting a browser, unless use_cache is False.
+        With render_backend "raster", or "auto" and a layout
+        next to the template, the slate is drawn from the
+        layout without a browser instead, see get_layout.
         """
         if not slate_path:
             slate_name = "{}{}{}".format(
@@ -373,6 +499,260 @@ class SlateCreator:
                 self.set_staging_dir(d)
             slate_name = f
 
+        resolution = self._slate_resolution(resolution)
+        layout = self._raster_layout()
+
+        if compute and layout is None:
+            self.compute_template()
+
+        with self.tracer.span(
+            "render_slate",
+            slate=slate_name,
+            resolution="{}x{}".format(*resolution),
+            backend="browser" if layout is None else "raster"
+        ) as span:
+            slate_output = os.path.join(self.staging_dir, slate_name)
+            if layout is not None:
+                return self._render_slate_raster(
+                    layout,
+                    slate_output,
+                    resolution,
+                    span,
+                    use_cache=use_cache
+                )
+
+            cache = self.get_render_cache() if use_cache else None
+            if cache is not None:
+                cache_key = cache.key(
+                    self._template_string_computed,
+                    resolution,
+                    self.slate_temp_ext
+                )
+                hit = cache.fetch(cache_key, slate_output)
+                span.set(cache="render", hit=hit)
+                self.tracer.event("cache", cache="render", hit=hit)
+                if hit:
+                    self.log.debug("{}: render cache hit".format(slate_name))
+                    return [slate_output]
+
+            # never write through a hardlink into the render cache
+            if os.path.lexists(slate_output):
+                os.remove(slate_output)
+
+            if self.render_pool is not None:
+                slate_rendered_path = [
+                    self.render_pool.screenshot(
+                        self._template_string_computed,
+                        slate_output,
+                        resolution
+                    )
+                ]
+            else:
+                htimg = Html2Image(output_path=self.staging_dir)
+
+                slate_rendered_path = htimg.screenshot(
+                    html_str=self._template_string_computed,
+                    save_as=slate_name,
+                    size=resolution
+                )
+
+            if cache is not None:
+                cache.store(cache_key, slate_rendered_path[0])
+
+            return slate_rendered_path
+
+
+    def _render_slate_raster(
+        self,
+        layout,
+        slate_output,
+        resolution,
+        span,
+        use_cache=True
+    ):
+        ops = self._resolve_layout(layout, resolution)
+
+        cache = self.get_render_cache() if use_cache else None
+        if cache is not None:
+            cache_key = cache.key(
+                raster.ops_key(ops),
+                resolution,
+                self.slate_temp_ext,
+                resources=raster.ops_resources(ops)
+            )
+            hit = cache.fetch(cache_key, slate_output)
+            span.set(cache="render", hit=hit)
+            self.tracer.event("cache", cache="render", hit=hit)
+            if hit:
+                self.log.debug("{}: render cache hit".format(
+                    os.path.basename(slate_output)
+                ))
+                return [slate_output]
+
+        if os.path.lexists(slate_output):
+            os.remove(slate_output)
+
+        with open(slate_output, "wb") as f:
+            f.write(raster.png_bytes(raster.rasterize(ops, resolution)))
+
+        if cache is not None:
+            cache.store(cache_key, slate_output)
+
+        return [slate_output]
+
+
+    def get_layout(self):
+        """
+        Returns the raster Layout of the template, read from
+        the .layout.json file next to it, None if missing.
+        example: generic_slate.html -> generic_slate.layout.json
+        """
+
+        path = raster.layout_path(self.template_path)
+        if not os.path.isfile(path):
+            return None
+
+        return raster.layout_cache.get(path, self.template_res_path)
+
+
+    def _raster_layout(self):
+        """
+        Returns the Layout to draw slates with, None when
+        they render in a browser. render_backend is "browser",
+        "raster" or "auto", which uses the layout if the
+        template has one.
+        """
+
+        if self.render_backend == "browser":
+            return None
+        if self.render_backend not in ("raster", "auto"):
+            raise ValueError(
+                "Unknown render backend: '{}'".format(self.render_backend)
+            )
+
+        layout = self.get_layout()
+        if layout is None and self.render_backend == "raster":
+            raise ValueError(
+                "No raster layout found for template: '{}'".format(
+                    raster.layout_path(self.template_path)
+                )
+            )
+
+        return layout
+
+
+    def _resolve_layout(self, layout, resolution):
+        """
+        Lays the layout out with data, logs missing keys
+        like compute_template does and images not found,
+        which the browser would show broken.
+        """
+
+        for name in layout.missing_fonts():
+            self.log.warning(
+                "No font file found for '{}' in layout, ".format(name) +
+                "using Pillow default font."
+            )
+
+        missing = []
+        try:
+            ops = layout.resolve(self.data, resolution, missing=missing)
+        except KeyError as err:
+            msg = "Missing {} Key in instance data. ".format(err)
+            msg += "Layout formatting cannot be completed successfully!"
+            self.log.error(msg)
+            raise
+
+        for src in missing:
+            self.log.warning(
+                "Image '{}' not found, ".format(src) +
+                "the raster slate is drawn without it."
+            )
+
+        return ops
+
+
+    def render_slate_variants(self, variants, slate_specifier="", use_cache=True):
+        """
+        Renders several variants of the slate from a single
+        page load, each variant being a dict with optional keys:
+            resolution: (width, height), defaults to data
+            data: dict of overrides merged on top of data,
+                use it to toggle {key_optional} blocks
+            path: output png path, defaults to the staging dir
+        The page is loaded once, then each variant only patches
+        the DOM nodes that changed and resizes the viewport, so
+        css and images are not loaded again. Variants found in
+        the render cache are not rendered.
+        Returns the list of rendered paths, in order.
+        """
+
+        jobs = []
+        for i, variant in enumerate(variants):
+            data = self.data.copy()
+            data.update(variant.get("data") or {})
+            resolution = tuple(variant.get("resolution") or (
+                data["resolution_width"] or 3840,
+                data["resolution_height"] or 2160
+            ))
+            data["resolution_width"] = resolution[0]
+            data["resolution_height"] = resolution[1]
+            path = variant.get("path") or os.path.join(
+                self.staging_dir,
+                "{}{}_{:02d}{}".format(
+                    self.slate_temp_name,
+                    slate_specifier,
+                    i,
+                    self.slate_temp_ext
+                )
+            )
+            jobs.append((self._template.render(data), resolution, path))
+
+        cache = self.get_render_cache() if use_cache else None
+        keys = {}
+        pending = []
+        for html_str, resolution, path in jobs:
+            if cache is not None:
+                key = cache.key(html_str, resolution, self.slate_temp_ext)
+                if cache.fetch(key, path):
+                    continue
+                keys[path] = key
+            pending.append((html_str, resolution, path))
+
+        with self.tracer.span(
+            "render_slate_variants",
+            variants=len(jobs),
+            cached=len(jobs) - len(pending)
+        ):
+            if pending:
+                render_variants = [(h, r) for h, r, p in pending]
+                if self.render_pool is not None:
+                    pngs = self.render_pool.render_variants(render_variants)
+                else:
+                    with RenderPool(size=1, log=self.log) as pool:
+                        pngs = pool.render_variants(render_variants)
+
+                for (html_str, resolution, path), png in zip(pending, pngs):
+                    if os.path.lexists(path):
+                        os.remove(path)
+                    with open(path, "wb") as f:
+                        f.write(png)
+                    if cache is not None:
+                        cache.store(keys[path], path)
+
+        self.log.debug("Rendered {} slate variants, {} from cache".format(
+            len(jobs), len(jobs) - len(pending)
+        ))
+
+        return [path for html_str, resolution, path in jobs]
+
+
+    def _slate_resolution(self, resolution=()):
+        """
+        Returns the resolution to render at, falling back on
+        data. A given resolution gets stored in data.
+        """
+
         data_width = self.data["resolution_width"] or 3840
         data_height = self.data["resolution_height"] or 2160
 
@@ -385,17 +765,556 @@ class SlateCreator:
             self.data["resolution_width"] = resolution[0]
             self.data["resolution_height"] = resolution[1]
 
-        self.compute_template() 
+        return resolution
+
+
+    def render_slate_direct(
+        self,
+        output,
+        out_args=[],
+        resolution=(),
+        compute=True,
+        env={}
+    ):
+        """
+        Renders the slate straight into output, skipping the
+        staged png. The browser capture stays in memory and is
+        piped to ffmpeg, which decodes it once and encodes the
+        final image or movie, so compression only happens for
+        the target format. out_args are ffmpeg output args,
+        example: ["-c:v", "dnxhd", "-profile:v", "dnxhr_hq"]
+        Needs a render pool, a temporary one is used if none
+        is set, unless the slate is drawn from a raster layout,
+        see render_slate. Returns the completed ffmpeg
+        subprocess, or the output path with the numpy convert
+        backend, which converts the capture in process instead.
+        """
+
+        resolution = self._slate_resolution(resolution)
+        layout = self._raster_layout()
+
+        image = None
+        png = None
+        if layout is not None:
+            image = raster.rasterize(
+                self._resolve_layout(layout, resolution),
+                resolution
+            )
+        else:
+            if compute:
+                self.compute_template()
 
-        htimg = Html2Image(output_path=self.staging_dir)
+            if self.render_pool is not None:
+                png = self.render_pool.render(
+                    self._template_string_computed,
+                    resolution
+                )
+            else:
+                with RenderPool(size=1, log=self.log) as pool:
+                    png = pool.render(
+                        self._template_string_computed,
+                        resolution
+                    )
+
+        if self.convert_backend == "numpy":
+            return self.render_image_numpy(
+                png if image is None else image,
+                output
+            )
+
+        cmd = []
+        cmd.append("ffmpeg{}".format(self.exec_ext))
+        cmd.extend(["-v", "error", "-y"])
+        if image is None:
+            cmd.extend(["-f", "png_pipe", "-i", "pipe:0"])
+            stdin = png
+        else:
+            # raster frames go over as raw pixels, no png round trip
+            cmd.extend([
+                "-f", "rawvideo",
+                "-pix_fmt", "rgba" if image.mode == "RGBA" else "rgb24",
+                "-s", "{}x{}".format(image.width, image.height),
+                "-i", "pipe:0"
+            ])
+            stdin = image.tobytes()
+        cmd.extend(out_args)
+        cmd.append(output)
 
-        slate_rendered_path = htimg.screenshot(
-            html_str=self._template_string_computed,
-            save_as=slate_name,
-            size=resolution
+        return self._run(cmd, output, env=env, stdin=stdin)
+
+
+    def measure_thumbnail_width(self, resolution=()):
+        """
+        Returns the css box width of the thumbnail elements
+        at the slate resolution, measured once per template
+        and resolution in a browser from the render pool, a
+        temporary one is used if none is set. Raster layouts
+        give it without a browser.
+        """
+
+        resolution = tuple(self._slate_resolution(resolution))
+        layout = self._raster_layout()
+        if layout is not None:
+            widths = layout.thumbnail_widths(resolution)
+            if widths:
+                return int(round(max(widths)))
+
+        key = (self._template.path, self._template.string, resolution)
+        width = box_widths.get(key)
+        if width is not None:
+            return width
+
+        data = self.data.copy()
+        for field in self._template.resource_fields:
+            data[field] = ""
+        html_str = self._template.render(data)
+        expression = measure_script % json.dumps(thumbnail_selector)
+
+        reason = "No '{}' element in template".format(thumbnail_selector)
+        if not devtools_pipe_available():
+            # no page scripts through Html2Image
+            reason = "Can't measure thumbnail boxes without DevTools pipe"
+            widths = []
+        elif self.render_pool is not None:
+            widths = self.render_pool.evaluate(html_str, resolution, expression)
+        else:
+            with RenderPool(size=1, log=self.log) as pool:
+                widths = pool.evaluate(html_str, resolution, expression)
+
+        widths = [w for w in widths or [] if w]
+        if widths:
+            width = int(round(max(widths)))
+        else:
+            width = int(resolution[0]) // 4
+            self.log.warning("{}, thumbnails default to {}px wide".format(
+                reason, width
+            ))
+        box_widths.put(key, width)
+
+        self.log.debug("Thumbnail box width at {}: {}px".format(
+            resolution, width
+        ))
+
+        return width
+
+
+    def render_thumbnail(
+        self,
+        input,
+        frames=None,
+        fields=(),
+        width=0,
+        use_cache=True,
+        env={}
+    ):
+        """
+        Extracts frames from input, scales them down to the
+        width of the thumbnail box in the template and stores
+        their paths in the {thumbnail*} fields of data, so the
+        browser never has to decode the full resolution source.
+        Every field gets one frame, all of them are extracted
+        by a single ffmpeg call that opens only the chosen
+        frame files of sequences and seeks to each of them in
+        movies. frames are indexes from the first frame of
+        input (the first on disk for sequences), one per field,
+        and default to frames evenly spread over the frame range.
+        Thumbnails are content addressed in the staging dir
+        cache and only extracted again if input changes.
+        Returns a dict of field -> thumbnail path.
+        """
+
+        name = os.path.basename(input.replace("\\", "/"))
+
+        fields = list(fields) or sorted(self._template.resource_fields)
+        if not fields:
+            fields = ["thumbnail"]
+
+        if frames is None:
+            length = 1
+            if is_sequence(input):
+                first, last, count = frame_range(input)
+                length = last - first + 1
+            elif is_movie(input):
+                length = (
+                    int(self.data["frameEndHandle"]) -
+                    int(self.data["frameStartHandle"]) + 1
+                )
+            frames = spread_frames(len(fields), length)
+        frames = list(frames)
+        if len(frames) != len(fields):
+            raise ValueError(
+                "Got {} frames for {} thumbnail fields!".format(
+                    len(frames), len(fields)
+                )
+            )
+
+        if not width:
+            width = self.measure_thumbnail_width()
+
+        unique = sorted(set(frames))
+        key = thumbnail_key(input, unique, width, self.thumbnail_ext)
+        directory = os.path.join(
+            self.staging_dir,
+            self.cache_subfolder,
+            "thumbnails",
+            key[:2]
         )
+        pattern = os.path.join(directory, key + "_%02d" + self.thumbnail_ext)
+        outputs = [pattern % (i + 1) for i in range(len(unique))]
+
+        hit = use_cache and all(os.path.isfile(p) for p in outputs)
+        if use_cache:
+            self.tracer.event("cache", cache="thumbnail", hit=hit)
+        if hit:
+            self.log.debug("{}: thumbnail cache hit".format(name))
+        else:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                self._run(
+                    thumbnail_command(
+                        input,
+                        pattern,
+                        unique,
+                        width,
+                        fps=self.data.get("fps"),
+                        exec_ext=self.exec_ext
+                    ),
+                    input,
+                    env=env
+                )
+            except Exception:
+                for path in outputs:
+                    if os.path.isfile(path):
+                        os.remove(path)
+                raise
+            missing = [p for p in outputs if not os.path.isfile(p)]
+            if missing:
+                raise ValueError(
+                    "{}: frames {} out of range, got {} of {} thumbnails".format(
+                        name, unique, len(outputs) - len(missing), len(outputs)
+                    )
+                )
+
+        thumbnails = {}
+        for field, frame in zip(fields, frames):
+            thumbnails[field] = outputs[unique.index(frame)]
+        self.data.update(thumbnails)
 
-        return slate_rendered_path
+        self.log.debug("{}: thumbnails {}".format(name, thumbnails))
+
+        return thumbnails
+
+
+    def create_slate(
+        self,
+        input,
+        output,
+        out_args=[],
+        direct=False,
+        thumbnails=False
+    ):
+        """
+        Probes input for resolution and timecode, renders the
+        slate and converts it to output using convert_slate.
+        With direct the slate is piped to ffmpeg instead, see
+        render_slate_direct, and out_args are ffmpeg args.
+        With thumbnails the {thumbnail*} fields are filled
+        from input first, see render_thumbnail.
+        Returns the output path.
+        """
+
+        self.probe(input)
+
+        if thumbnails:
+            self.render_thumbnail(input)
+
+        if direct:
+            self.render_slate_direct(output, out_args=out_args)
+            return output
+
+        slate_rendered_path = self.render_slate()
+        self.convert_slate(
+            slate_rendered_path[0],
+            output,
+            out_args=out_args
+        )
+
+        return output
+
+
+    def prepend_slate_to_sequence(
+        self,
+        slate,
+        sequence,
+        frame=None,
+        out_args=[]
+    ):
+        """
+        Writes the slate as the frame right before the first
+        frame of an image sequence, like shot.####.exr, without
+        touching the other frames. frame defaults to
+        frameStartHandle - 1, matching the slate timecode.
+        Returns the path of the written frame.
+        """
+
+        if frame is None:
+            frame = int(self.data["frameStartHandle"]) - 1
+
+        output = frame_path(sequence, frame)
+        self.convert_slate(slate, output, out_args=out_args)
+
+        return output
+
+
+    def prepend_slate_to_movie(self, slate, movie, output, frames=1, env={}):
+        """
+        Writes output as the slate followed by movie. Only the
+        slate gets encoded, matching codec, profile, pixel format,
+        size, rate and audio layout of movie, then both parts are
+        joined with stream copy so the movie is never re-encoded.
+        That needs intra only video and pcm audio, other movies
+        (h264, hevc...) have parameter sets a separate slate
+        encode won't match, they get re-encoded in one pass.
+        Returns the output path.
+        """
+
+        if os.path.abspath(output) == os.path.abspath(movie):
+            raise ValueError("Output can't overwrite the source movie!")
+
+        res = self._run(
+            streams_command(movie, self.exec_ext),
+            movie,
+            env=env
+        )
+        video, audio = parse_streams(res.stdout.decode("utf-8"))
+        if video is None:
+            raise ValueError("No video stream found in '{}'".format(movie))
+
+        timecode = self.data.get("timecode", "")
+        if not can_stream_copy(video, audio):
+            self.log.debug("{}: {} can't be stream copied, re-encoding".format(
+                os.path.basename(movie), video.get("codec_name")
+            ))
+            self._run(
+                reencode_command(
+                    slate,
+                    movie,
+                    output,
+                    video,
+                    audio=audio,
+                    frames=frames,
+                    timecode=timecode,
+                    exec_ext=self.exec_ext
+                ),
+                movie,
+                env=env
+            )
+            return output
+
+        # unique per call, clones share the staging dir
+        paths = []
+        for suffix in (os.path.splitext(movie)[1], ".txt"):
+            fd, path = tempfile.mkstemp(
+                suffix=suffix,
+                prefix="{}_prepend_".format(self.slate_temp_name),
+                dir=self.staging_dir
+            )
+            os.close(fd)
+            paths.append(path)
+        segment, concat_list = paths
+
+        try:
+            self._run(
+                segment_command(
+                    slate,
+                    segment,
+                    video,
+                    audio=audio,
+                    frames=frames,
+                    exec_ext=self.exec_ext
+                ),
+                slate,
+                env=env
+            )
+            write_concat_list(concat_list, [segment, movie])
+            self._run(
+                concat_command(
+                    concat_list,
+                    output,
+                    timecode=timecode,
+                    exec_ext=self.exec_ext
+                ),
+                movie,
+                env=env
+            )
+        finally:
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        return output
+
+
+    def render_burnin(
+        self,
+        template_path,
+        resources_path="",
+        start=None,
+        end=None,
+        resolution=(),
+        charsets=None
+    ):
+        """
+        Renders the burn-in overlay template_path for every
+        frame from start to end, defaulting to the handle
+        range. The overlay is formatted with data like the
+        slate, except {frame} and {timecode} (or any field in
+        charsets) which change every frame: the browser renders
+        the static layer and their glyphs once, then frames are
+        composited in process.
+        Returns a generator of RGBA images, see BurninRenderer.
+        """
+
+        resolution = self._slate_resolution(resolution)
+        charsets = dict(charsets or default_charsets)
+
+        start = int(self.data["frameStartHandle"]) if start is None else start
+        end = int(self.data["frameEndHandle"]) if end is None else end
+
+        compiled = template_cache.get(
+            template_path,
+            resources_path or self.template_res_path,
+            inline=self.inline_resources
+        )
+        data = self.data.copy()
+        for field in charsets:
+            data[field] = field_marker(field)
+        html_str = compiled.render(data)
+
+        renderer = BurninRenderer(
+            html_str,
+            resolution,
+            self.render_pool,
+            charsets=charsets
+        )
+        if self.render_pool is not None:
+            renderer.prepare()
+        else:
+            with RenderPool(size=1, log=self.log) as pool:
+                renderer.render_pool = pool
+                renderer.prepare()
+
+        self.log.debug("Burn-in '{}': {} fields, frames {}-{}".format(
+            template_path, len(renderer.fields), start, end
+        ))
+
+        values = (
+            {"frame": frame, "timecode": timecode}
+            for frame, timecode in zip(
+                range(start, end + 1),
+                self.frame_range_timecodes(start, end)
+            )
+        )
+
+        return renderer.frames(values)
+
+
+    def write_burnin(
+        self,
+        output,
+        template_path,
+        resources_path="",
+        out_args=[],
+        start=None,
+        end=None,
+        resolution=(),
+        plate="",
+        env={}
+    ):
+        """
+        Renders the burn-in overlay with render_burnin and
+        streams its frames to ffmpeg, one at a time, to encode
+        output. With a plate, a movie or sequence pattern whose
+        first frame is frameStartHandle, the overlay frames get
+        composited over the matching plate frames and output
+        is the burnt in plate. Without, output is the overlay
+        layer alone: use an alpha capable format or out_args
+        like ["-c:v", "prores_ks", "-profile:v", "4444"] to
+        keep it transparent.
+        Returns the output path.
+        """
+
+        images = self.render_burnin(
+            template_path,
+            resources_path=resources_path,
+            start=start,
+            end=end,
+            resolution=resolution
+        )
+        resolution = self._slate_resolution()
+
+        if env:
+            self.set_env(env)
+
+        first = int(self.data["frameStartHandle"])
+        start = first if start is None else start
+        cmd = burnin_command(
+            output,
+            resolution,
+            self.data["fps"],
+            out_args=out_args,
+            plate=plate,
+            plate_frame=start if is_sequence(plate) else start - first,
+            exec_ext=self.exec_ext
+        )
+        cmd = self.tool_registry.command(cmd, self.env)
+        name = os.path.basename(output.replace("\\", "/"))
+        self.log.debug("{}: cmd>{}".format(name, " ".join(cmd)))
+
+        with self.tracer.span(
+            "subprocess",
+            tool=os.path.basename(cmd[0]),
+            input=name,
+            cmd=cmd
+        ) as span:
+            try:
+                res = write_frames(cmd, images, env=self.env)
+            except subprocess.CalledProcessError as err:
+                self._trace_process(span, err)
+                raise
+            self._trace_process(span, res)
+
+        return output
+
+
+    def render_batch(
+        self,
+        jobs,
+        probe_workers=4,
+        render_workers=0,
+        convert_workers=4,
+        callback=None
+    ):
+        """
+        Creates slates for many shots sharing this instance
+        template, env and render pool. Jobs are (data, input,
+        output) tuples or dicts with those keys, plus an optional
+        "out_args" list for oiio and a "name" making the staged
+        slate file name unique. Stages of different jobs run
+        concurrently, see BatchScheduler.
+        Returns a BatchResult for each job, in order, failed
+        jobs carry their exception instead of raising.
+        callback gets each BatchResult as soon as it's done.
+        """
+
+        scheduler = BatchScheduler(
+            self,
+            probe_workers=probe_workers,
+            render_workers=render_workers,
+            convert_workers=convert_workers
+        )
+
+        return scheduler.run(jobs, callback=callback)
 
 
     def render_image_oiio(
@@ -410,10 +1329,86 @@ class SlateCreator:
         renders any image using a subprocess command. args is a list of strings
         returns the completed supprocess
         """
-        
-        name = os.path.basename(input.replace("\\", "/"))
-        env = self.set_env(env) if env else self.env
-        
+
+        cmd = self._oiio_command(input, output, in_args, out_args)
+
+        return self._run(cmd, input, env=env)
+
+
+    def render_image_numpy(
+        self,
+        input,
+        output,
+        src_colorspace="",
+        dst_colorspace="",
+        pixel_type="half"
+    ):
+        """
+        Converts an 8bit image, path, encoded bytes or Pillow
+        image, to a linear OpenEXR in process with numpy, no
+        oiio needed.
+        Supports srgb, rec709 or linear sources and linear,
+        acescg or aces2065-1 targets, defaults come from
+        numpy_colorspaces. Returns the output path.
+        """
+
+        src = src_colorspace or self.numpy_colorspaces[0]
+        dst = dst_colorspace or self.numpy_colorspaces[1]
+
+        if not output.lower().endswith(".exr"):
+            raise ValueError(
+                "Numpy conversion only writes exr files: '{}'".format(output)
+            )
+
+        self.log.debug("{}: numpy {} -> {}".format(
+            os.path.basename(output), src, dst
+        ))
+
+        return color.convert_image(
+            input,
+            output,
+            src=src,
+            dst=dst,
+            pixel_type=pixel_type
+        )
+
+
+    def convert_slate(self, input, output, out_args=[]):
+        """
+        Converts a rendered slate to output with the backend
+        set in convert_backend, "oiio" or "numpy". out_args
+        are only used by oiio.
+        """
+
+        if self.convert_backend not in ("oiio", "numpy"):
+            raise ValueError(
+                "Unknown convert backend: '{}'".format(self.convert_backend)
+            )
+
+        with self.tracer.span("convert_slate", backend=self.convert_backend):
+            if self.convert_backend == "numpy":
+                return self.render_image_numpy(input, output)
+            return self.render_image_oiio(input, output, out_args=out_args)
+
+
+    async def render_image_oiio_async(
+        self,
+        input,
+        output,
+        env={},
+        in_args=[],
+        out_args=[]
+    ):
+        """
+        Same as render_image_oiio, awaiting the async runner.
+        """
+
+        cmd = self._oiio_command(input, output, in_args, out_args)
+
+        return await self._run_async(cmd, input, env=env)
+
+
+    def _oiio_command(self, input, output, in_args=[], out_args=[]):
         cmd = []
         cmd.append("oiiotool{}".format(self.exec_ext))
         cmd.extend(in_args)
@@ -422,41 +1417,321 @@ class SlateCreator:
         cmd.extend(out_args)
         cmd.append("-o")
         cmd.append(output)
+        return cmd
+
+
+    def _run(self, cmd, input, env={}, stdin=None):
+        """
+        Runs a tool command, env gets merged in the
+        instance env. stdin bytes are piped to the command.
+        Returns the completed subprocess.
+        """
+
+        name = os.path.basename(input.replace("\\", "/"))
+        if env:
+            self.set_env(env)
+        env = self.env
+        cmd = self.tool_registry.command(cmd, env)
 
         self.log.debug("{}: cmd>{}".format(name, " ".join(cmd)))
-        
-        res = subprocess.run(
-            cmd,
-            env=env,
-            shell=True if env else False,
-            check=True,
-            capture_output=True
-        )
+
+        with self.tracer.span(
+            "subprocess",
+            tool=os.path.basename(cmd[0]),
+            input=name,
+            cmd=cmd
+        ) as span:
+            try:
+                res = subprocess.run(
+                    cmd,
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                    input=stdin
+                )
+            except subprocess.CalledProcessError as err:
+                self._trace_process(span, err)
+                raise
+            self._trace_process(span, res)
 
         return res
 
 
+    async def _run_async(self, cmd, input, env={}):
+        """
+        Runs a tool command through the async runner, env
+        gets merged in the instance env.
+        Returns the completed subprocess.
+        """
+
+        name = os.path.basename(input.replace("\\", "/"))
+        if env:
+            self.set_env(env)
+        cmd = self.tool_registry.command(cmd, self.env)
+
+        self.log.debug("{}: async cmd>{}".format(name, " ".join(cmd)))
+
+        with self.tracer.span(
+            "subprocess",
+            tool=os.path.basename(cmd[0]),
+            input=name,
+            cmd=cmd
+        ) as span:
+            try:
+                res = await self.get_runner().run(cmd, env=self.env)
+            except subprocess.CalledProcessError as err:
+                self._trace_process(span, err)
+                raise
+            self._trace_process(span, res)
+
+        return res
+
+
+    @staticmethod
+    def _trace_process(span, res):
+        span.set(
+            returncode=res.returncode,
+            stdout_bytes=len(res.stdout or b""),
+            stderr_bytes=len(res.stderr or b"")
+        )
+
+
+    def set_runner(self, runner=None):
+        """
+        Sets the AsyncRunner used by the async tool methods.
+        If none is set a runner allowing one command per cpu
+        gets created on first use.
+        """
+
+        self.runner = runner
+
+        self.log.debug("Async runner: '{}'".format(self.runner))
+
+
+    def get_runner(self):
+        """
+        Returns the async runner, creating the default one
+        if needed.
+        """
+
+        if self.runner is None:
+            self.runner = AsyncRunner(log=self.log)
+
+        return self.runner
+
+
+    def probe(self, input, env={}, native=True, use_cache=True):
+        """
+        Gathers resolution, timecode, fps, pixel aspect and
+        frame count of input with a single tool call, ffprobe
+        for movies and iinfo for images, and fills data with
+        them. Timecode is moved back 1 frame for the slate,
+        like get_timecode_oiio does.
+        EXR and DPX headers are read in process when native
+        is enabled, other formats use the tools.
+        Sequence patterns like shot.####.exr get their frame
+        range from a single cached directory scan and only
+        their first frame is probed, frameStartHandle and
+        frameEndHandle are set to the range on disk.
+        Results are kept in the probe cache while the file
+        size and mtime don't change, set use_cache to False
+        to bypass it.
+        Returns a ProbeResult.
+        """
+
+        cache = self.get_probe_cache() if use_cache else None
+
+        with self.tracer.span(
+            "probe",
+            input=os.path.basename(input.replace("\\", "/"))
+        ):
+            path, frames = self._probe_path(input)
+            result = self._probe_local(path, cache, native)
+            if result is None:
+                res = self._run(
+                    probe_command(path, self.exec_ext),
+                    path,
+                    env=env
+                )
+                result = parse_probe(res.stdout.decode("utf-8"), path)
+                if cache is not None:
+                    cache.put(path, result)
+            if frames is not None:
+                result = self._sequence_probe(result, input, frames)
+
+        self.apply_probe(result)
+
+        return result
+
+
+    async def probe_async(self, input, env={}, native=True, use_cache=True):
+        """
+        Same as probe, awaiting the async runner when
+        a tool call is needed.
+        """
+
+        cache = self.get_probe_cache() if use_cache else None
+
+        with self.tracer.span(
+            "probe",
+            input=os.path.basename(input.replace("\\", "/"))
+        ):
+            path, frames = self._probe_path(input)
+            result = self._probe_local(path, cache, native)
+            if result is None:
+                res = await self._run_async(
+                    probe_command(path, self.exec_ext),
+                    path,
+                    env=env
+                )
+                result = parse_probe(res.stdout.decode("utf-8"), path)
+                if cache is not None:
+                    cache.put(path, result)
+            if frames is not None:
+                result = self._sequence_probe(result, input, frames)
+
+        self.apply_probe(result)
+
+        return result
+
+
+    def _probe_path(self, input):
+        """
+        Returns the path to probe for input and the frame
+        range of sequences, None for single files.
+        """
+
+        if not is_sequence(input):
+            return input, None
+
+        start, end, count = frame_range(input)
+        missing = end - start + 1 - count
+        if missing:
+            self.log.warning("{}: {} missing frames in {}-{}".format(
+                os.path.basename(input.replace("\\", "/")),
+                missing,
+                start,
+                end
+            ))
+        return frame_path(input, start), (start, end)
+
+
+    @staticmethod
+    def _sequence_probe(result, input, frames):
+        """
+        Returns the first frame result as the sequence one.
+        """
+
+        values = result.to_dict()
+        values.update(
+            path=input,
+            frame_start=frames[0],
+            frame_end=frames[1],
+            frame_count=frames[1] - frames[0] + 1
+        )
+        return ProbeResult.from_dict(values)
+
+
+    def _probe_local(self, input, cache=None, native=True):
+        """
+        Returns a ProbeResult from the cache or from the file
+        header if possible, None if a tool call is needed.
+        Native results get stored in the cache.
+        """
+
+        name = os.path.basename(input.replace("\\", "/"))
+
+        if cache is not None:
+            result = cache.get(input)
+            self.tracer.event("cache", cache="probe", hit=result is not None)
+            if result is not None:
+                self.log.debug("{}: probe cache hit".format(name))
+                return result
+
+        if native:
+            try:
+                result = read_header(input)
+            except (HeaderError, OSError) as err:
+                self.log.debug("{}: native probe failed: {}".format(
+                    name, err
+                ))
+                result = None
+            if result is not None:
+                if cache is not None:
+                    cache.put(input, result)
+                return result
+
+        return None
+
+
+    def apply_probe(self, result):
+        """
+        Fills data with the values found in a ProbeResult.
+        """
+
+        name = os.path.basename(result.path.replace("\\", "/"))
+
+        if result.width and result.height:
+            self.data["resolution_width"] = result.width
+            self.data["resolution_height"] = result.height
+        if result.fps:
+            self.data["fps"] = result.fps
+        if result.pixel_aspect:
+            self.data["pixel_aspect"] = result.pixel_aspect
+        if result.frame_start is not None and result.frame_end is not None:
+            self.data["frameStartHandle"] = result.frame_start
+            self.data["frameEndHandle"] = result.frame_end
+
+        tc = "01:00:00:00"
+        if result.timecode:
+            tc_frames = self.timecode_to_frames(
+                result.timecode,
+                self.data["fps"]
+            )
+            tc = self.frames_to_timecode(tc_frames - 1, self.data["fps"])
+        self.data["timecode"] = tc
+
+        self.log.debug("{}: Probed {}, slate timecode: {}".format(
+            name, result, tc
+        ))
+
+
     def get_timecode_oiio(self, input, env={}):
         """
         Find timecode using oiio, currently working only on
         images with timecode support, not videos.
         Subtracts 1 frame
         """
-        name = os.path.basename(input.replace("\\", "/"))
-        env = self.set_env(env) if env else self.env
+
+        res = self._run(self._timecode_oiio_command(input), input, env=env)
+
+        return self._apply_timecode_oiio(input, res)
+
+
+    async def get_timecode_oiio_async(self, input, env={}):
+        """
+        Same as get_timecode_oiio, awaiting the async runner.
+        """
+
+        res = await self._run_async(
+            self._timecode_oiio_command(input),
+            input,
+            env=env
+        )
+
+        return self._apply_timecode_oiio(input, res)
+
+
+    def _timecode_oiio_command(self, input):
         cmd = []
         cmd.append("iinfo{}".format(self.exec_ext))
         cmd.append("-v")
-        cmd.append(input)
-        self.log.debug("{}: cmd>{}".format(name, " ".join(cmd)))
-        res = subprocess.run(
-            cmd,
-            env=env,
-            shell=True if env else False,
-            check=True,
-            capture_output=True
-        )
+        cmd.append(first_frame(input))
+        return cmd
+
 
+    def _apply_timecode_oiio(self, input, res):
+        name = os.path.basename(input.replace("\\", "/"))
         lines = res.stdout.decode("utf-8").replace(" ", "").splitlines()
         tc = "01:00:00:00"
         
@@ -487,21 +1762,37 @@ class SlateCreator:
         """
         Find input resolution using ffprobe.
         """
-        name = os.path.basename(input.replace("\\", "/"))
-        env = self.env if not env else env
+
+        res = self._run(self._resolution_ffprobe_command(input), input, env=env)
+
+        return self._apply_resolution_ffprobe(input, res)
+
+
+    async def get_resolution_ffprobe_async(self, input, env={}):
+        """
+        Same as get_resolution_ffprobe, awaiting the async runner.
+        """
+
+        res = await self._run_async(
+            self._resolution_ffprobe_command(input),
+            input,
+            env=env
+        )
+
+        return self._apply_resolution_ffprobe(input, res)
+
+
+    def _resolution_ffprobe_command(self, input):
         cmd = []
         cmd.append("ffprobe{}".format(self.exec_ext))
         cmd.extend(["-v", "error", "-select_streams", "v:0",
             "-show_entries", "stream=width,height", "-of", "json"])
         cmd.append(input)
-        self.log.debug("{}: cmd>{}".format(name, " ".join(cmd)))
-        res = subprocess.run(
-            cmd,
-            env=env,
-            shell=True if env else False,
-            check=True,
-            capture_output=True
-        )
+        return cmd
+
+
+    def _apply_resolution_ffprobe(self, input, res):
+        name = os.path.basename(input.replace("\\", "/"))
         resolution = json.loads(
             res.stdout.decode("utf-8")
         )["streams"][0]
@@ -517,15 +1808,38 @@ class SlateCreator:
 
 
     def timecode_to_frames(self, timecode, framerate):
-        rt = otio.opentime.from_timecode(timecode, framerate)
-        return int(otio.opentime.to_frames(rt))
+        return tc_utils.timecode_to_frames(timecode, framerate)
 
 
     def frames_to_timecode(self, frames, framerate):
-        rt = otio.opentime.from_frames(frames, framerate)
-        return otio.opentime.to_timecode(rt)
+        return tc_utils.frames_to_timecode(frames, framerate)
 
 
     def frames_to_seconds(self, frames, framerate):
-        rt = otio.opentime.from_frames(frames, framerate)
-        return otio.opentime.to_seconds(rt)
\ No newline at end of file
+        return tc_utils.frames_to_seconds(frames, framerate)
+
+
+    def frame_range_timecodes(self, start=None, end=None, framerate=None):
+        """
+        Returns the timecode of every frame from start to end,
+        defaulting to frameStartHandle..frameEndHandle at the
+        data fps. Timecodes follow the slate one, which sits
+        on the frame right before frameStartHandle.
+        """
+
+        framerate = framerate or self.data["fps"]
+        first = int(self.data["frameStartHandle"])
+        start = first if start is None else int(start)
+        end = int(self.data["frameEndHandle"]) if end is None else int(end)
+
+        offset = self.timecode_to_frames(
+            self.data.get("timecode") or "01:00:00:00",
+            framerate
+        ) + 1 - first
+
+        return tc_utils.frame_range_to_timecodes(
+            start,
+            end,
+            framerate,
+            offset=offset
+        )
\ No newline at end of file
@@ -0,0 +1,218 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class BatchJob:
+    """
+    Single slate job, data gets merged on top of the
+    data of the SlateCreator running the batch. name makes
+    the staged slate file name unique, it defaults to the
+    job index, set it when several batches share a staging
+    dir.
+    """
+
+    __slots__ = ("index", "data", "input", "output", "out_args", "name")
+
+    def __init__(
+        self,
+        index,
+        data=None,
+        input="",
+        output="",
+        out_args=None,
+        name=""
+    ):
+        self.index = index
+        self.data = data or {}
+        self.input = input
+        self.output = output
+        self.out_args = out_args or []
+        self.name = name
+
+    @classmethod
+    def from_job(cls, index, job):
+        """
+        Builds a job from a (data, input, output) sequence
+        or a dict with the same keys.
+        """
+
+        if isinstance(job, cls):
+            job.index = index
+            return job
+        if isinstance(job, dict):
+            return cls(
+                index,
+                data=job.get("data"),
+                input=job.get("input", ""),
+                output=job.get("output", ""),
+                out_args=job.get("out_args"),
+                name=job.get("name", "")
+            )
+        return cls(index, *job)
+
+
+class BatchResult:
+    """
+    Outcome of a single job, error holds the exception
+    raised by the failing stage if any.
+    """
+
+    __slots__ = ("index", "input", "output", "slate", "stage", "error")
+
+    def __init__(self, job):
+        self.index = job.index
+        self.input = job.input
+        self.output = job.output
+        self.slate = ""
+        self.stage = ""
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return "BatchResult({}, ok={}, output='{}', stage='{}')".format(
+            self.index, self.ok, self.output, self.stage
+        )
+
+
+class BatchScheduler:
+    """
+    Pipelines slate jobs through separate worker pools.
+
+    Each job goes through probe -> format -> render -> convert.
+    Probing and conversion are subprocess bound and get their
+    own thread pools, formatting runs right before rendering
+    in the render pool, whose size follows the RenderPool of
+    the creator so browsers are never oversubscribed. As soon
+    as a job leaves a stage the next one can enter it, and a
+    failing job only stops its own pipeline.
+    """
+
+    def __init__(
+        self,
+        creator,
+        probe_workers=4,
+        render_workers=0,
+        convert_workers=4
+    ):
+        self.creator = creator
+        if not render_workers:
+            pool = creator.render_pool
+            render_workers = pool.size if pool is not None else 2
+        self.probe_workers = probe_workers
+        self.render_workers = render_workers
+        self.convert_workers = convert_workers
+
+    def run(self, jobs, callback=None):
+        """
+        Runs all jobs and returns a BatchResult per job,
+        in the same order. callback gets called with each
+        BatchResult as soon as its job is done.
+        """
+
+        jobs = [BatchJob.from_job(i, job) for i, job in enumerate(jobs)]
+        if not jobs:
+            return []
+        self._callback = callback
+
+        self._probe_pool = ThreadPoolExecutor(
+            self.probe_workers, thread_name_prefix="slate_probe"
+        )
+        self._render_pool = ThreadPoolExecutor(
+            self.render_workers, thread_name_prefix="slate_render"
+        )
+        self._convert_pool = ThreadPoolExecutor(
+            self.convert_workers, thread_name_prefix="slate_convert"
+        )
+
+        try:
+            finals = [self._start(job) for job in jobs]
+            wait(finals)
+        finally:
+            self._probe_pool.shutdown()
+            self._render_pool.shutdown()
+            self._convert_pool.shutdown()
+
+        return [f.result() for f in finals]
+
+    def _start(self, job):
+        final = Future()
+        result = BatchResult(job)
+        slate = self.creator.clone(data=job.data)
+        self._chain(
+            final, result, self._probe_pool,
+            self._probe, slate, job, result
+        )
+        return final
+
+    def _chain(self, final, result, pool, fn, *args):
+        """
+        Submits a stage and wires its completion to the next one.
+        """
+
+        def _done(future):
+            err = future.exception()
+            if err is not None:
+                result.error = err
+                self.creator.log.error(
+                    "Slate job {} failed at {}: {}".format(
+                        result.index, result.stage, err
+                    )
+                )
+                self._finish(final, result)
+                return
+            next_stage = future.result()
+            if next_stage is None:
+                self._finish(final, result)
+            else:
+                self._chain(final, result, *next_stage)
+
+        pool.submit(fn, *args).add_done_callback(_done)
+
+    def _finish(self, final, result):
+        if self._callback is not None:
+            try:
+                self._callback(result)
+            except Exception as err:
+                self.creator.log.error(
+                    "Slate job {} callback failed: {}".format(
+                        result.index, err
+                    )
+                )
+        final.set_result(result)
+
+    def _probe(self, slate, job, result):
+        result.stage = "probe"
+        if job.input:
+            slate.probe(job.input)
+        return (self._render_pool, self._render, slate, job, result)
+
+    def _render(self, slate, job, result):
+        result.stage = "format"
+        slate.compute_template()
+        result.stage = "render"
+        rendered = slate.render_slate(
+            slate_specifier="_{}".format(
+                job.name or "{:04d}".format(job.index)
+            ),
+            compute=False
+        )
+        result.slate = rendered[0]
+        if not job.output:
+            result.output = result.slate
+            return None
+        return (self._convert_pool, self._convert, slate, job, result)
+
+    def _convert(self, slate, job, result):
+        result.stage = "convert"
+        output_dir = os.path.dirname(job.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        slate.convert_slate(
+            result.slate,
+            job.output,
+            out_args=job.out_args
+        )
+        return None
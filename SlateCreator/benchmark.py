@@ -0,0 +1,572 @@
+"""
+Times the slate pipeline stages separately.
+
+Runs every stage at several resolutions and batch sizes against
+synthetic media. iinfo, ffprobe and oiiotool are replaced by stub
+scripts and the browser by a stub render pool writing plain pngs,
+so the numbers measure the pipeline itself and the harness works
+offline. Pass --browser and --real-tools to time the real thing.
+
+example:
+    python -m SlateCreator.benchmark -r 1920x1080 3840x2160 \\
+        -b 1 8 -n 5 -o results.json --label 1.2.0
+    python -m SlateCreator.benchmark -o new.json --compare results.json
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import zlib
+import struct
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import statistics
+
+from .SlateCreator import SlateCreator
+from .template import template_cache
+from . import color
+
+
+package_dir = os.path.dirname(os.path.realpath(__file__))
+repo_dir = os.path.dirname(package_dir)
+
+default_template = os.path.join(
+    repo_dir, "templates", "generic_slate", "generic_slate.html"
+)
+default_resources = os.path.join(
+    repo_dir, "templates", "generic_slate", "resources"
+)
+default_data = os.path.join(repo_dir, "data", "mock_data.json")
+
+# stub tools, they print canned probe output whatever their
+# arguments, oiiotool copies its input to its output
+_stub_tools = {
+    "iinfo": """#!/bin/sh
+cat <<'EOF'
+stub.exr : 1920 x 1080, 4 channel, half openexr
+    smpte:TimeCode: 01:00:00:00
+    FramesPerSecond: 24/1 (24)
+    PixelAspectRatio: 1
+EOF
+""",
+    "ffprobe": """#!/bin/sh
+cat <<'EOF'
+{"streams": [{"width": 1920, "height": 1080, "r_frame_rate": "24/1",
+"sample_aspect_ratio": "1:1", "nb_frames": "240",
+"tags": {"timecode": "01:00:00:00"}}]}
+EOF
+""",
+    "oiiotool": """#!/bin/sh
+in=""
+out=""
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -i) in="$2"; shift ;;
+        -o) out="$2"; shift ;;
+    esac
+    shift
+done
+if [ -n "$in" ] && [ -n "$out" ]; then
+    cp "$in" "$out"
+fi
+exit 0
+""",
+}
+
+
+def write_stub_tools(directory):
+    """
+    Writes the stub tool scripts, returns their directory.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    for name, script in _stub_tools.items():
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(script)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP)
+    return directory
+
+
+def png_bytes(width, height, value=128):
+    """
+    Encodes a flat grey RGB png.
+    """
+
+    def _chunk(kind, data):
+        return (
+            struct.pack(">I", len(data)) + kind + data +
+            struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+        )
+
+    row = b"\0" + bytes([value]) * (width * 3)
+    return (
+        b"\x89PNG\r\n\x1a\n" +
+        _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) +
+        _chunk(b"IDAT", zlib.compress(row * height, 6)) +
+        _chunk(b"IEND", b"")
+    )
+
+
+class StubRenderPool:
+    """
+    Stands in for RenderPool: every render is a flat png
+    of the requested size, no browser involved.
+    """
+
+    def __init__(self, size=1):
+        self.size = size
+        self._pngs = {}
+
+    def render(self, html_str, size):
+        size = (int(size[0]), int(size[1]))
+        if size not in self._pngs:
+            self._pngs[size] = png_bytes(*size)
+        return self._pngs[size]
+
+    def render_variants(self, variants):
+        return [self.render(html_str, size) for html_str, size in variants]
+
+    def screenshot(self, html_str, output_path, size):
+        with open(output_path, "wb") as f:
+            f.write(self.render(html_str, size))
+        return output_path
+
+    def close(self):
+        pass
+
+
+def write_media(directory, resolution):
+    """
+    Writes the synthetic inputs: an exr frame when numpy is
+    available and a placeholder movie for the ffprobe stub.
+    Returns a dict of kind -> path.
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    media = {}
+
+    movie = os.path.join(directory, "synthetic.mov")
+    with open(movie, "wb") as f:
+        f.write(b"\0" * 4096)
+    media["movie"] = movie
+
+    if color.np is not None:
+        exr = os.path.join(
+            directory,
+            "synthetic_{}x{}.1001.exr".format(*resolution)
+        )
+        pixels = color.np.zeros(
+            (resolution[1], resolution[0], 3),
+            dtype=color.np.float32
+        )
+        color.write_exr(exr, pixels, compression="none")
+        media["exr"] = exr
+
+    png = os.path.join(directory, "synthetic_{}x{}.png".format(*resolution))
+    with open(png, "wb") as f:
+        f.write(png_bytes(*resolution))
+    media["png"] = png
+
+    return media
+
+
+def measure(fn, repeat):
+    """
+    Runs fn repeat times, returns the wall times in seconds.
+    """
+
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+class Benchmark:
+    """
+    Runs the pipeline stages and collects their timings.
+    """
+
+    def __init__(
+        self,
+        template_path=default_template,
+        resources_path=default_resources,
+        data_path=default_data,
+        work_dir="",
+        repeat=5,
+        browser=False,
+        real_tools=False,
+        log=None
+    ):
+        self.template_path = template_path
+        self.resources_path = resources_path
+        self.repeat = repeat
+        self.browser = browser
+        self.real_tools = real_tools
+        self.log = log or logging.getLogger("SlateCreator.benchmark")
+        self.results = []
+
+        with open(data_path, "r") as f:
+            self.data = json.load(f)
+        self.data["thumbnail"] = os.path.join(
+            resources_path,
+            "thumbnail_placeholder.jpg"
+        )
+
+        self._own_work_dir = not work_dir
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="slate_bench_")
+        self.staging_dir = os.path.join(self.work_dir, "staging")
+        self.tools_dir = ""
+        if not real_tools:
+            self.tools_dir = write_stub_tools(
+                os.path.join(self.work_dir, "tools")
+            )
+
+        if browser:
+            from .render_pool import RenderPool
+            self.render_pool = RenderPool(size=1)
+        else:
+            self.render_pool = StubRenderPool()
+
+    def slate(self, data=None):
+        slate = SlateCreator(
+            staging_dir=self.staging_dir,
+            template_path=self.template_path,
+            resources_path=self.resources_path,
+            data=dict(self.data, **(data or {})),
+            render_pool=self.render_pool,
+            log=logging.getLogger("SlateCreator.benchmark.slate")
+        )
+        if self.tools_dir:
+            slate.env = dict(
+                slate.env,
+                PATH=self.tools_dir + os.pathsep + slate.env.get("PATH", "")
+            )
+        return slate
+
+    def record(self, stage, resolution, batch_size, fn, skip=""):
+        entry = {
+            "stage": stage,
+            "resolution": "{}x{}".format(*resolution),
+            "batch_size": batch_size,
+            "repeat": self.repeat,
+        }
+        if skip:
+            entry["skipped"] = skip
+        else:
+            try:
+                fn()  # warm up, not measured
+                times = measure(fn, self.repeat)
+            except Exception as err:
+                entry["error"] = "{}: {}".format(type(err).__name__, err)
+            else:
+                entry.update({
+                    "min": min(times),
+                    "median": statistics.median(times),
+                    "mean": statistics.mean(times),
+                    "max": max(times),
+                    "per_item": statistics.median(times) / batch_size,
+                })
+        self.results.append(entry)
+        self.log.info("{stage:>22} {resolution:>10} x{batch_size:<4} {0}".format(
+            entry.get("skipped") or entry.get("error") or "{:10.6f}s".format(
+                entry["median"]
+            ),
+            **entry
+        ))
+        return entry
+
+    def run_resolution(self, resolution, batch_size):
+        width, height = resolution
+        media = write_media(
+            os.path.join(self.work_dir, "media"),
+            resolution
+        )
+        slates = [
+            self.slate({
+                "resolution_width": width,
+                "resolution_height": height,
+                "comment": "benchmark {}".format(i),
+            })
+            for i in range(batch_size)
+        ]
+        first = slates[0]
+        outputs = os.path.join(self.work_dir, "out")
+        os.makedirs(outputs, exist_ok=True)
+        no_tools = "" if self.tools_dir or self.real_tools else "no tools"
+        no_exr = "" if "exr" in media else "numpy missing"
+
+        def _read_cold():
+            for slate in slates:
+                template_cache.clear()
+                slate.read_template()
+
+        def _read_warm():
+            for slate in slates:
+                slate.read_template()
+
+        def _compute():
+            for slate in slates:
+                slate.compute_template()
+
+        def _rasterize(use_cache, backend="browser"):
+            def _fn():
+                for i, slate in enumerate(slates):
+                    slate.render_backend = backend
+                    try:
+                        slate.render_slate(
+                            slate_specifier="_{:04d}".format(i),
+                            use_cache=use_cache
+                        )
+                    finally:
+                        slate.render_backend = "browser"
+            return _fn
+
+        def _probe(kind, native, use_cache):
+            def _fn():
+                for slate in slates:
+                    slate.probe(media[kind], native=native, use_cache=use_cache)
+            return _fn
+
+        rendered = [
+            slate.render_slate(slate_specifier="_{:04d}".format(i))[0]
+            for i, slate in enumerate(slates)
+        ]
+
+        def _convert(backend, ext):
+            def _fn():
+                for i, slate in enumerate(slates):
+                    slate.convert_backend = backend
+                    slate.convert_slate(
+                        rendered[i],
+                        os.path.join(outputs, "slate_{:04d}{}".format(i, ext))
+                    )
+            return _fn
+
+        def _batch():
+            first.convert_backend = "oiio"
+            jobs = [
+                (
+                    {"comment": "batch {}".format(i)},
+                    media["movie"],
+                    os.path.join(outputs, "batch_{:04d}.exr".format(i))
+                )
+                for i in range(batch_size)
+            ]
+            for res in first.render_batch(jobs):
+                if not res.ok:
+                    raise res.error
+
+        numpy_skip = ""
+        if color.np is None or color.Image is None:
+            numpy_skip = "numpy or Pillow missing"
+        raster_skip = numpy_skip
+        if not raster_skip and first.get_layout() is None:
+            raster_skip = "no layout"
+
+        self.record("read_template_cold", resolution, batch_size, _read_cold)
+        self.record("read_template", resolution, batch_size, _read_warm)
+        self.record("compute_template", resolution, batch_size, _compute)
+        self.record(
+            "rasterize",
+            resolution,
+            batch_size,
+            _rasterize(False)
+        )
+        self.record(
+            "rasterize_cached",
+            resolution,
+            batch_size,
+            _rasterize(True)
+        )
+        self.record(
+            "rasterize_native",
+            resolution,
+            batch_size,
+            _rasterize(False, backend="raster"),
+            skip=raster_skip
+        )
+        self.record(
+            "probe_native_exr",
+            resolution,
+            batch_size,
+            _probe("exr", True, False),
+            skip=no_exr
+        )
+        self.record(
+            "probe_iinfo",
+            resolution,
+            batch_size,
+            _probe("exr", False, False),
+            skip=no_exr or no_tools
+        )
+        self.record(
+            "probe_ffprobe",
+            resolution,
+            batch_size,
+            _probe("movie", True, False),
+            skip=no_tools
+        )
+        self.record(
+            "probe_cached",
+            resolution,
+            batch_size,
+            _probe("movie", True, True),
+            skip=no_tools
+        )
+        self.record(
+            "convert_oiio",
+            resolution,
+            batch_size,
+            _convert("oiio", ".exr"),
+            skip=no_tools
+        )
+        self.record(
+            "convert_numpy",
+            resolution,
+            batch_size,
+            _convert("numpy", ".exr"),
+            skip=numpy_skip
+        )
+        self.record(
+            "batch",
+            resolution,
+            batch_size,
+            _batch,
+            skip=no_tools
+        )
+
+    def run(self, resolutions, batch_sizes):
+        for resolution in resolutions:
+            for batch_size in batch_sizes:
+                self.run_resolution(resolution, batch_size)
+        return self.report()
+
+    def report(self):
+        return {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "template": os.path.basename(self.template_path),
+            "repeat": self.repeat,
+            "browser": self.browser,
+            "real_tools": self.real_tools,
+            "results": self.results,
+        }
+
+    def close(self):
+        self.render_pool.close()
+        if self._own_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def compare(report, baseline):
+    """
+    Returns the median time ratio of every stage measured in
+    both reports, above 1 means slower than the baseline.
+    """
+
+    def _key(entry):
+        return (entry["stage"], entry["resolution"], entry["batch_size"])
+
+    base = {
+        _key(entry): entry for entry in baseline.get("results", [])
+        if "median" in entry
+    }
+    ratios = []
+    for entry in report.get("results", []):
+        old = base.get(_key(entry))
+        if old is None or "median" not in entry or not old["median"]:
+            continue
+        ratios.append(dict(
+            zip(("stage", "resolution", "batch_size"), _key(entry)),
+            ratio=entry["median"] / old["median"]
+        ))
+    return ratios
+
+
+def _resolution(value):
+    try:
+        width, height = value.lower().split("x")
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "Resolution must look like 1920x1080, got '{}'".format(value)
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m SlateCreator.benchmark",
+        description="Times the slate pipeline stages."
+    )
+    parser.add_argument(
+        "-r", "--resolutions", nargs="+", type=_resolution,
+        default=[(1920, 1080), (3840, 2160)]
+    )
+    parser.add_argument(
+        "-b", "--batch-sizes", nargs="+", type=int, default=[1, 8]
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=5)
+    parser.add_argument("-o", "--output", default="")
+    parser.add_argument("--label", default="",
+        help="release or commit the results belong to")
+    parser.add_argument("--template", default=default_template)
+    parser.add_argument("--resources", default=default_resources)
+    parser.add_argument("--data", default=default_data)
+    parser.add_argument("--compare", default="",
+        help="results file of a previous run to compare against")
+    parser.add_argument("--work-dir", default="",
+        help="keep staging and media here instead of a temp dir")
+    parser.add_argument("--browser", action="store_true",
+        help="rasterize with a real headless browser")
+    parser.add_argument("--real-tools", action="store_true",
+        help="use oiio and ffmpeg tools from PATH instead of stubs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("SlateCreator.benchmark").setLevel(logging.INFO)
+
+    if not args.real_tools and platform.system().lower() == "windows":
+        parser.error("Stub tools need a posix shell, use --real-tools.")
+
+    bench = Benchmark(
+        template_path=args.template,
+        resources_path=args.resources,
+        data_path=args.data,
+        work_dir=args.work_dir,
+        repeat=args.repeat,
+        browser=args.browser,
+        real_tools=args.real_tools
+    )
+    try:
+        report = bench.run(args.resolutions, args.batch_sizes)
+    finally:
+        bench.close()
+    report["label"] = args.label
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        report["baseline"] = baseline.get("label", "")
+        report["comparison"] = compare(report, baseline)
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import re
+import base64
+import mimetypes
+
+
+_css_url_regex = re.compile(
+    r"url\(\s*(['\"]?)([^'\")]*)\1\s*\)"
+)
+_css_import_regex = re.compile(
+    r"@import\s+(['\"])([^'\"]+)\1"
+)
+_url_scheme_regex = re.compile(
+    r"^[a-zA-Z][a-zA-Z0-9+.-]+:"
+)
+
+# types mimetypes doesn't know on every platform
+_mime_types = {
+    ".css": "text/css",
+    ".svg": "image/svg+xml",
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+    ".ttf": "font/ttf",
+    ".otf": "font/otf",
+    ".webp": "image/webp",
+}
+
+
+def mime_type(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in _mime_types:
+        return _mime_types[ext]
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def data_uri(mime, data):
+    return "data:{};base64,{}".format(
+        mime,
+        base64.b64encode(data).decode("ascii")
+    )
+
+
+def _is_local(path):
+    return (
+        path
+        and not path.startswith("#")
+        and _url_scheme_regex.match(path) is None
+    )
+
+
+def bundle_css(path, dependencies, _seen=()):
+    """
+    Returns the css at path with every url() and @import
+    resolved relative to it and embedded as data uri, so
+    the stylesheet is self contained. Embedded files are
+    added to dependencies.
+    """
+
+    with open(path, "r", encoding="utf-8") as f:
+        css = f.read()
+    base = os.path.dirname(path)
+    seen = tuple(_seen) + (path,)
+
+    def _embed(ref, stylesheet=False):
+        if not _is_local(ref):
+            return None
+        file = os.path.normpath(os.path.join(base, ref.split("?")[0]))
+        if file in seen or not os.path.isfile(file):
+            return None
+        if stylesheet or file.lower().endswith(".css"):
+            return bundle_uri(file, dependencies, seen)
+        return bundle_uri(file, dependencies)
+
+    def _import(m):
+        uri = _embed(m.group(2), stylesheet=True)
+        if uri is None:
+            return m.group(0)
+        return "@import url(\"{}\")".format(uri)
+
+    def _url(m):
+        uri = _embed(m.group(2))
+        if uri is None:
+            return m.group(0)
+        return "url(\"{}\")".format(uri)
+
+    css = _css_import_regex.sub(_import, css)
+    return _css_url_regex.sub(_url, css)
+
+
+def bundle_uri(path, dependencies, _seen=()):
+    """
+    Reads a resource file and returns it as a data uri,
+    stylesheets get their own references embedded first.
+    The path is added to dependencies.
+    """
+
+    dependencies[path] = None
+    mime = mime_type(path)
+    if mime == "text/css":
+        data = bundle_css(path, dependencies, _seen).encode("utf-8")
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+    return data_uri(mime, data)
@@ -0,0 +1,370 @@
+import io
+import os
+import json
+import string
+import tempfile
+import subprocess
+from .sequence import is_sequence, frame_token_printf
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# characters available to the default per frame fields
+default_charsets = {
+    "timecode": string.digits + ":;",
+    "frame": string.digits + "-",
+}
+
+# Lays every glyph a field can show out on its own row, styled
+# like the field, and hides everything else. Returns, for every
+# field instance, where its text starts and the box of each
+# glyph in the page so a single capture holds all of them.
+_glyphs_script = """
+(function (charsets, pad) {
+    var props = [
+        "fontFamily", "fontSize", "fontWeight", "fontStyle",
+        "fontStretch", "fontVariantNumeric", "fontFeatureSettings",
+        "fontKerning", "letterSpacing", "color", "textShadow",
+        "webkitTextStroke"
+    ];
+    var atlas = document.createElement("div");
+    atlas.style.cssText = "position:fixed;left:0;top:0;margin:0;" +
+        "padding:0;visibility:visible;white-space:pre;";
+    var rows = [];
+    Object.keys(charsets).forEach(function (name) {
+        var query = "[data-burnin=\\"" + name + "\\"]";
+        document.querySelectorAll(query).forEach(function (el) {
+            var style = getComputedStyle(el);
+            var row = document.createElement("div");
+            row.style.cssText = "display:block;padding:" + pad + "px 0;";
+            props.forEach(function (p) { row.style[p] = style[p]; });
+            var glyphs = Array.from(charsets[name]).map(function (c) {
+                var g = document.createElement("span");
+                g.textContent = c;
+                g.style.padding = "0 " + pad + "px";
+                row.appendChild(g);
+                return [c, g];
+            });
+            atlas.appendChild(row);
+            rows.push([
+                name,
+                el.getBoundingClientRect(),
+                getComputedStyle(el.parentElement).textAlign,
+                glyphs
+            ]);
+        });
+    });
+    document.body.style.visibility = "hidden";
+    document.body.appendChild(atlas);
+    var layout = {};
+    rows.forEach(function (row) {
+        var glyphs = {};
+        row[3].forEach(function (g) {
+            var b = g[1].getBoundingClientRect();
+            glyphs[g[0]] = [b.left, b.top, b.width, b.height];
+        });
+        (layout[row[0]] = layout[row[0]] || []).push({
+            x: row[1].left,
+            y: row[1].top,
+            align: row[2],
+            glyphs: glyphs
+        });
+    });
+    return layout;
+})(%s, %d)
+"""
+
+
+def _require():
+    if Image is None:
+        raise ImportError("Pillow is needed to composite burn-ins.")
+
+
+def field_marker(field):
+    """
+    Html standing in for a per frame field while the
+    layers are rendered.
+    """
+
+    return "<span data-burnin=\"{}\"></span>".format(field)
+
+
+class BurninField:
+    """
+    One instance of a per frame field in the overlay: where
+    its text starts, how it is aligned and the glyph sprites
+    it is drawn with.
+    """
+
+    __slots__ = ("name", "x", "y", "align", "glyphs", "advances", "pad")
+
+    def __init__(self, name, x, y, align, glyphs, advances, pad):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.align = align
+        self.glyphs = glyphs
+        self.advances = advances
+        self.pad = pad
+
+    def boxes(self, text):
+        """
+        Yields (sprite, left, top) for every character of
+        text, laid out from the field position.
+        """
+
+        try:
+            width = sum(self.advances[c] for c in text)
+        except KeyError as err:
+            raise ValueError(
+                "Character {} of '{}' is not in the '{}' charset".format(
+                    err, text, self.name
+                )
+            ) from None
+
+        pen = self.x
+        if self.align in ("right", "end"):
+            pen -= width
+        elif self.align == "center":
+            pen -= width / 2.0
+
+        for c in text:
+            yield (
+                self.glyphs[c],
+                int(round(pen)) - self.pad,
+                int(round(self.y)) - self.pad
+            )
+            pen += self.advances[c]
+
+
+class BurninRenderer:
+    """
+    Renders burn-in overlays frame by frame.
+
+    The overlay html is rendered once as a transparent static
+    layer, with every per frame field left empty, and once as
+    a glyph atlas holding each character those fields can
+    show in their own computed style. Frames are then made by
+    pasting glyphs on the static layer, the browser is never
+    involved again. Per frame fields should sit in their own
+    element, their text doesn't push the static content.
+
+    example:
+        renderer = BurninRenderer(html, (1920, 1080), pool)
+        for image in renderer.frames(values):
+            ...
+    """
+
+    def __init__(
+        self,
+        html_str,
+        size,
+        render_pool,
+        charsets=None,
+        pad=4
+    ):
+        _require()
+        self.html = html_str
+        self.size = (int(size[0]), int(size[1]))
+        self.render_pool = render_pool
+        self.charsets = dict(charsets or default_charsets)
+        self.pad = pad
+        self.static = None
+        self.fields = []
+
+    def prepare(self):
+        """
+        Renders static layer and glyph atlas from a single
+        page load, skipped if already done.
+        """
+
+        if self.static is not None:
+            return
+
+        expression = _glyphs_script % (json.dumps(self.charsets), self.pad)
+        with self.render_pool.acquire() as worker:
+            worker.set_viewport(self.size)
+            worker.set_transparent(True)
+            try:
+                worker.load(self.html)
+                static = worker.capture(self.size)
+                layout = worker.evaluate(expression)
+                atlas = worker.capture(self.size)
+            finally:
+                worker.set_transparent(False)
+
+        self.static = Image.open(io.BytesIO(static)).convert("RGBA")
+        atlas = Image.open(io.BytesIO(atlas)).convert("RGBA")
+
+        self.fields = []
+        for name, instances in (layout or {}).items():
+            for item in instances:
+                glyphs = {}
+                advances = {}
+                for c, (x, y, w, h) in item["glyphs"].items():
+                    glyphs[c] = atlas.crop((
+                        int(round(x)),
+                        int(round(y)) - self.pad,
+                        int(round(x + w)),
+                        int(round(y + h)) + self.pad
+                    ))
+                    advances[c] = w - 2 * self.pad
+                self.fields.append(BurninField(
+                    name,
+                    item["x"],
+                    item["y"],
+                    item["align"],
+                    glyphs,
+                    advances,
+                    self.pad
+                ))
+
+    def _draw(self, image, values):
+        boxes = []
+        for field in self.fields:
+            text = str(values.get(field.name, ""))
+            for sprite, left, top in field.boxes(text):
+                if left < 0 or top < 0:
+                    sprite = sprite.crop((
+                        max(-left, 0),
+                        max(-top, 0),
+                        sprite.width,
+                        sprite.height
+                    ))
+                    left, top = max(left, 0), max(top, 0)
+                image.alpha_composite(sprite, (left, top))
+                boxes.append((
+                    left,
+                    top,
+                    left + sprite.width,
+                    top + sprite.height
+                ))
+        return boxes
+
+    def frames(self, values):
+        """
+        Yields an RGBA image for every dict of field values.
+        The same image is drawn over for every frame, only the
+        text of the previous frame gets restored from the
+        static layer, copy it if it has to outlive the loop.
+        """
+
+        self.prepare()
+        image = self.static.copy()
+        damaged = []
+        for frame_values in values:
+            for box in damaged:
+                image.paste(self.static.crop(box), box[:2])
+            damaged = self._draw(image, frame_values)
+            yield image
+
+    def frame(self, values):
+        """
+        Returns a new RGBA image for a single dict of values.
+        """
+
+        self.prepare()
+        image = self.static.copy()
+        self._draw(image, values)
+        return image
+
+
+def burnin_command(
+    output,
+    size,
+    fps,
+    out_args=(),
+    plate="",
+    plate_frame=0,
+    exec_ext=""
+):
+    """
+    Builds the ffmpeg command reading raw RGBA burn-in
+    frames on stdin and encoding them to output. With a
+    plate, a movie or sequence pattern, the frames get
+    composited over the plate frames instead, starting at
+    plate_frame (a frame number of sequences, an index
+    from the first frame of movies), and plate audio is kept.
+    """
+
+    cmd = ["ffmpeg{}".format(exec_ext), "-v", "error", "-y"]
+    if plate:
+        if os.path.splitext(plate)[1].lower() == ".exr":
+            # exr decodes to linear, bring it to display like slates
+            cmd.extend(["-apply_trc", "iec61966_2_1"])
+        if is_sequence(plate):
+            cmd.extend([
+                "-f", "image2",
+                "-framerate", str(fps),
+                "-start_number", str(int(plate_frame)),
+                "-i", frame_token_printf(plate)
+            ])
+        else:
+            if plate_frame:
+                cmd.extend(["-ss", "{:.6f}".format(
+                    plate_frame / float(fps)
+                )])
+            cmd.extend(["-i", plate])
+    cmd.extend([
+        "-f", "rawvideo",
+        "-pix_fmt", "rgba",
+        "-s", "{}x{}".format(int(size[0]), int(size[1])),
+        "-r", str(fps),
+        "-i", "pipe:0"
+    ])
+    if plate:
+        cmd.extend([
+            "-filter_complex",
+            "[0:v][1:v]overlay=format=auto:shortest=1[v]",
+            "-map", "[v]",
+            "-map", "0:a?",
+            "-shortest"
+        ])
+    cmd.extend(out_args)
+    cmd.append(output)
+    return cmd
+
+
+def write_frames(cmd, images, env=None):
+    """
+    Streams images to a command stdin as raw frames,
+    one at a time. stderr goes to a temporary file, a pipe
+    nobody reads while frames are written would fill up
+    and block the encoder. If images raises, the command
+    gets killed. Returns the completed process.
+    """
+
+    with tempfile.TemporaryFile() as errors:
+        proc = subprocess.Popen(
+            cmd,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=errors
+        )
+        try:
+            try:
+                for image in images:
+                    proc.stdin.write(image.tobytes())
+            except BrokenPipeError:
+                # the command quit early, its stderr says why
+                pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+            proc.wait()
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        errors.seek(0)
+        stderr = errors.read()
+
+    res = subprocess.CompletedProcess(cmd, proc.returncode, b"", stderr)
+    res.check_returncode()
+    return res
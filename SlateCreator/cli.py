@@ -0,0 +1,543 @@
+"""
+Renders slates for every job of a json lines manifest.
+
+Each manifest line is a job, all keys optional:
+    {"id": "sh010", "data": {...}, "input": "sh010.mov",
+     "output": "sh010_slate.exr", "out_args": [...],
+     "template": "...", "resources": "..."}
+data gets merged on top of the --data file, template and
+resources default to the command line ones. Jobs are sharded
+across worker processes, each running them through
+SlateCreator.render_batch, and every finished job is appended
+to a journal. Run the same command again and jobs whose output
+is still the one journaled are skipped, so a killed batch picks
+up where it stopped. Changing the template, its layout, the env
+or the backends renders every job again. Manifest lines that
+are not valid jobs get journaled as failed, the others still run.
+
+example:
+    python -m SlateCreator dailies.jsonl -t generic_slate.html \\
+        -d show.json -j 4 --browsers 2
+    cat jobs.jsonl | python -m SlateCreator - -t slate.html \\
+        --journal jobs.journal
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import hashlib
+import logging
+import argparse
+import multiprocessing
+from .SlateCreator import SlateCreator
+from .render_pool import RenderPool
+from .raster import layout_path
+
+
+log = logging.getLogger("SlateCreator.cli")
+
+_job_keys = ("data", "input", "output", "out_args", "template", "resources")
+
+_job_types = {
+    "id": (str, int),
+    "data": dict,
+    "input": str,
+    "output": str,
+    "out_args": list,
+    "template": str,
+    "resources": str,
+}
+
+# options changing what a job renders, part of its key
+_key_options = ("env", "render_backend", "convert_backend", "inline_resources")
+
+
+def check_job(job):
+    """
+    Returns why job is not a valid manifest job,
+    None if it is.
+    """
+
+    if not isinstance(job, dict):
+        return "not a json object"
+    for key, types in _job_types.items():
+        if key in job and job[key] is not None and (
+            not isinstance(job[key], types) or isinstance(job[key], bool)
+        ):
+            return "'{}' is a {}".format(key, type(job[key]).__name__)
+    if any(not isinstance(a, str) for a in job.get("out_args") or ()):
+        return "'out_args' holds non string values"
+    return None
+
+
+def read_manifest(stream):
+    """
+    Yields (line number, job, error) for every line of a
+    json lines stream, blank and # lines are skipped.
+    Lines that don't parse or don't hold a valid job come
+    with the line text as job and the reason as error,
+    so a bad line fails alone instead of the whole run.
+    """
+
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError as err:
+            yield number, line, "invalid json: {}".format(err)
+            continue
+        error = check_job(job)
+        if error is not None:
+            yield number, line, error
+            continue
+        yield number, job, None
+
+
+def job_key(job, defaults=None, settings=None):
+    """
+    Identifies a job by the hash of everything that ends up
+    in its output: its own fields on top of defaults, its
+    data merged on top of the default data like it renders, plus
+    settings like env, backends and template file stamps.
+    The same job gets the same key across runs while none
+    of them change.
+    """
+
+    defaults = defaults or {}
+    job = dict(defaults, **{k: job[k] for k in _job_keys if k in job})
+    # job data renders on top of the shared data, key both
+    job["data"] = dict(defaults.get("data") or {}, **(job.get("data") or {}))
+    job["settings"] = settings or {}
+    text = json.dumps(job, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class Journal:
+    """
+    Append only json lines record of finished jobs.
+
+    Every done job is written as soon as it finishes with its
+    key and the size and mtime of its output. A job counts as
+    complete only while that output is still on disk unchanged,
+    a truncated last line left by a killed run is ignored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.isfile(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict) and "key" in entry:
+                        self.entries[entry["key"]] = entry
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a")
+
+    def is_done(self, key):
+        entry = self.entries.get(key)
+        if entry is None or not entry.get("ok"):
+            return False
+        stamp = _file_stamp(entry.get("output") or "")
+        return stamp is not None and stamp[0] > 0 and (
+            list(stamp) == [entry.get("size"), entry.get("mtime_ns")]
+        )
+
+    def record(self, entry):
+        self.entries[entry["key"]] = entry
+        self._file.write(json.dumps(entry, default=str) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+def _creator(options, template, resources, shard, render_pool):
+    slate = SlateCreator(
+        staging_dir=options["staging_dir"],
+        staging_subfolder="shard_{:02d}".format(shard),
+        template_path=template,
+        resources_path=resources,
+        data=options["data"],
+        env=options["env"],
+        render_pool=render_pool,
+        inline_resources=options["inline_resources"]
+    )
+    slate.render_backend = options["render_backend"]
+    slate.convert_backend = options["convert_backend"]
+    return slate
+
+
+def _batch_job(key, job):
+    return {
+        "name": key[:16],
+        "data": job.get("data"),
+        "input": job.get("input", ""),
+        "output": job.get("output", ""),
+        "out_args": job.get("out_args"),
+    }
+
+
+def _run_chunk(options, shard, chunk, creators, render_pool, results):
+    groups = {}
+    for key, job in chunk:
+        template = job.get("template") or options["template"]
+        resources = job.get("resources") or options["resources"]
+        groups.setdefault((template, resources), []).append((key, job))
+
+    for (template, resources), items in groups.items():
+        try:
+            slate = creators.get((template, resources))
+            if slate is None:
+                slate = creators[(template, resources)] = _creator(
+                    options, template, resources, shard, render_pool
+                )
+        except Exception as err:
+            for key, job in items:
+                results.put({
+                    "key": key,
+                    "id": job.get("id"),
+                    "ok": False,
+                    "stage": "template",
+                    "error": "{}: {}".format(type(err).__name__, err),
+                })
+            continue
+
+        def _done(result):
+            key, job = items[result.index]
+            entry = {
+                "key": key,
+                "id": job.get("id"),
+                "ok": result.ok,
+                "output": result.output,
+                "stage": result.stage,
+            }
+            if result.ok:
+                stamp = _file_stamp(result.output)
+                entry["size"], entry["mtime_ns"] = stamp or (None, None)
+            else:
+                entry["error"] = "{}: {}".format(
+                    type(result.error).__name__, result.error
+                )
+            results.put(entry)
+
+        slate.render_batch(
+            [_batch_job(key, job) for key, job in items],
+            callback=_done
+        )
+
+
+def _worker(shard, options, jobs, results):
+    """
+    Worker process loop, renders jobs of its shard in
+    chunks until it gets None.
+    """
+
+    logging.basicConfig(level=options["log_level"])
+
+    render_pool = None
+    if options["browsers"]:
+        render_pool = RenderPool(size=options["browsers"])
+
+    creators = {}
+    try:
+        parent = multiprocessing.parent_process()
+        done = False
+        while not done:
+            try:
+                item = jobs.get(timeout=1.0)
+            except queue.Empty:
+                # the driver got killed, nobody is left to feed us
+                if parent is not None and not parent.is_alive():
+                    break
+                continue
+            if item is None:
+                break
+            chunk = [item]
+            while len(chunk) < options["chunk_size"]:
+                try:
+                    item = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                chunk.append(item)
+            _run_chunk(options, shard, chunk, creators, render_pool, results)
+    finally:
+        if render_pool is not None:
+            render_pool.close()
+
+
+class Driver:
+    """
+    Feeds manifest jobs to worker processes round robin,
+    one shard each, and journals their results as they come.
+    """
+
+    def __init__(self, options, workers=1, journal=None, resume=True):
+        self.options = options
+        self.workers = max(1, workers)
+        self.journal = journal
+        self.resume = resume and journal is not None
+        self.submitted = 0
+        self.skipped = 0
+        self.received = 0
+        self.rendered = 0
+        self.failed = 0
+        self.invalid = 0
+        self._stamps = {}
+
+    def _handle(self, entry):
+        self.received += 1
+        if not entry["ok"]:
+            self.failed += 1
+            log.error("Job {} failed at {}: {}".format(
+                entry.get("id") or entry["key"][:12],
+                entry.get("stage"),
+                entry.get("error")
+            ))
+        else:
+            self.rendered += 1
+            log.info("Job {} done: {}".format(
+                entry.get("id") or entry["key"][:12],
+                entry.get("output")
+            ))
+        entry["time"] = time.time()
+        if self.journal is not None:
+            self.journal.record(entry)
+
+    def _invalid(self, number, line, error):
+        self.invalid += 1
+        self.failed += 1
+        log.error("Manifest line {} skipped: {}".format(number, error))
+        if self.journal is not None:
+            self.journal.record({
+                "key": hashlib.sha1(line.encode("utf-8")).hexdigest(),
+                "line": number,
+                "ok": False,
+                "stage": "manifest",
+                "error": error,
+                "time": time.time(),
+            })
+
+    def _key(self, job, defaults):
+        """
+        Returns the job key, stamps of the template and
+        its raster layout are part of it so editing them
+        renders the job again.
+        """
+
+        template = job.get("template") or defaults["template"]
+        stamps = self._stamps.get(template)
+        if stamps is None:
+            stamps = self._stamps[template] = (
+                _file_stamp(template),
+                _file_stamp(layout_path(template))
+            )
+        settings = {k: self.options.get(k) for k in _key_options}
+        settings["template_stamps"] = stamps
+        return job_key(job, defaults, settings)
+
+    def _drain(self, results, block=False, timeout=1.0):
+        while True:
+            try:
+                entry = results.get(block, timeout)
+            except queue.Empty:
+                return
+            self._handle(entry)
+            block = False
+
+    def run(self, manifest):
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        # bounded, so a huge manifest is read as workers go
+        job_queues = [
+            ctx.Queue(maxsize=self.options["chunk_size"] * 2)
+            for _ in range(self.workers)
+        ]
+        processes = [
+            ctx.Process(
+                target=_worker,
+                args=(shard, self.options, job_queues[shard], results),
+                name="slate_shard_{:02d}".format(shard),
+                daemon=True
+            )
+            for shard in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        defaults = {
+            "template": self.options["template"],
+            "resources": self.options["resources"],
+            "data": self.options["data"],
+        }
+        try:
+            for number, job, error in manifest:
+                if error is not None:
+                    self._invalid(number, job, error)
+                    continue
+                key = self._key(job, defaults)
+                if self.resume and self.journal.is_done(key):
+                    self.skipped += 1
+                    continue
+                shard = job_queues[self.submitted % self.workers]
+                while True:
+                    try:
+                        shard.put((key, job), timeout=0.5)
+                        break
+                    except queue.Full:
+                        self._drain(results)
+                self.submitted += 1
+                self._drain(results)
+
+            for shard in job_queues:
+                shard.put(None)
+
+            while self.received < self.submitted:
+                self._drain(results, block=True)
+                if self.received < self.submitted and not any(
+                    p.is_alive() for p in processes
+                ):
+                    self._drain(results)
+                    break
+        except BaseException:
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+
+        lost = self.submitted - self.received
+        if lost:
+            self.failed += lost
+            log.error("{} jobs got no result, workers died".format(lost))
+
+        return self.failed == 0
+
+
+def env_item(value):
+    """
+    Parses a KEY=VALUE command line argument.
+    """
+
+    key, sep, item = value.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(
+            "Expected KEY=VALUE, got '{}'".format(value)
+        )
+    return key, item
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m SlateCreator",
+        description="Renders slates for every job of a json lines manifest."
+    )
+    parser.add_argument("manifest",
+        help="json lines manifest, - reads stdin")
+    parser.add_argument("-t", "--template", required=True)
+    parser.add_argument("-r", "--resources", default="",
+        help="defaults to the template directory")
+    parser.add_argument("-d", "--data", default="",
+        help="json file of data shared by every job")
+    parser.add_argument("-s", "--staging-dir", default="staging")
+    parser.add_argument("-j", "--workers", type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="worker processes, each renders its own shard")
+    parser.add_argument("--browsers", type=int, default=1,
+        help="warm browsers per worker, 0 starts one per slate")
+    parser.add_argument("--chunk-size", type=int, default=8,
+        help="jobs a worker pipelines at once")
+    parser.add_argument("--journal", default="",
+        help="progress journal, defaults to <manifest>.journal")
+    parser.add_argument("--no-resume", action="store_true",
+        help="render every job even if journaled as done")
+    parser.add_argument("--env", type=env_item, action="append",
+        default=[], metavar="KEY=VALUE",
+        help="tool environment, PATH like values get appended")
+    parser.add_argument("--render-backend", default="browser",
+        choices=("browser", "raster", "auto"))
+    parser.add_argument("--convert-backend", default="oiio",
+        choices=("oiio", "numpy"))
+    parser.add_argument("--inline-resources", action="store_true",
+        help="bundle template resources in the rendered page")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    log_level = logging.DEBUG if args.verbose else logging.WARNING
+    logging.basicConfig(level=log_level)
+    log.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    data = {}
+    if args.data:
+        with open(args.data, "r") as f:
+            data = json.load(f)
+
+    template = os.path.abspath(args.template)
+    options = {
+        "template": template,
+        "resources": os.path.abspath(
+            args.resources or os.path.dirname(template)
+        ),
+        "data": data,
+        "env": dict(args.env),
+        "staging_dir": os.path.abspath(args.staging_dir),
+        "browsers": 0 if args.render_backend == "raster" else args.browsers,
+        "chunk_size": max(1, args.chunk_size),
+        "render_backend": args.render_backend,
+        "convert_backend": args.convert_backend,
+        "inline_resources": args.inline_resources,
+        "log_level": log_level,
+    }
+
+    journal_path = args.journal
+    if not journal_path and args.manifest != "-":
+        journal_path = args.manifest + ".journal"
+    journal = Journal(journal_path) if journal_path else None
+
+    driver = Driver(
+        options,
+        workers=args.workers,
+        journal=journal,
+        resume=not args.no_resume
+    )
+    stream = sys.stdin if args.manifest == "-" else open(args.manifest, "r")
+    try:
+        ok = driver.run(read_manifest(stream))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if journal is not None:
+            journal.close()
+
+    log.info("{} jobs rendered, {} failed, {} invalid, {} already done".format(
+        driver.rendered,
+        driver.failed - driver.invalid,
+        driver.invalid,
+        driver.skipped
+    ))
+
+    return 0 if ok else 1
@@ -0,0 +1,261 @@
+import io
+import zlib
+import struct
+import functools
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+# linear Rec.709/sRGB primaries (D65) to target primaries,
+# chromatic adaptation to D60 done with Bradford
+target_matrices = {
+    "linear": None,
+    "acescg": (
+        (0.6130974024, 0.3395231462, 0.0473794514),
+        (0.0701937225, 0.9163538791, 0.0134523985),
+        (0.0206155929, 0.1095697729, 0.8698146342),
+    ),
+    "aces2065-1": (
+        (0.4397010, 0.3829780, 0.1773350),
+        (0.0897923, 0.8134230, 0.0967616),
+        (0.0175440, 0.1115440, 0.8707040),
+    ),
+}
+
+source_curves = (
+    "srgb",
+    "rec709",
+    "linear",
+)
+
+exr_magic = 20000630
+exr_compressions = {
+    "none": (0, 1),
+    "zips": (2, 1),
+    "zip": (3, 16),
+}
+exr_pixel_types = {
+    "half": 1,
+    "float": 2,
+}
+
+
+def _require():
+    if np is None:
+        raise ImportError(
+            "numpy is needed for in process color conversion."
+        )
+
+
+def _decode_curve(name, v):
+    if name == "srgb":
+        return np.where(
+            v <= 0.04045,
+            v / 12.92,
+            ((v + 0.055) / 1.055) ** 2.4
+        )
+    if name == "rec709":
+        return np.where(
+            v < 0.081,
+            v / 4.5,
+            ((v + 0.099) / 1.099) ** (1 / 0.45)
+        )
+    if name == "linear":
+        return v
+    raise ValueError(
+        "Unknown source colorspace '{}', use one of: {}".format(
+            name, ", ".join(source_curves)
+        )
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def lookup_table(src):
+    """
+    Returns the 256 entries 8bit code value to linear
+    float table of a source transfer curve.
+    """
+
+    _require()
+    v = np.arange(256, dtype=np.float64) / 255.0
+    lut = _decode_curve(src, v).astype(np.float32)
+    lut.flags.writeable = False
+    return lut
+
+
+def convert(rgba, src="srgb", dst="acescg"):
+    """
+    Converts 8bit RGB(A) pixels to linear float in the
+    dst primaries. Color goes through the lookup table of
+    src, then through the primaries matrix if needed.
+    Alpha is kept linear.
+    """
+
+    _require()
+    if dst not in target_matrices:
+        raise ValueError(
+            "Unknown target colorspace '{}', use one of: {}".format(
+                dst, ", ".join(target_matrices)
+            )
+        )
+
+    pixels = np.asarray(rgba)
+    if pixels.dtype != np.uint8:
+        raise ValueError("Expected 8bit pixels, got {}".format(pixels.dtype))
+
+    out = lookup_table(src)[pixels[..., :3]]
+
+    matrix = target_matrices[dst]
+    if matrix is not None:
+        out = out @ np.asarray(matrix, dtype=np.float32).T
+
+    if pixels.shape[-1] == 4:
+        alpha = pixels[..., 3:4].astype(np.float32) / 255.0
+        out = np.concatenate([out, alpha], axis=-1)
+
+    return out
+
+
+def read_image(source):
+    """
+    Reads an 8bit image from a path, encoded bytes or a
+    Pillow image to a HxWx4 uint8 array.
+    """
+
+    _require()
+    if Image is None:
+        raise ImportError("Pillow is needed to read images in process.")
+    if isinstance(source, Image.Image):
+        return np.asarray(
+            source if source.mode == "RGBA" else source.convert("RGBA")
+        )
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with Image.open(source) as img:
+        return np.asarray(img.convert("RGBA"))
+
+
+def _attribute(name, type_name, value):
+    return (
+        name.encode() + b"\0" +
+        type_name.encode() + b"\0" +
+        struct.pack("<i", len(value)) +
+        value
+    )
+
+
+def _zip_block(raw):
+    """
+    OpenEXR zip compression: bytes are split in even and
+    odd halves, delta encoded, then deflated.
+    """
+
+    data = np.frombuffer(raw, dtype=np.uint8)
+    half = (data.size + 1) // 2
+    tmp = np.empty_like(data)
+    tmp[:half] = data[0::2]
+    tmp[half:] = data[1::2]
+    delta = tmp.copy()
+    delta[1:] = (
+        tmp[1:].astype(np.int16) - tmp[:-1].astype(np.int16) + 128
+    ).astype(np.uint8)
+    packed = zlib.compress(delta.tobytes(), 6)
+    return packed if len(packed) < len(raw) else raw
+
+
+def write_exr(path, pixels, pixel_type="half", compression="zip"):
+    """
+    Writes a HxWxC float array as a scanline OpenEXR file.
+    3 channels are written as RGB, 4 as RGBA.
+    """
+
+    _require()
+    pixels = np.asarray(pixels)
+    height, width, channels = pixels.shape
+    names = "RGBA"[:channels]
+    if channels not in (3, 4):
+        raise ValueError("Expected RGB or RGBA pixels.")
+
+    compression_id, block_lines = exr_compressions[compression]
+    type_id = exr_pixel_types[pixel_type]
+    dtype = np.dtype("<f2") if pixel_type == "half" else np.dtype("<f4")
+
+    # channels are stored in alphabetical order
+    order = sorted(range(channels), key=lambda i: names[i])
+
+    chlist = b"".join(
+        names[i].encode() + b"\0" +
+        struct.pack("<iB3xii", type_id, 0, 1, 1)
+        for i in order
+    ) + b"\0"
+    window = struct.pack("<4i", 0, 0, width - 1, height - 1)
+
+    header = struct.pack("<ii", exr_magic, 2)
+    header += _attribute("channels", "chlist", chlist)
+    header += _attribute("compression", "compression",
+        struct.pack("<B", compression_id))
+    header += _attribute("dataWindow", "box2i", window)
+    header += _attribute("displayWindow", "box2i", window)
+    header += _attribute("lineOrder", "lineOrder", struct.pack("<B", 0))
+    header += _attribute("pixelAspectRatio", "float", struct.pack("<f", 1))
+    header += _attribute("screenWindowCenter", "v2f",
+        struct.pack("<2f", 0, 0))
+    header += _attribute("screenWindowWidth", "float", struct.pack("<f", 1))
+    header += b"\0"
+
+    # planar per scanline: every line holds each channel row
+    planar = np.ascontiguousarray(
+        pixels[..., order].astype(dtype).transpose(0, 2, 1)
+    )
+
+    chunks = []
+    for y in range(0, height, block_lines):
+        raw = planar[y:y + block_lines].tobytes()
+        if compression_id:
+            raw = _zip_block(raw)
+        chunks.append(struct.pack("<ii", y, len(raw)) + raw)
+
+    offset = len(header) + 8 * len(chunks)
+    table = []
+    for chunk in chunks:
+        table.append(struct.pack("<Q", offset))
+        offset += len(chunk)
+
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(b"".join(table))
+        for chunk in chunks:
+            f.write(chunk)
+
+    return path
+
+
+def convert_image(
+    source,
+    output,
+    src="srgb",
+    dst="acescg",
+    pixel_type="half",
+    compression="zip"
+):
+    """
+    Reads an 8bit image path, encoded bytes or Pillow image,
+    converts it to linear and writes it as OpenEXR.
+    Returns output.
+    """
+
+    pixels = convert(read_image(source), src=src, dst=dst)
+    return write_exr(
+        output,
+        pixels,
+        pixel_type=pixel_type,
+        compression=compression
+    )
@@ -0,0 +1,682 @@
+"""
+Long running slate server for publish hooks.
+
+Keeps the interpreter, compiled templates, caches and a pool of
+warm browsers alive between requests, which get queued and
+rendered by a few worker threads. Listens on a unix socket only
+its owner can reach or, with --http, on localhost http where
+every request needs the shared token in the X-Slate-Token
+header. Both speak the same small json api, POST bodies must be
+sent as application/json:
+    POST /render        queues a job, returns its request record,
+                        with "wait": true only once it's done
+    GET  /status/<id>   request record: status, output, error
+    GET  /health        queue and worker counts
+    POST /shutdown      stops the server
+Jobs are dicts like the cli manifest lines: data, input, output,
+out_args, template, resources, plus thumbnails to fill the
+{thumbnail*} fields from input.
+
+example:
+    python -m SlateCreator.daemon -t generic_slate.html \\
+        -d show.json --socket /tmp/slate.sock
+    from SlateCreator.daemon import render
+    render({"input": "sh010.mov", "output": "sh010.exr"},
+           socket_path="/tmp/slate.sock")
+
+    SLATE_DAEMON_TOKEN=... python -m SlateCreator.daemon \\
+        -t generic_slate.html --http --port 8765
+    render(job, host="127.0.0.1", port=8765, token="...")
+"""
+
+import os
+import hmac
+import stat
+import json
+import time
+import queue
+import socket
+import logging
+import argparse
+import itertools
+import threading
+import http.client
+import tempfile
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .SlateCreator import SlateCreator
+from .render_pool import RenderPool
+from .cli import env_item, check_job
+
+
+default_port = 8765
+socket_name = "slate_daemon.sock"
+token_header = "X-Slate-Token"
+token_env = "SLATE_DAEMON_TOKEN"
+max_body = 1 << 20
+
+_statuses = ("queued", "running", "done", "failed")
+
+
+def runtime_dir():
+    """
+    Returns a directory only the current user can reach:
+    $XDG_RUNTIME_DIR or a per user 0700 one in the temp dir.
+    Raises PermissionError if the latter is someone else's
+    or open to others.
+    """
+
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base and os.path.isdir(base):
+        return base
+    path = os.path.join(
+        tempfile.gettempdir(), "slate_daemon-{}".format(os.getuid())
+    )
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if (
+        not stat.S_ISDIR(st.st_mode) or
+        st.st_uid != os.getuid() or
+        st.st_mode & 0o077
+    ):
+        raise PermissionError(
+            "Unsafe slate daemon directory: '{}'".format(path)
+        )
+    return path
+
+
+def default_socket():
+    """
+    Returns the default socket path, in runtime_dir.
+    """
+
+    return os.path.join(runtime_dir(), socket_name)
+
+
+class SlateRequest:
+    """
+    A queued render and its progress.
+    """
+
+    __slots__ = (
+        "id",
+        "job",
+        "status",
+        "stage",
+        "output",
+        "slate",
+        "error",
+        "queued",
+        "started",
+        "finished",
+        "event"
+    )
+
+    def __init__(self, id, job):
+        self.id = id
+        self.job = job
+        self.status = "queued"
+        self.stage = ""
+        self.output = ""
+        self.slate = ""
+        self.error = None
+        self.queued = time.time()
+        self.started = None
+        self.finished = None
+        self.event = threading.Event()
+
+    @property
+    def done(self):
+        return self.event.is_set()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "job_id": self.job.get("id"),
+            "status": self.status,
+            "stage": self.stage,
+            "output": self.output,
+            "slate": self.slate,
+            "error": self.error,
+            "queued": self.queued,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class SlateDaemon:
+    """
+    Renders queued slate jobs with warm state.
+
+    One SlateCreator per template is created on first use and
+    cloned for every request, so templates are read and their
+    regexes compiled once. Browsers come from a single shared
+    RenderPool started up front. Finished requests are kept
+    for status queries, up to max_history of them.
+    """
+
+    def __init__(
+        self,
+        template_path,
+        resources_path="",
+        data=None,
+        env=None,
+        staging_dir="staging",
+        workers=2,
+        browsers=1,
+        render_backend="browser",
+        convert_backend="oiio",
+        max_history=1000,
+        log=None
+    ):
+        self.template_path = os.path.abspath(template_path)
+        self.resources_path = os.path.abspath(
+            resources_path or os.path.dirname(self.template_path)
+        )
+        self.data = data or {}
+        self.env = env or {}
+        self.staging_dir = os.path.abspath(staging_dir)
+        self.workers = max(1, workers)
+        self.browsers = browsers
+        self.render_backend = render_backend
+        self.convert_backend = convert_backend
+        self.max_history = max_history
+        self.log = log or logging.getLogger("SlateCreator.daemon")
+        self.render_pool = None
+        self._creators = {}
+        self._requests = OrderedDict()
+        self._queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """
+        Warms the default template and the browsers,
+        then starts the worker threads.
+        """
+
+        if self.browsers and self.render_backend != "raster":
+            self.render_pool = RenderPool(size=self.browsers, log=self.log)
+        self._creator(self.template_path, self.resources_path)
+        if self.render_pool is not None:
+            self.render_pool.warm()
+
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work,
+                name="slate_daemon_{:02d}".format(i),
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        self.log.info("Slate daemon ready, {} workers, {} browsers".format(
+            self.workers, self.browsers if self.render_pool else 0
+        ))
+
+    def _creator(self, template_path, resources_path):
+        key = (template_path, resources_path)
+        with self._lock:
+            slate = self._creators.get(key)
+        if slate is not None:
+            return slate
+
+        slate = SlateCreator(
+            staging_dir=self.staging_dir,
+            template_path=template_path,
+            resources_path=resources_path,
+            data=self.data,
+            env=self.env,
+            render_pool=self.render_pool
+        )
+        slate.render_backend = self.render_backend
+        slate.convert_backend = self.convert_backend
+
+        with self._lock:
+            return self._creators.setdefault(key, slate)
+
+    def submit(self, job):
+        """
+        Queues a job, returns its SlateRequest.
+        """
+
+        error = check_job(job)
+        if error is None and not isinstance(job.get("thumbnails", False), bool):
+            error = "'thumbnails' is not a boolean"
+        if error is not None:
+            raise ValueError("Invalid slate job: {}".format(error))
+
+        request = SlateRequest("{:08d}".format(next(self._ids)), job)
+        with self._lock:
+            self._requests[request.id] = request
+            self._evict()
+        self._queue.put(request)
+
+        return request
+
+    def _evict(self):
+        extra = len(self._requests) - self.max_history
+        if extra <= 0:
+            return
+        for request_id in [
+            r.id for r in self._requests.values() if r.done
+        ][:extra]:
+            del self._requests[request_id]
+
+    def get(self, request_id):
+        with self._lock:
+            return self._requests.get(request_id)
+
+    def stats(self):
+        with self._lock:
+            counts = dict.fromkeys(_statuses, 0)
+            for request in self._requests.values():
+                counts[request.status] += 1
+        return {
+            "ok": True,
+            "workers": self.workers,
+            "browsers": self.render_pool.size if self.render_pool else 0,
+            "requests": counts,
+        }
+
+    def _work(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            request.status = "running"
+            request.started = time.time()
+            try:
+                self._run(request)
+            except Exception as err:
+                request.status = "failed"
+                request.error = "{}: {}".format(type(err).__name__, err)
+                self.log.error("Slate request {} failed at {}: {}".format(
+                    request.id, request.stage, err
+                ))
+            else:
+                request.status = "done"
+            request.finished = time.time()
+            request.event.set()
+
+    def _run(self, request):
+        job = request.job
+        request.stage = "template"
+        template = job.get("template")
+        if template:
+            template = os.path.abspath(template)
+            resources = os.path.abspath(
+                job.get("resources") or os.path.dirname(template)
+            )
+        else:
+            template = self.template_path
+            resources = os.path.abspath(
+                job.get("resources") or self.resources_path
+            )
+        slate = self._creator(template, resources).clone(
+            data=job.get("data")
+        )
+
+        input = job.get("input", "")
+        if input:
+            request.stage = "probe"
+            slate.probe(input)
+            if job.get("thumbnails"):
+                request.stage = "thumbnail"
+                slate.render_thumbnail(input)
+
+        request.stage = "render"
+        request.slate = slate.render_slate(
+            slate_specifier="_{}".format(request.id)
+        )[0]
+
+        output = job.get("output", "")
+        if not output:
+            request.output = request.slate
+            return
+
+        request.stage = "convert"
+        output_dir = os.path.dirname(output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        slate.convert_slate(
+            request.slate,
+            output,
+            out_args=job.get("out_args") or []
+        )
+        request.output = output
+
+    def close(self):
+        for thread in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=30)
+        self._threads = []
+        if self.render_pool is not None:
+            self.render_pool.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    server_version = "SlateDaemon/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # unix socket peers have no address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "local"
+
+    def log_message(self, format, *args):
+        self.server.slate_daemon.log.debug(
+            "{} {}".format(self.address_string(), format % args)
+        )
+
+    def _reply(self, code, body):
+        payload = json.dumps(body, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length).decode("utf-8"))
+
+    def _authorized(self):
+        """
+        Checks the shared token when the server has one,
+        replies 401 and returns False if it's wrong.
+        """
+
+        token = getattr(self.server, "token", None)
+        if not token:
+            return True
+        sent = self.headers.get(token_header) or ""
+        if hmac.compare_digest(sent.encode("utf-8"), token.encode("utf-8")):
+            return True
+        self._reply(401, {"error": "Missing or wrong {}".format(token_header)})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        daemon = self.server.slate_daemon
+        if self.path == "/health":
+            return self._reply(200, daemon.stats())
+        if self.path.startswith("/status/"):
+            request = daemon.get(self.path[len("/status/"):])
+            if request is None:
+                return self._reply(404, {"error": "Unknown request"})
+            return self._reply(200, request.to_dict())
+        self._reply(404, {"error": "Unknown path: {}".format(self.path)})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        daemon = self.server.slate_daemon
+        # browsers can post text/plain anywhere without a
+        # preflight, application/json they can't
+        content_type = self.headers.get("Content-Type") or ""
+        if content_type.split(";")[0].strip().lower() != "application/json":
+            self.close_connection = True
+            return self._reply(415, {"error": "Expected application/json"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if not 0 <= length <= max_body:
+            self.close_connection = True
+            return self._reply(400, {"error": "Invalid Content-Length"})
+        try:
+            body = self._body()
+        except (ValueError, RecursionError) as err:
+            return self._reply(400, {"error": "Invalid json: {}".format(err)})
+        if not isinstance(body, dict):
+            return self._reply(400, {"error": "Expected a json object"})
+
+        if self.path == "/render":
+            wait = body.pop("wait", False)
+            timeout = body.pop("timeout", None)
+            if not isinstance(wait, bool):
+                return self._reply(400, {"error": "'wait' is not a boolean"})
+            if timeout is not None and (
+                isinstance(timeout, bool) or
+                not isinstance(timeout, (int, float)) or
+                not 0 <= timeout < float("inf")
+            ):
+                return self._reply(400, {
+                    "error": "'timeout' is not a positive number of seconds"
+                })
+            try:
+                request = daemon.submit(body)
+            except ValueError as err:
+                return self._reply(400, {"error": str(err)})
+            if wait:
+                request.event.wait(timeout)
+            return self._reply(
+                200 if request.done else 202,
+                request.to_dict()
+            )
+        if self.path == "/shutdown":
+            self._reply(200, {"ok": True})
+            threading.Thread(target=self.server.shutdown).start()
+            return
+        self._reply(404, {"error": "Unknown path: {}".format(self.path)})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    daemon_threads = True
+
+    def server_bind(self):
+        path = self.server_address
+        if os.path.lexists(path):
+            # only a stale socket of ours gets replaced
+            st = os.lstat(path)
+            if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid():
+                raise FileExistsError(
+                    "Not a socket of this user: '{}'".format(path)
+                )
+            if _listening(path):
+                raise OSError(
+                    "A slate daemon already listens on '{}'".format(path)
+                )
+            os.remove(path)
+        # created 0600 right away, nobody else can connect
+        # before a chmod would run
+        mask = os.umask(0o177)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(mask)
+
+
+def _listening(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def make_server(
+    slate_daemon,
+    socket_path="",
+    host="127.0.0.1",
+    port=default_port,
+    token=None
+):
+    """
+    Returns an http server for slate_daemon on a unix
+    socket if socket_path is set, on host:port otherwise.
+    Requests must carry token when set, it's required for
+    http as any local process or web page can reach it.
+    """
+
+    if socket_path:
+        server = UnixHTTPServer(socket_path, _Handler)
+    elif not token:
+        raise ValueError("Serving slates over http needs a token")
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    server.slate_daemon = slate_daemon
+    server.token = token
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request(
+    method,
+    path,
+    body=None,
+    socket_path="",
+    host="127.0.0.1",
+    port=default_port,
+    token=None,
+    timeout=None
+):
+    """
+    Sends a request to a running daemon and returns
+    (http status, decoded json reply).
+    """
+
+    if socket_path:
+        connection = _UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        payload = None
+        headers = {}
+        if method == "POST":
+            payload = json.dumps(body or {}).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if token:
+            headers[token_header] = token
+        connection.request(method, path, body=payload, headers=headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode("utf-8"))
+    finally:
+        connection.close()
+
+
+def render(job, wait=True, timeout=None, **address):
+    """
+    Submits a job to a running daemon and returns its
+    request record, once rendered if wait is set.
+    address takes the socket_path or host, port and token.
+    """
+
+    body = dict(job, wait=wait)
+    if timeout is not None:
+        body["timeout"] = timeout
+    status, reply = request("POST", "/render", body, **address)
+    if status >= 400:
+        raise RuntimeError(reply.get("error") or "Slate daemon error")
+    return reply
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m SlateCreator.daemon",
+        description="Serves slate renders with warm browsers and templates."
+    )
+    parser.add_argument("-t", "--template", required=True)
+    parser.add_argument("-r", "--resources", default="",
+        help="defaults to the template directory")
+    parser.add_argument("-d", "--data", default="",
+        help="json file of data shared by every job")
+    parser.add_argument("-s", "--staging-dir", default="staging")
+    parser.add_argument("--socket", default="",
+        help="unix socket to listen on, defaults to {} in "
+        "$XDG_RUNTIME_DIR or a private temp dir".format(socket_name))
+    parser.add_argument("--http", action="store_true",
+        help="listen on http instead, requests need the token")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--token", default=os.environ.get(token_env, ""),
+        help="shared http token, defaults to ${}".format(token_env))
+    parser.add_argument("-w", "--workers", type=int, default=2)
+    parser.add_argument("--browsers", type=int, default=2)
+    parser.add_argument("--env", type=env_item, action="append",
+        default=[], metavar="KEY=VALUE")
+    parser.add_argument("--render-backend", default="browser",
+        choices=("browser", "raster", "auto"))
+    parser.add_argument("--convert-backend", default="oiio",
+        choices=("oiio", "numpy"))
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    if args.http and not args.token:
+        parser.error("--http needs --token or ${}".format(token_env))
+    socket_path = "" if args.http else args.socket or default_socket()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    log = logging.getLogger("SlateCreator.daemon")
+    log.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    data = {}
+    if args.data:
+        with open(args.data, "r") as f:
+            data = json.load(f)
+
+    slate_daemon = SlateDaemon(
+        args.template,
+        resources_path=args.resources,
+        data=data,
+        env=dict(args.env),
+        staging_dir=args.staging_dir,
+        workers=args.workers,
+        browsers=args.browsers,
+        render_backend=args.render_backend,
+        convert_backend=args.convert_backend,
+        log=log
+    )
+    slate_daemon.start()
+    server = make_server(
+        slate_daemon,
+        socket_path=socket_path,
+        host=args.host,
+        port=args.port,
+        token=args.token or None
+    )
+    log.info("Listening on {}".format(
+        socket_path or "http://{}:{}".format(args.host, args.port)
+    ))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+        slate_daemon.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
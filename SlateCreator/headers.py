@@ -0,0 +1,201 @@
+import os
+import math
+import struct
+from .probe import ProbeResult
+
+
+exr_magic = 20000630
+exr_max_header_size = 16 * 1024 * 1024
+
+dpx_header_size = 2048
+dpx_undefined = 0xFFFFFFFF
+
+
+class HeaderError(ValueError):
+    """
+    Raised when a file header can't be parsed.
+    """
+
+
+def _bcd(value, units_shift, tens_shift, tens_bits):
+    units = (value >> units_shift) & 0xF
+    tens = (value >> tens_shift) & ((1 << tens_bits) - 1)
+    return tens * 10 + units
+
+
+def _decode_exr_timecode(time_and_flags):
+    """
+    Decodes the timeAndFlags packing of an OpenEXR
+    timecode attribute to a SMPTE string.
+    """
+
+    frames = _bcd(time_and_flags, 0, 4, 2)
+    drop_frame = time_and_flags & (1 << 6)
+    seconds = _bcd(time_and_flags, 8, 12, 3)
+    minutes = _bcd(time_and_flags, 16, 20, 3)
+    hours = _bcd(time_and_flags, 24, 28, 2)
+    return "{:02d}:{:02d}:{:02d}{}{:02d}".format(
+        hours, minutes, seconds,
+        ";" if drop_frame else ":",
+        frames
+    )
+
+
+def _decode_dpx_timecode(value):
+    """
+    Decodes a DPX BCD hhmmssff timecode.
+    """
+
+    digits = [(value >> shift) & 0xFF for shift in (24, 16, 8, 0)]
+    return ":".join(
+        "{:02d}".format((d >> 4) * 10 + (d & 0xF))
+        for d in digits
+    )
+
+
+def _read_cstring(buf, pos):
+    end = buf.find(b"\0", pos)
+    if end < 0:
+        raise IndexError
+    return buf[pos:end].decode("latin-1"), end + 1
+
+
+def _parse_exr_attributes(buf):
+    """
+    Walks the attribute list of the first header,
+    returns a dict of raw (type, bytes) values.
+    """
+
+    attributes = {}
+    pos = 8
+    while True:
+        name, pos = _read_cstring(buf, pos)
+        if not name:
+            return attributes
+        type_name, pos = _read_cstring(buf, pos)
+        if pos + 4 > len(buf):
+            raise IndexError
+        size = struct.unpack_from("<i", buf, pos)[0]
+        pos += 4
+        if size < 0:
+            raise HeaderError("Negative attribute size for '{}'".format(name))
+        if pos + size > len(buf):
+            raise IndexError
+        attributes[name] = (type_name, buf[pos:pos + size])
+        pos += size
+
+
+def read_exr_header(path):
+    """
+    Reads resolution, timecode, fps and pixel aspect
+    from the header of an OpenEXR file. Only the header
+    bytes are read, growing the read until the attribute
+    list is complete.
+    """
+
+    size = 65536
+    with open(path, "rb") as f:
+        buf = f.read(size)
+        if len(buf) < 8 or struct.unpack_from("<i", buf)[0] != exr_magic:
+            raise HeaderError("Not an OpenEXR file: '{}'".format(path))
+        while True:
+            try:
+                attributes = _parse_exr_attributes(buf)
+                break
+            except IndexError:
+                if len(buf) < size or size >= exr_max_header_size:
+                    raise HeaderError(
+                        "Truncated OpenEXR header: '{}'".format(path)
+                    )
+                more = f.read(size)
+                buf += more
+                size *= 2
+
+    result = ProbeResult(path, source="exr")
+
+    window = attributes.get("dataWindow")
+    if window is None or window[0] != "box2i":
+        raise HeaderError("OpenEXR file without dataWindow: '{}'".format(path))
+    x_min, y_min, x_max, y_max = struct.unpack_from("<4i", window[1])
+    result.width = x_max - x_min + 1
+    result.height = y_max - y_min + 1
+
+    timecode = attributes.get("timeCode")
+    if timecode is not None and timecode[0] == "timecode":
+        result.timecode = _decode_exr_timecode(
+            struct.unpack_from("<I", timecode[1])[0]
+        )
+
+    fps = attributes.get("framesPerSecond")
+    if fps is not None and fps[0] == "rational":
+        num, den = struct.unpack_from("<iI", fps[1])
+        if num > 0 and den > 0:
+            result.fps = round(num / den, 3)
+
+    aspect = attributes.get("pixelAspectRatio")
+    if aspect is not None and aspect[0] == "float":
+        result.pixel_aspect = struct.unpack_from("<f", aspect[1])[0]
+
+    return result
+
+
+def _dpx_float(value):
+    if math.isnan(value) or math.isinf(value) or value <= 0:
+        return None
+    return value
+
+
+def read_dpx_header(path):
+    """
+    Reads resolution, timecode, fps and pixel aspect
+    from the fixed size header of a DPX file.
+    """
+
+    with open(path, "rb") as f:
+        buf = f.read(dpx_header_size)
+
+    if buf[:4] == b"SDPX":
+        endian = ">"
+    elif buf[:4] == b"XPDS":
+        endian = "<"
+    else:
+        raise HeaderError("Not a DPX file: '{}'".format(path))
+    if len(buf) < dpx_header_size:
+        raise HeaderError("Truncated DPX header: '{}'".format(path))
+
+    result = ProbeResult(path, source="dpx")
+
+    result.width, result.height = struct.unpack_from(
+        endian + "2I", buf, 772
+    )
+
+    aspect_h, aspect_v = struct.unpack_from(endian + "2I", buf, 1628)
+    if aspect_h not in (0, dpx_undefined) and aspect_v not in (0, dpx_undefined):
+        result.pixel_aspect = round(aspect_h / aspect_v, 4)
+
+    tv_fps = _dpx_float(struct.unpack_from(endian + "f", buf, 1940)[0])
+    film_fps = _dpx_float(struct.unpack_from(endian + "f", buf, 1724)[0])
+    fps = tv_fps or film_fps
+    if fps:
+        result.fps = round(fps, 3)
+
+    timecode = struct.unpack_from(endian + "I", buf, 1920)[0]
+    if timecode != dpx_undefined:
+        result.timecode = _decode_dpx_timecode(timecode)
+
+    return result
+
+
+def read_header(path):
+    """
+    Reads probe metadata straight from the file header.
+    Returns None for formats without a native reader,
+    raises HeaderError on unreadable headers.
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".exr":
+        return read_exr_header(path)
+    if ext == ".dpx":
+        return read_dpx_header(path)
+    return None
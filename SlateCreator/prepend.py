@@ -0,0 +1,258 @@
+import os
+import re
+import json
+
+
+# codecs whose ffprobe profile can be handed back to the encoder
+_profile_codecs = {
+    "dnxhd",
+    "prores",
+    "h264",
+    "hevc",
+}
+
+# codecs coding every frame on its own, with no stream level
+# extradata an encoder picks per clip, a separately encoded
+# slate segment joins them with stream copy. Long gop codecs
+# like h264 or hevc carry parameter sets (sps/pps) that won't
+# match the movie ones, their movies get re-encoded instead.
+intra_codecs = {
+    "prores",
+    "dnxhd",
+    "mjpeg",
+    "png",
+    "rawvideo",
+    "v210",
+    "r210",
+    "qtrle",
+}
+
+# encoders to use when the decoder name has no profile option
+_encoders = {
+    "prores": "prores_ks",
+}
+
+# re-encode quality of codecs whose default is meant for previews
+_reencode_args = {
+    "h264": ["-crf", "16"],
+    "hevc": ["-crf", "18"],
+}
+
+# containers writing a timecode track on stream copy
+timecode_containers = {
+    ".mov",
+    ".mxf",
+}
+
+
+def streams_command(input, exec_ext=""):
+    return [
+        "ffprobe{}".format(exec_ext),
+        "-v", "error",
+        "-show_entries",
+        "stream=index,codec_type,codec_name,profile,pix_fmt,width,height," +
+        "r_frame_rate,time_base,sample_rate,channels,channel_layout," +
+        "color_space,color_transfer,color_primaries",
+        "-of", "json",
+        input
+    ]
+
+
+def parse_streams(output):
+    """
+    Returns the first video and audio stream description
+    of a streams_command output, None if missing.
+    """
+
+    video = None
+    audio = None
+    for stream in json.loads(output).get("streams", []):
+        kind = stream.get("codec_type")
+        if kind == "video" and video is None:
+            video = stream
+        elif kind == "audio" and audio is None:
+            audio = stream
+    return video, audio
+
+
+def encoder_profile(codec, profile):
+    """
+    Converts an ffprobe profile name to the matching encoder
+    -profile:v value, example: "DNXHR HQX" -> "dnxhr_hqx",
+    "High 4:2:2" -> "high422".
+    """
+
+    name = profile.lower()
+    if codec == "dnxhd":
+        return name.replace(" ", "_")
+    name = re.sub(r"[^a-z0-9]", "", name)
+    if name == "constrainedbaseline":
+        return "baseline"
+    return name
+
+
+def can_stream_copy(video, audio=None):
+    """
+    Returns True if a slate segment encoded on its own can be
+    joined to the movie with stream copy: intra only video and
+    pcm or no audio, whose streams have no per clip extradata.
+    """
+
+    if video.get("codec_name") not in intra_codecs:
+        return False
+    return audio is None or audio.get("codec_name", "").startswith("pcm_")
+
+
+def _duration(video, frames):
+    num, den = (float(v) for v in video["r_frame_rate"].split("/"))
+    return "{:.6f}".format(frames * den / num)
+
+
+def _audio_source(video, audio, frames):
+    layout = audio.get("channel_layout") or "{}c".format(
+        audio.get("channels", 2)
+    )
+    return [
+        "-t", _duration(video, frames),
+        "-f", "lavfi",
+        "-i", "anullsrc=channel_layout={}:sample_rate={}".format(
+            layout, audio.get("sample_rate", 48000)
+        )
+    ]
+
+
+def _encode_args(video, audio, output):
+    """
+    Encoder arguments matching the movie video and audio
+    streams: codec, profile, pixel format, size, color tags
+    and track timescale.
+    """
+
+    codec = video["codec_name"]
+    args = ["-c:v", _encoders.get(codec, codec)]
+
+    profile = video.get("profile")
+    if profile and video["codec_name"] in _profile_codecs:
+        args.extend([
+            "-profile:v",
+            encoder_profile(video["codec_name"], profile)
+        ])
+    if video.get("pix_fmt"):
+        args.extend(["-pix_fmt", video["pix_fmt"]])
+    args.extend(["-s", "{}x{}".format(video["width"], video["height"])])
+    for key, flag in (
+        ("color_space", "-colorspace"),
+        ("color_transfer", "-color_trc"),
+        ("color_primaries", "-color_primaries"),
+    ):
+        value = video.get(key)
+        if value and value != "unknown":
+            args.extend([flag, value])
+
+    time_base = video.get("time_base", "")
+    if "/" in time_base and os.path.splitext(output)[1].lower() in (
+        ".mov", ".mp4", ".m4v"
+    ):
+        args.extend(["-video_track_timescale", time_base.split("/")[1]])
+
+    if audio is not None:
+        args.extend(["-c:a", audio["codec_name"]])
+        args.extend(["-ar", str(audio.get("sample_rate", 48000))])
+    return args
+
+
+def segment_command(slate, segment, video, audio=None, frames=1, exec_ext=""):
+    """
+    Builds the ffmpeg command encoding the slate alone as a
+    short clip matching the movie video (and audio) stream,
+    so both can be joined without re-encoding the movie.
+    Only valid for movies can_stream_copy accepts.
+    """
+
+    cmd = ["ffmpeg{}".format(exec_ext), "-v", "error", "-y"]
+    cmd.extend(["-loop", "1", "-framerate", video["r_frame_rate"]])
+    cmd.extend(["-i", slate])
+
+    if audio is not None:
+        cmd.extend(_audio_source(video, audio, frames))
+
+    cmd.extend(["-frames:v", str(frames)])
+    cmd.extend(["-map", "0:v"])
+    if audio is not None:
+        cmd.extend(["-map", "1:a"])
+    cmd.extend(_encode_args(video, audio, segment))
+    cmd.append(segment)
+    return cmd
+
+
+def reencode_command(
+    slate,
+    movie,
+    output,
+    video,
+    audio=None,
+    frames=1,
+    timecode="",
+    exec_ext=""
+):
+    """
+    Builds the ffmpeg command joining slate and movie with the
+    concat filter in a single encode, for movies whose codec
+    can't be joined with stream copy. The output matches the
+    movie streams like a slate segment does.
+    """
+
+    cmd = ["ffmpeg{}".format(exec_ext), "-v", "error", "-y"]
+    cmd.extend([
+        "-loop", "1",
+        "-framerate", video["r_frame_rate"],
+        "-t", _duration(video, frames),
+        "-i", slate
+    ])
+    cmd.extend(["-i", movie])
+
+    size = "{}:{}".format(video["width"], video["height"])
+    graph = "[0:v]scale={},setsar=1[s];[1:v]setsar=1[m];".format(size)
+    if audio is not None:
+        cmd.extend(_audio_source(video, audio, frames))
+        graph += "[s][2:a][m][1:a:0]concat=n=2:v=1:a=1[v][a]"
+    else:
+        graph += "[s][m]concat=n=2:v=1:a=0[v]"
+
+    cmd.extend(["-filter_complex", graph, "-map", "[v]"])
+    if audio is not None:
+        cmd.extend(["-map", "[a]"])
+    cmd.extend(_encode_args(video, audio, output))
+    cmd.extend(_reencode_args.get(video["codec_name"], []))
+    if timecode and os.path.splitext(output)[1].lower() in timecode_containers:
+        cmd.extend(["-timecode", timecode])
+    cmd.append(output)
+    return cmd
+
+
+def write_concat_list(path, files):
+    """
+    Writes an ffmpeg concat demuxer list.
+    """
+
+    with open(path, "w") as f:
+        for file in files:
+            f.write("file '{}'\n".format(
+                os.path.abspath(file).replace("'", "'\\''")
+            ))
+    return path
+
+
+def concat_command(list_path, output, timecode="", exec_ext=""):
+    """
+    Builds the ffmpeg command joining the concat list with
+    stream copy only.
+    """
+
+    cmd = ["ffmpeg{}".format(exec_ext), "-v", "error", "-y"]
+    cmd.extend(["-f", "concat", "-safe", "0", "-i", list_path])
+    cmd.extend(["-map", "0", "-c", "copy"])
+    if timecode and os.path.splitext(output)[1].lower() in timecode_containers:
+        cmd.extend(["-timecode", timecode])
+    cmd.append(output)
+    return cmd
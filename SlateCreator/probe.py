@@ -0,0 +1,205 @@
+import os
+import re
+import json
+
+
+movie_extensions = {
+    ".mov",
+    ".mp4",
+    ".m4v",
+    ".mxf",
+    ".avi",
+    ".mkv",
+    ".webm",
+}
+
+_iinfo_resolution_regex = re.compile(
+    r"(\d+)\s*x\s*(\d+)"
+)
+_iinfo_timecode_regex = re.compile(
+    r"timecode\s*:\s*\"?(\d{1,2}[:;]\d{2}[:;]\d{2}[:;]\d{2})",
+    re.IGNORECASE
+)
+_iinfo_fps_regex = re.compile(
+    r"framespersecond\s*:\s*(\d+)\s*/\s*(\d+)",
+    re.IGNORECASE
+)
+_iinfo_pixel_aspect_regex = re.compile(
+    r"pixelaspectratio\s*:\s*([\d.]+)",
+    re.IGNORECASE
+)
+
+
+class ProbeResult:
+    """
+    Media metadata gathered from a single probe.
+    Fields the source doesn't provide are left to None.
+    """
+
+    __slots__ = (
+        "path",
+        "width",
+        "height",
+        "timecode",
+        "fps",
+        "pixel_aspect",
+        "frame_start",
+        "frame_end",
+        "frame_count",
+        "source"
+    )
+
+    def __init__(
+        self,
+        path,
+        width=None,
+        height=None,
+        timecode=None,
+        fps=None,
+        pixel_aspect=None,
+        frame_start=None,
+        frame_end=None,
+        frame_count=None,
+        source=""
+    ):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.timecode = timecode
+        self.fps = fps
+        self.pixel_aspect = pixel_aspect
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.frame_count = frame_count
+        self.source = source
+
+    def to_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**{
+            k: v for k, v in values.items()
+            if k in cls.__slots__
+        })
+
+    def __repr__(self):
+        return "ProbeResult({})".format(", ".join(
+            "{}={!r}".format(k, getattr(self, k))
+            for k in self.__slots__
+            if getattr(self, k) is not None
+        ))
+
+
+def is_movie(path):
+    return os.path.splitext(path)[1].lower() in movie_extensions
+
+
+def _rate(value):
+    """
+    Converts "24000/1001" like rates to float,
+    returns None for unknown rates.
+    """
+
+    try:
+        num, den = (float(v) for v in str(value).split("/"))
+    except ValueError:
+        return None
+    if not num or not den:
+        return None
+    return round(num / den, 3)
+
+
+def iinfo_command(input, exec_ext=""):
+    return ["iinfo{}".format(exec_ext), "-v", input]
+
+
+def ffprobe_command(input, exec_ext=""):
+    return [
+        "ffprobe{}".format(exec_ext),
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries",
+        "stream=width,height,r_frame_rate,sample_aspect_ratio,nb_frames" +
+        ":stream_tags=timecode:format_tags=timecode",
+        "-of", "json",
+        input
+    ]
+
+
+def probe_command(input, exec_ext=""):
+    """
+    Returns the single command probing input: ffprobe for
+    movies, iinfo for images.
+    """
+
+    if is_movie(input):
+        return ffprobe_command(input, exec_ext)
+    return iinfo_command(input, exec_ext)
+
+
+def parse_iinfo(output, path):
+    """
+    Parses "iinfo -v" output.
+    """
+
+    result = ProbeResult(path, source="iinfo")
+    lines = output.splitlines()
+
+    if lines:
+        m = _iinfo_resolution_regex.search(lines[0])
+        if m is not None:
+            result.width = int(m.group(1))
+            result.height = int(m.group(2))
+
+    m = _iinfo_timecode_regex.search(output)
+    if m is not None:
+        result.timecode = m.group(1)
+
+    m = _iinfo_fps_regex.search(output)
+    if m is not None:
+        result.fps = _rate("{}/{}".format(m.group(1), m.group(2)))
+
+    m = _iinfo_pixel_aspect_regex.search(output)
+    if m is not None:
+        result.pixel_aspect = float(m.group(1))
+
+    return result
+
+
+def parse_ffprobe(output, path):
+    """
+    Parses ffprobe json output of ffprobe_command.
+    """
+
+    result = ProbeResult(path, source="ffprobe")
+    info = json.loads(output)
+    streams = info.get("streams") or [{}]
+    stream = streams[0]
+
+    result.width = stream.get("width")
+    result.height = stream.get("height")
+    result.fps = _rate(stream.get("r_frame_rate", ""))
+
+    sar = stream.get("sample_aspect_ratio", "")
+    result.pixel_aspect = _rate(sar.replace(":", "/")) if sar else None
+
+    nb_frames = stream.get("nb_frames")
+    if nb_frames and str(nb_frames).isdigit():
+        result.frame_count = int(nb_frames)
+
+    tags = stream.get("tags") or {}
+    format_tags = (info.get("format") or {}).get("tags") or {}
+    result.timecode = tags.get("timecode") or format_tags.get("timecode")
+
+    return result
+
+
+def parse_probe(output, path):
+    """
+    Parses output of probe_command.
+    """
+
+    if is_movie(path):
+        return parse_ffprobe(output, path)
+    return parse_iinfo(output, path)
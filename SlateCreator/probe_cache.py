@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import threading
+from .probe import ProbeResult
+
+
+class ProbeCache:
+    """
+    Persistent cache of probe results stored in sqlite.
+
+    Entries are keyed by absolute path and validated against
+    the file size and modification time, so a changed file is
+    probed again. Least recently used entries are evicted once
+    max_entries is exceeded. Hits only read the database: their
+    access times are kept in memory, at most one per entry every
+    access_interval seconds, and written in one transaction with
+    the next put, flush or close, or once access_interval passed.
+    """
+
+    def __init__(self, path, max_entries=20000, access_interval=60.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.access_interval = access_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._accessed = {}
+        self._flushed = time.monotonic()
+        self._closed = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS probes ("
+            "path TEXT PRIMARY KEY, "
+            "size INTEGER, "
+            "mtime INTEGER, "
+            "result TEXT, "
+            "accessed REAL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS probes_accessed "
+            "ON probes (accessed)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _stamp(input):
+        st = os.stat(input)
+        return os.path.abspath(input), st.st_size, st.st_mtime_ns
+
+    def get(self, input):
+        """
+        Returns the cached ProbeResult for input,
+        None if missing or stale.
+        """
+
+        try:
+            path, size, mtime = self._stamp(input)
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result, accessed FROM probes "
+                "WHERE path = ? AND size = ? AND mtime = ?",
+                (path, size, mtime)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            now = time.time()
+            if now - (row[1] or 0) >= self.access_interval:
+                self._accessed[path] = now
+            if self._accessed and (
+                time.monotonic() - self._flushed >= self.access_interval
+            ):
+                self._write_accessed()
+                self._db.commit()
+
+        result = ProbeResult.from_dict(json.loads(row[0]))
+        result.path = input
+        return result
+
+    def put(self, input, result):
+        """
+        Stores result for the current state of input.
+        """
+
+        try:
+            path, size, mtime = self._stamp(input)
+        except OSError:
+            return
+
+        with self._lock:
+            self._write_accessed()
+            self._db.execute(
+                "INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?, ?)",
+                (path, size, mtime, json.dumps(result.to_dict()), time.time())
+            )
+            count = self._db.execute(
+                "SELECT COUNT(*) FROM probes"
+            ).fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM probes WHERE path IN ("
+                    "SELECT path FROM probes ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._db.commit()
+
+    def _write_accessed(self):
+        """
+        Writes pending access times, the lock must be held
+        and the caller commits.
+        """
+
+        if self._accessed:
+            self._db.executemany(
+                "UPDATE probes SET accessed = ? WHERE path = ?",
+                [(t, path) for path, t in self._accessed.items()]
+            )
+            self._accessed = {}
+        self._flushed = time.monotonic()
+
+    def flush(self):
+        """
+        Writes pending access times to the database.
+        """
+
+        with self._lock:
+            if self._closed or not self._accessed:
+                return
+            self._write_accessed()
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._accessed = {}
+            self._db.execute("DELETE FROM probes")
+            self._db.commit()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._db.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_probe_cache(path):
+    """
+    Returns the process wide ProbeCache stored at path.
+    """
+
+    path = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ProbeCache(path)
+            _caches[path] = cache
+            atexit.register(cache.flush)
+        return cache
@@ -0,0 +1,775 @@
+import io
+import os
+import re
+import json
+import string
+import functools
+import threading
+from collections import OrderedDict
+from .template import CompiledTemplate, field_root, resolve_resource_path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+
+layout_suffix = ".layout.json"
+
+# tried in order when a layout doesn't list its own fonts,
+# metric compatible with Arial where available
+default_fonts = (
+    "arial.ttf",
+    "Arial.ttf",
+    "LiberationSans-Regular.ttf",
+    "Arimo-Regular.ttf",
+    "DejaVuSans.ttf",
+)
+
+_length_regex = re.compile(
+    r"\s*([+-])?\s*(\d*\.?\d+)\s*(vw|vh|px)?"
+)
+_hex_color_regex = re.compile(
+    r"^#([0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$"
+)
+_anchors = {
+    "left": "ls",
+    "center": "ms",
+    "right": "rs",
+}
+_directions = ("right", "left", "down", "up")
+
+
+def _require():
+    if np is None or Image is None:
+        raise ImportError(
+            "numpy and Pillow are needed to rasterize slate layouts."
+        )
+
+
+def layout_path(template_path):
+    """
+    Returns the path of the raster layout belonging
+    to a template, next to it.
+    example: generic_slate.html -> generic_slate.layout.json
+    """
+
+    return os.path.splitext(template_path)[0] + layout_suffix
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_length(value, unit="vh"):
+    """
+    Parses a length into (px, vw, vh) coefficients. Bare
+    numbers are in unit, strings can sum several lengths.
+    example: "75vw + 2.5" -> (0.0, 75.0, 2.5)
+    """
+
+    if isinstance(value, (int, float)):
+        value = str(value)
+
+    coefficients = {"px": 0.0, "vw": 0.0, "vh": 0.0}
+    pos = 0
+    value = value.strip()
+    while pos < len(value):
+        m = _length_regex.match(value, pos)
+        if m is None or m.end() == pos:
+            raise ValueError("Invalid layout length: '{}'".format(value))
+        number = float(m.group(2))
+        if m.group(1) == "-":
+            number = -number
+        coefficients[m.group(3) or unit] += number
+        pos = m.end()
+    if not value:
+        raise ValueError("Empty layout length")
+
+    return coefficients["px"], coefficients["vw"], coefficients["vh"]
+
+
+def parse_color(value):
+    """
+    Returns an (r, g, b, a) tuple from "#rgb", "#rrggbb",
+    "#rrggbbaa" or a list of 3 or 4 ints.
+    """
+
+    if isinstance(value, str):
+        m = _hex_color_regex.match(value.strip())
+        if m is None:
+            raise ValueError("Invalid layout color: '{}'".format(value))
+        digits = m.group(1)
+        if len(digits) <= 4:
+            digits = "".join(c * 2 for c in digits)
+        value = [int(digits[i:i + 2], 16) for i in range(0, len(digits), 2)]
+
+    value = [int(c) for c in value]
+    if len(value) == 3:
+        value.append(255)
+    if len(value) != 4 or not all(0 <= c <= 255 for c in value):
+        raise ValueError("Invalid layout color: '{}'".format(value))
+    return tuple(value)
+
+
+def parse_fill(value):
+    """
+    Normalizes a fill, a color or a css like linear gradient
+    {"gradient": {"direction": "down", "stops": [[color, 0],
+    [color, 100]]}}. Stop positions are percentages, repeated
+    positions make hard edges and missing ones get spread.
+    """
+
+    if not isinstance(value, dict):
+        return ("color", parse_color(value))
+
+    gradient = value["gradient"]
+    direction = gradient.get("direction", "down")
+    if direction not in _directions:
+        raise ValueError(
+            "Invalid gradient direction '{}', use one of: {}".format(
+                direction, ", ".join(_directions)
+            )
+        )
+
+    stops = []
+    for stop in gradient["stops"]:
+        if isinstance(stop, (list, tuple)) and len(stop) == 2 and (
+            isinstance(stop[1], (int, float)) or stop[1] is None
+        ):
+            stops.append([parse_color(stop[0]), stop[1]])
+        else:
+            stops.append([parse_color(stop), None])
+    if len(stops) < 2:
+        raise ValueError("Gradients need at least 2 stops")
+
+    if stops[0][1] is None:
+        stops[0][1] = 0.0
+    if stops[-1][1] is None:
+        stops[-1][1] = 100.0
+    known = [i for i, stop in enumerate(stops) if stop[1] is not None]
+    for a, b in zip(known, known[1:]):
+        for i in range(a + 1, b):
+            stops[i][1] = stops[a][1] + (
+                (stops[b][1] - stops[a][1]) * (i - a) / (b - a)
+            )
+    # positions never go back, like css
+    for i in range(1, len(stops)):
+        stops[i][1] = max(stops[i][1], stops[i - 1][1])
+
+    if direction in ("left", "up"):
+        stops = [[color, 100.0 - pos] for color, pos in reversed(stops)]
+
+    return (
+        "gradient",
+        "right" if direction in ("right", "left") else "down",
+        tuple((color, float(pos)) for color, pos in stops)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def find_font(candidates, resources_path=""):
+    """
+    Returns the path of the first font file found among
+    candidates, looked up in resources_path, as is and in
+    the system font directories. None if none is found.
+    """
+
+    _require()
+    for candidate in candidates:
+        paths = [candidate]
+        if resources_path and not os.path.isabs(candidate):
+            paths.insert(0, os.path.join(resources_path, candidate))
+        for path in paths:
+            try:
+                return ImageFont.truetype(path, 10).path
+            except OSError:
+                continue
+    return None
+
+
+@functools.lru_cache(maxsize=256)
+def load_font(path, size):
+    """
+    Returns the font at path and pixel size, Pillow
+    default font if path is None.
+    """
+
+    _require()
+    if path is not None:
+        return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size=size)
+
+
+def _compile_text(text, path, resources_path):
+    fields = [
+        field_root(field)
+        for literal, field, spec, conversion in string.Formatter().parse(text)
+        if field
+    ]
+    return CompiledTemplate(
+        path,
+        resources_path,
+        text,
+        fields=fields,
+        resource_fields=[f for f in fields if f.startswith("thumbnail")]
+    ), fields
+
+
+class Layout:
+    """
+    Slate template described as boxes instead of html, drawn
+    by rasterize without a browser. Read from json:
+        units: unit of bare numbers, "vh" by default
+        fonts: {name: [font files to try in order]}
+        background: fill of the whole slate
+        elements: list of boxes drawn in order, each one
+            of type rect, text, table or image
+    Lengths are numbers or sums like "75vw + 2.5vh - 4px",
+    fills are colors or gradients, see parse_fill. Text and
+    src strings are formatted with slate data like templates
+    and elements with an "optional" key get hidden when that
+    data key is empty, like {key_optional} blocks.
+    See templates/generic_slate/generic_slate.layout.json.
+    """
+
+    __slots__ = (
+        "path",
+        "resources_path",
+        "units",
+        "fonts",
+        "background",
+        "elements",
+        "fields"
+    )
+
+    def __init__(self, path, resources_path, layout):
+        self.path = path
+        self.resources_path = resources_path
+        self.units = layout.get("units", "vh")
+        self.fonts = {
+            name: tuple([candidates] if isinstance(candidates, str) else candidates)
+            for name, candidates in layout.get("fonts", {}).items()
+        }
+        self.fonts.setdefault("default", default_fonts)
+        background = layout.get("background")
+        self.background = None if background is None else parse_fill(background)
+        self.fields = {}
+        self.elements = [
+            self._compile_element(element)
+            for element in layout.get("elements", [])
+        ]
+
+    def _text(self, text):
+        compiled, fields = _compile_text(
+            str(text), self.path, self.resources_path
+        )
+        for field in fields:
+            self.fields[field] = None
+        return compiled
+
+    def _font(self, element):
+        name = element.get("font", "default")
+        if name not in self.fonts:
+            raise ValueError("Unknown layout font: '{}'".format(name))
+        return name
+
+    def _compile_element(self, element):
+        kind = element.get("type")
+        compiled = {
+            "type": kind,
+            "optional": element.get("optional"),
+        }
+        if compiled["optional"]:
+            self.fields[compiled["optional"]] = None
+
+        if kind == "rect":
+            compiled["box"] = element["box"]
+            compiled["fill"] = parse_fill(element["fill"])
+        elif kind == "text":
+            compiled["text"] = self._text(element["text"])
+            compiled["pos"] = element["pos"]
+            compiled["width"] = element.get("width")
+            compiled["align"] = element.get("align", "left")
+            compiled["font"] = self._font(element)
+            compiled["size"] = element.get("size", 3)
+            compiled["line_height"] = element.get(
+                "line_height", compiled["size"]
+            )
+            compiled["color"] = parse_color(element.get("color", "#000"))
+            if compiled["align"] not in _anchors:
+                raise ValueError(
+                    "Invalid text align: '{}'".format(compiled["align"])
+                )
+        elif kind == "table":
+            rows = []
+            for row in element["rows"]:
+                if isinstance(row, dict):
+                    optional = row.get("optional")
+                    cells = row["cells"]
+                else:
+                    optional = None
+                    cells = row
+                if optional:
+                    self.fields[optional] = None
+                rows.append((optional, [self._text(c) for c in cells]))
+            compiled["rows"] = rows
+            compiled["pos"] = element["pos"]
+            compiled["width"] = element.get("width")
+            compiled["font"] = self._font(element)
+            compiled["size"] = element.get("size", 3)
+            compiled["line_height"] = element.get(
+                "line_height", compiled["size"]
+            )
+            compiled["row_gap"] = element.get("row_gap", 0)
+            compiled["column_gap"] = element.get("column_gap", 0)
+            compiled["colors"] = [
+                parse_color(c) for c in element.get("colors", ["#000"])
+            ]
+        elif kind == "image":
+            src = str(element["src"])
+            if "{" not in src and not os.path.isabs(src):
+                src = resolve_resource_path(src, self.resources_path)
+            compiled["src"] = self._text(src)
+            compiled["thumbnail"] = any(
+                f.startswith("thumbnail")
+                for literal, f, spec, conversion in string.Formatter().parse(src)
+                if f
+            )
+            compiled["box"] = element["box"]
+            compiled["fit"] = element.get("fit", "fill")
+        else:
+            raise ValueError("Unknown layout element type: '{}'".format(kind))
+
+        return compiled
+
+    def _length(self, value, size):
+        px, vw, vh = parse_length(value, self.units)
+        return px + vw * size[0] / 100.0 + vh * size[1] / 100.0
+
+    def _box(self, box, size):
+        return [self._length(v, size) for v in box]
+
+    def font(self, name, size):
+        """
+        Returns (path, size, font) for a layout font at pixel
+        size, path is None when falling back on Pillow default.
+        """
+
+        path = find_font(self.fonts[name], self.resources_path)
+        size = max(1, int(round(size)))
+        return path, size, load_font(path, size)
+
+    def missing_fonts(self):
+        """
+        Returns the names of the fonts none of whose files
+        were found, drawn with Pillow default font instead.
+        """
+
+        return [
+            name for name, candidates in self.fonts.items()
+            if find_font(candidates, self.resources_path) is None
+        ]
+
+    def thumbnail_widths(self, size):
+        """
+        Returns the pixel width of every {thumbnail*} image
+        box at size, the width thumbnails should be made at.
+        """
+
+        return [
+            self._box(element["box"], size)[2]
+            for element in self.elements
+            if element["type"] == "image" and element["thumbnail"]
+        ]
+
+    @staticmethod
+    def _wrap(text, font, width):
+        lines = []
+        for paragraph in text.split("\n"):
+            if width is None:
+                lines.append(paragraph)
+                continue
+            line = ""
+            for word in paragraph.split(" "):
+                candidate = word if not line else line + " " + word
+                if line and font.getlength(candidate) > width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+
+    @staticmethod
+    def _text_ops(lines, font_spec, x, y, line_height, color, anchor):
+        # glyphs sit centered in their line box like css
+        # line-height, ops are placed on the baseline
+        font_path, font_size, font = font_spec
+        ascent, descent = font.getmetrics()
+        offset = (line_height - (ascent + descent)) / 2.0 + ascent
+        return [
+            (
+                "text",
+                round(x, 2),
+                round(y + i * line_height + offset, 2),
+                line,
+                font_path,
+                font_size,
+                color,
+                anchor
+            )
+            for i, line in enumerate(lines)
+            if line
+        ]
+
+    def resolve(self, data, size, process_optionals=True, missing=None):
+        """
+        Lays every element out at size with data and returns
+        the list of draw operations rasterize takes. Missing
+        keys raise KeyError like CompiledTemplate.render.
+        Images whose file doesn't exist are left out, their
+        paths get appended to missing if given, empty ones
+        are just skipped.
+        """
+
+        size = (int(size[0]), int(size[1]))
+        ops = []
+        if self.background is not None:
+            ops.append(("fill", (0, 0, size[0], size[1]), self.background))
+
+        for element in self.elements:
+            optional = element["optional"]
+            if optional and process_optionals and not data[optional]:
+                continue
+            kind = element["type"]
+            if kind == "rect":
+                x, y, w, h = self._box(element["box"], size)
+                ops.append(("fill", _pixel_box(x, y, w, h), element["fill"]))
+            elif kind == "text":
+                ops.extend(self._resolve_text(element, data, size))
+            elif kind == "table":
+                ops.extend(self._resolve_table(
+                    element, data, size, process_optionals
+                ))
+            elif kind == "image":
+                op = self._resolve_image(element, data, size)
+                if op is None:
+                    src = element["src"].render(data)
+                    if src and missing is not None:
+                        missing.append(src)
+                else:
+                    ops.append(op)
+
+        return ops
+
+    def _resolve_text(self, element, data, size):
+        x, y = self._box(element["pos"], size)
+        width = element["width"]
+        width = None if width is None else self._length(width, size)
+        font_spec = self.font(
+            element["font"], self._length(element["size"], size)
+        )
+        font = font_spec[2]
+        align = element["align"]
+        if width is not None and align == "center":
+            x += width / 2.0
+        elif width is not None and align == "right":
+            x += width
+        lines = self._wrap(element["text"].render(data), font, width)
+        return self._text_ops(
+            lines,
+            font_spec,
+            x,
+            y,
+            self._length(element["line_height"], size),
+            element["color"],
+            _anchors[align]
+        )
+
+    def _resolve_table(self, element, data, size, process_optionals):
+        x, y = self._box(element["pos"], size)
+        width = element["width"]
+        width = None if width is None else self._length(width, size)
+        font_spec = self.font(
+            element["font"], self._length(element["size"], size)
+        )
+        font = font_spec[2]
+        line_height = self._length(element["line_height"], size)
+        row_gap = self._length(element["row_gap"], size)
+        column_gap = self._length(element["column_gap"], size)
+        colors = element["colors"]
+
+        rows = [
+            [cell.render(data) for cell in cells]
+            for optional, cells in element["rows"]
+            if not (optional and process_optionals and not data[optional])
+        ]
+        if not rows:
+            return []
+
+        # every column but the last shrinks to its content,
+        # the last one takes the remaining width
+        columns = max(len(cells) for cells in rows)
+        widths = [
+            max(
+                (font.getlength(cells[i]) for cells in rows if i < len(cells)),
+                default=0
+            )
+            for i in range(columns - 1)
+        ]
+        lefts = []
+        left = x
+        for w in widths:
+            lefts.append(left)
+            left += w + column_gap
+        lefts.append(left)
+        last_width = None if width is None else max(x + width - left, 0)
+
+        ops = []
+        top = y
+        for cells in rows:
+            height = 1
+            for i, text in enumerate(cells):
+                lines = self._wrap(
+                    text,
+                    font,
+                    last_width if i == columns - 1 else None
+                )
+                height = max(height, len(lines))
+                ops.extend(self._text_ops(
+                    lines,
+                    font_spec,
+                    lefts[i],
+                    top,
+                    line_height,
+                    colors[min(i, len(colors) - 1)],
+                    "ls"
+                ))
+            top += height * line_height + row_gap
+        return ops
+
+    def _resolve_image(self, element, data, size):
+        src = element["src"].render(data)
+        if not src or not os.path.isfile(src):
+            return None
+        box = self._box(element["box"], size)
+        fit = element["fit"]
+        if len(box) == 3:
+            with Image.open(src) as image:
+                source_size = image.size
+            box.append(box[2] * source_size[1] / float(source_size[0]))
+            fit = "fill"
+        return ("image", src, _pixel_box(*box), fit)
+
+
+def _pixel_box(x, y, w, h):
+    return (
+        int(round(x)),
+        int(round(y)),
+        int(round(x + w)),
+        int(round(y + h))
+    )
+
+
+def _gradient(size, fill):
+    # interpolate a single row or column and let Pillow
+    # stretch it, the other axis is constant
+    direction, stops = fill[1], fill[2]
+    width, height = size
+    count = width if direction == "right" else height
+    t = (np.arange(count) + 0.5) * 100.0 / count
+    positions = [pos for color, pos in stops]
+    colors = np.array([color for color, pos in stops], dtype=np.float64)
+    line = np.stack(
+        [np.interp(t, positions, colors[:, c]) for c in range(4)],
+        axis=-1
+    )
+    line = np.rint(line).astype(np.uint8)
+    mode = "RGBA"
+    if (line[:, 3] == 255).all():
+        line = line[:, :3]
+        mode = "RGB"
+    if direction == "right":
+        line = line[np.newaxis]
+    else:
+        line = line[:, np.newaxis]
+    strip = Image.fromarray(np.ascontiguousarray(line), mode)
+    return strip.resize((width, height), Image.NEAREST)
+
+
+def _open_image(src, size):
+    image = Image.open(src)
+    # jpegs decode straight at a reduced scale
+    # when much bigger than the box
+    image.draft("RGB", size)
+    return image
+
+
+def _fit_image(image, box, fit):
+    width = box[2] - box[0]
+    height = box[3] - box[1]
+    if fit == "fill":
+        w, h = width, height
+    else:
+        scale = (min if fit == "contain" else max)(
+            width / float(image.width),
+            height / float(image.height)
+        )
+        w = max(1, int(round(image.width * scale)))
+        h = max(1, int(round(image.height * scale)))
+    image = image.resize((w, h), Image.LANCZOS, reducing_gap=3.0)
+    left = box[0] + (width - w) // 2
+    top = box[1] + (height - h) // 2
+    if fit == "cover":
+        image = image.crop((
+            box[0] - left,
+            box[1] - top,
+            box[0] - left + width,
+            box[1] - top + height
+        ))
+        left, top = box[:2]
+    return image, (left, top)
+
+
+def _paste(canvas, image, dest):
+    if image.mode == "RGBA":
+        canvas.paste(image.convert("RGB"), dest, image)
+    else:
+        canvas.paste(image, dest)
+
+
+def rasterize(ops, size):
+    """
+    Draws the operations of Layout.resolve on a new
+    RGB image of size and returns it.
+    """
+
+    _require()
+    size = (int(size[0]), int(size[1]))
+    canvas = Image.new("RGB", size, (255, 255, 255))
+    draw = ImageDraw.Draw(canvas, "RGBA")
+
+    for op in ops:
+        kind = op[0]
+        if kind == "fill":
+            box, fill = op[1], op[2]
+            if box[2] <= box[0] or box[3] <= box[1]:
+                continue
+            if fill[0] == "color":
+                draw.rectangle(
+                    (box[0], box[1], box[2] - 1, box[3] - 1),
+                    fill=fill[1]
+                )
+            else:
+                layer = _gradient((box[2] - box[0], box[3] - box[1]), fill)
+                _paste(canvas, layer, box[:2])
+        elif kind == "text":
+            x, y, text, font_path, font_size, color, anchor = op[1:]
+            draw.text(
+                (x, y),
+                text,
+                font=load_font(font_path, font_size),
+                fill=color,
+                anchor=anchor
+            )
+        elif kind == "image":
+            src, box, fit = op[1:]
+            if box[2] <= box[0] or box[3] <= box[1]:
+                continue
+            with _open_image(src, (box[2] - box[0], box[3] - box[1])) as image:
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA")
+                image, dest = _fit_image(image, box, fit)
+            _paste(canvas, image, dest)
+        else:
+            raise ValueError("Unknown raster operation: '{}'".format(kind))
+
+    return canvas
+
+
+def ops_key(ops):
+    """
+    Serializes draw operations, identifies a raster
+    render in the render cache.
+    """
+
+    return json.dumps(ops, separators=(",", ":"))
+
+
+def ops_resources(ops):
+    """
+    Returns the font and image files the draw operations
+    read, their content goes in the render cache key.
+    """
+
+    paths = OrderedDict()
+    for op in ops:
+        if op[0] == "text" and op[4] is not None:
+            paths[op[4]] = None
+        elif op[0] == "image":
+            paths[op[1]] = None
+    return list(paths)
+
+
+def png_bytes(image, compress_level=1):
+    """
+    Encodes an image to png, favoring speed over size
+    like the intermediate slate pngs do.
+    """
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+
+class LayoutCache:
+    """
+    Process wide LRU cache of compiled layouts, keyed like
+    the TemplateCache and compiled again only if the layout
+    file size or modification time changed.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, resources_path):
+        """
+        Returns the Layout read from path, compiling
+        it if missing or stale.
+        """
+
+        key = (os.path.abspath(path), os.path.normpath(resources_path))
+        st = os.stat(key[0])
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        with open(path, "r") as f:
+            layout = Layout(path, resources_path, json.load(f))
+
+        with self._lock:
+            self._entries[key] = (stamp, layout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return layout
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+layout_cache = LayoutCache()
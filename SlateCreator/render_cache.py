@@ -0,0 +1,222 @@
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+import threading
+
+
+_html_resource_regex = re.compile(
+    r"\b(?:src|href)=\"([^\"]*)\""
+)
+
+_tmp_suffix = ".tmp"
+
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+def file_hash(path):
+    """
+    Returns the sha1 of a file content, memoized by
+    path, size and mtime. None if the file is missing.
+    """
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_size, st.st_mtime_ns)
+
+    with _file_hashes_lock:
+        digest = _file_hashes.get(key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _file_hashes_lock:
+        _file_hashes[key] = digest
+
+    return digest
+
+
+def html_resources(html):
+    """
+    Returns the src/href paths referenced by html.
+    """
+
+    return _html_resource_regex.findall(html)
+
+
+class RenderCache:
+    """
+    Content addressed cache of rendered slates.
+
+    A slate is identified by the hash of its computed html,
+    its resolution and the content of every file the html
+    references, so a change in a css or thumbnail file
+    triggers a new render while a plain re-render is served
+    from disk. Hits are hardlinked (or copied across devices)
+    to the requested path. Least recently used files are
+    removed once the cache grows over max_bytes. The cache
+    size is tracked as slates get stored, the directory is
+    only scanned on first store, when the size crosses
+    max_bytes or when evict is called.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, html, resolution, ext=".png", resources=None):
+        """
+        Returns the cache key of a slate. Files referenced by
+        html are hashed along, resources lists them instead
+        for sources that aren't html.
+        """
+
+        h = hashlib.sha1()
+        h.update(html.encode("utf-8"))
+        h.update("{}x{}{}".format(resolution[0], resolution[1], ext).encode())
+        if resources is None:
+            resources = html_resources(html)
+        for path in resources:
+            if path.startswith("data:"):
+                # embedded, already part of the html hash
+                continue
+            digest = file_hash(path) if os.path.isabs(path) else None
+            h.update("{}={}".format(path, digest).encode("utf-8"))
+        return h.hexdigest() + ext
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    @staticmethod
+    def _place(source, dest):
+        """
+        Hardlinks (or copies across devices) source to a
+        unique name next to dest, then renames it over dest,
+        so threads placing the same path never trip on each
+        other's files.
+        """
+
+        fd, tmp = tempfile.mkstemp(
+            prefix=os.path.basename(dest) + ".",
+            suffix=_tmp_suffix,
+            dir=os.path.dirname(dest) or "."
+        )
+        os.close(fd)
+        try:
+            os.remove(tmp)
+            try:
+                os.link(source, tmp)
+            except OSError:
+                shutil.copyfile(source, tmp)
+            os.replace(tmp, dest)
+        finally:
+            # rename leaves tmp alone if dest already
+            # was the same file
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+
+    def fetch(self, key, output_path):
+        """
+        Places the cached slate at output_path,
+        returns False on a miss.
+        """
+
+        cached = self._path(key)
+        try:
+            os.utime(cached)
+            self._place(cached, output_path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return False
+
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, rendered_path):
+        """
+        Adds a freshly rendered slate to the cache.
+        """
+
+        cached = self._path(key)
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        try:
+            replaced = os.stat(cached).st_size
+        except OSError:
+            replaced = 0
+        self._place(rendered_path, cached)
+        size = os.stat(cached).st_size
+
+        with self._lock:
+            if self._size is not None:
+                self._size += size - replaced
+                if self._size <= self.max_bytes:
+                    return
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used slates until the cache
+        fits in max_bytes.
+        """
+
+        with self._lock:
+            entries = []
+            total = 0
+            for sub in os.scandir(self.directory):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.name.endswith(_tmp_suffix):
+                        # being placed by another thread
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            if total > self.max_bytes:
+                entries.sort()
+                for mtime, size, path in entries:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            self._size = total
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_render_cache(directory):
+    """
+    Returns the process wide RenderCache stored in directory.
+    """
+
+    directory = os.path.abspath(directory)
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = RenderCache(directory)
+            _caches[directory] = cache
+        return cache
@@ -0,0 +1,730 @@
+import os
+import json
+import time
+import queue
+import atexit
+import base64
+import select
+import shutil
+import signal
+import itertools
+import logging
+import pathlib
+import platform
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager, ExitStack
+from html2image import Html2Image
+
+
+# Patches the live document into the given html: nodes are
+# compared in place and only changed text, attributes or
+# subtrees get touched, so stylesheets and images that didn't
+# change are neither reloaded nor decoded again. Resolves once
+# images are decoded and a new frame has been laid out.
+_morph_script = """
+(function (html) {
+    var fresh = new DOMParser().parseFromString(html, "text/html");
+    function morph(a, b) {
+        if (a.nodeType !== b.nodeType || a.nodeName !== b.nodeName) {
+            a.replaceWith(document.importNode(b, true));
+            return;
+        }
+        if (a.nodeType !== 1) {
+            if (a.nodeValue !== b.nodeValue) {
+                a.nodeValue = b.nodeValue;
+            }
+            return;
+        }
+        for (var i = a.attributes.length - 1; i >= 0; i--) {
+            if (!b.hasAttribute(a.attributes[i].name)) {
+                a.removeAttribute(a.attributes[i].name);
+            }
+        }
+        for (var j = 0; j < b.attributes.length; j++) {
+            var attr = b.attributes[j];
+            if (a.getAttribute(attr.name) !== attr.value) {
+                a.setAttribute(attr.name, attr.value);
+            }
+        }
+        while (a.childNodes.length > b.childNodes.length) {
+            a.removeChild(a.lastChild);
+        }
+        for (var k = 0; k < b.childNodes.length; k++) {
+            if (k < a.childNodes.length) {
+                morph(a.childNodes[k], b.childNodes[k]);
+            } else {
+                a.appendChild(document.importNode(b.childNodes[k], true));
+            }
+        }
+    }
+    morph(document.documentElement, fresh.documentElement);
+    return Promise.all(Array.from(document.images).map(function (img) {
+        return img.decode().catch(function () {});
+    })).then(function () {
+        return new Promise(function (resolve) {
+            requestAnimationFrame(function () { resolve(true); });
+        });
+    });
+})(%s)
+"""
+
+
+class BrowserError(RuntimeError):
+    """
+    Raised when the headless browser dies, times out
+    or answers a DevTools command with an error.
+    """
+
+
+def devtools_pipe_available():
+    """
+    Returns True if browsers can be driven through the
+    DevTools pipe, which needs posix_spawn to hand them
+    fds 3 and 4. Not the case on windows.
+    """
+
+    return (
+        platform.system().lower() != "windows" and
+        hasattr(os, "posix_spawnp")
+    )
+
+
+class _BrowserProcess:
+    """
+    Popen like handle of a browser started with posix_spawn.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            try:
+                pid, status = os.waitpid(self.pid, os.WNOHANG)
+            except ChildProcessError:
+                self.returncode = -1
+                return self.returncode
+            if pid:
+                self.returncode = os.waitstatus_to_exitcode(status)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() > deadline:
+                raise subprocess.TimeoutExpired(str(self.pid), timeout)
+            time.sleep(0.01)
+        return self.returncode
+
+    def kill(self):
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+class BrowserWorker:
+    """
+    Single long lived headless Chrome instance driven
+    through the DevTools protocol.
+
+    The browser is started once with --remote-debugging-pipe
+    and every render reuses the same page, so the cold start
+    is only paid on the first screenshot. Messages are plain
+    json strings terminated by a null byte, the browser reads
+    them on fd 3 and writes answers on fd 4. The pipes are
+    mapped there by posix_spawn, which unlike preexec_fn is
+    safe while other threads run, workers get started from
+    the batch and daemon thread pools.
+    """
+
+    default_flags = [
+        "--default-background-color=000000",
+        "--hide-scrollbars",
+    ]
+
+    def __init__(
+        self,
+        executable,
+        flags=None,
+        timeout=30,
+        log=None
+    ):
+        self.executable = executable
+        self.flags = list(flags) if flags is not None else list(
+            self.default_flags
+        )
+        self.timeout = timeout
+        self.log = log or logging.getLogger("SlateCreator")
+        self.renders = 0
+        self._proc = None
+        self._cmd_fd = None
+        self._resp_fd = None
+        self._buffer = b""
+        self._events = []
+        self._msg_id = 0
+        self._session_id = None
+        self._viewport = None
+        self._user_data_dir = ""
+
+    @property
+    def alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        """
+        Launches the browser and attaches to a fresh page.
+        """
+
+        if self.alive:
+            return
+
+        if not devtools_pipe_available():
+            raise BrowserError(
+                "DevTools pipe transport is not available on this platform."
+            )
+
+        import fcntl
+
+        self._user_data_dir = tempfile.mkdtemp(prefix="slate_browser_")
+
+        cmd_read, cmd_write = os.pipe()
+        resp_read, resp_write = os.pipe()
+        # the browser ends go above 10 first, they could be
+        # 3 or 4 themselves and get clobbered by the mapping
+        child_read = fcntl.fcntl(cmd_read, fcntl.F_DUPFD_CLOEXEC, 10)
+        child_write = fcntl.fcntl(resp_write, fcntl.F_DUPFD_CLOEXEC, 10)
+        os.close(cmd_read)
+        os.close(resp_write)
+
+        cmd = [self.executable]
+        cmd.extend([
+            "--headless",
+            "--remote-debugging-pipe",
+            "--disable-gpu",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--user-data-dir={}".format(self._user_data_dir),
+        ])
+        cmd.extend(self.flags)
+        cmd.append("about:blank")
+
+        self.log.debug("Starting browser: '{}'".format(" ".join(cmd)))
+
+        try:
+            pid = os.posix_spawnp(
+                cmd[0],
+                cmd,
+                os.environ,
+                file_actions=[
+                    (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+                    (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+                    (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0),
+                    (os.POSIX_SPAWN_DUP2, child_read, 3),
+                    (os.POSIX_SPAWN_DUP2, child_write, 4),
+                ]
+            )
+        except OSError:
+            os.close(cmd_write)
+            os.close(resp_read)
+            raise
+        finally:
+            os.close(child_read)
+            os.close(child_write)
+        self._proc = _BrowserProcess(pid)
+
+        self._cmd_fd = cmd_write
+        self._resp_fd = resp_read
+        self._buffer = b""
+        self._events = []
+        self._viewport = None
+        self.renders = 0
+
+        try:
+            target = self.send(
+                "Target.createTarget",
+                {"url": "about:blank"},
+                session=False
+            )
+            attached = self.send(
+                "Target.attachToTarget",
+                {"targetId": target["targetId"], "flatten": True},
+                session=False
+            )
+            self._session_id = attached["sessionId"]
+            self.send("Page.enable")
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        """
+        Terminates the browser and releases its resources.
+        """
+
+        if self._proc is not None:
+            if self._proc.poll() is None:
+                try:
+                    self.send("Browser.close", session=False, timeout=5)
+                except Exception:
+                    pass
+                try:
+                    self._proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._proc.kill()
+                    self._proc.wait()
+            self._proc = None
+
+        for fd in (self._cmd_fd, self._resp_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._cmd_fd = None
+        self._resp_fd = None
+        self._session_id = None
+
+        if self._user_data_dir:
+            shutil.rmtree(self._user_data_dir, ignore_errors=True)
+            self._user_data_dir = ""
+
+    def _read_message(self, deadline):
+        while b"\0" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise BrowserError("Timed out waiting for the browser.")
+            ready, _, _ = select.select([self._resp_fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(self._resp_fd, 65536)
+            if not chunk:
+                raise BrowserError("Browser closed the DevTools pipe.")
+            self._buffer += chunk
+        message, self._buffer = self._buffer.split(b"\0", 1)
+        return json.loads(message.decode("utf-8"))
+
+    def send(self, method, params=None, session=True, timeout=None):
+        """
+        Sends a DevTools command and blocks until its answer
+        arrives. Events received meanwhile are queued.
+        """
+
+        self._msg_id += 1
+        msg_id = self._msg_id
+        message = {"id": msg_id, "method": method, "params": params or {}}
+        if session:
+            message["sessionId"] = self._session_id
+
+        data = json.dumps(message).encode("utf-8") + b"\0"
+        while data:
+            written = os.write(self._cmd_fd, data)
+            data = data[written:]
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while True:
+            answer = self._read_message(deadline)
+            if answer.get("id") == msg_id:
+                if "error" in answer:
+                    raise BrowserError("{}: {}".format(
+                        method, answer["error"].get("message")
+                    ))
+                return answer.get("result", {})
+            if "method" in answer:
+                self._events.append(answer)
+
+    def wait_event(self, method, timeout=None):
+        """
+        Blocks until the given DevTools event is received.
+        """
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while True:
+            for i, event in enumerate(self._events):
+                if event["method"] == method:
+                    return self._events.pop(i)
+            answer = self._read_message(deadline)
+            if "method" in answer:
+                self._events.append(answer)
+
+    def set_viewport(self, size):
+        """
+        Resizes the page viewport, skipped if unchanged.
+        """
+
+        width, height = int(size[0]), int(size[1])
+        if self._viewport == (width, height):
+            return
+        self.send("Emulation.setDeviceMetricsOverride", {
+            "width": width,
+            "height": height,
+            "deviceScaleFactor": 1,
+            "mobile": False
+        })
+        self._viewport = (width, height)
+
+    def set_transparent(self, transparent=True):
+        """
+        Renders pages over a transparent background instead
+        of the default one, for layers composited later.
+        """
+
+        params = {}
+        if transparent:
+            params["color"] = {"r": 0, "g": 0, "b": 0, "a": 0}
+        self.send("Emulation.setDefaultBackgroundColorOverride", params)
+
+    def load(self, html_str):
+        """
+        Loads an html string in the page and waits for all its
+        resources. The html goes through a file so relative and
+        file system paths resolve the same way they do in
+        Html2Image.
+        """
+
+        html_path = os.path.join(
+            self._user_data_dir,
+            "slate_{}.html".format(self.renders)
+        )
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(html_str)
+
+        self._events = []
+        try:
+            self.send("Page.navigate", {
+                "url": pathlib.Path(html_path).as_uri()
+            })
+            self.wait_event("Page.loadEventFired")
+        finally:
+            os.remove(html_path)
+
+    def capture(self, size):
+        """
+        Captures the current viewport and returns png bytes.
+        """
+
+        result = self.send("Page.captureScreenshot", {
+            "format": "png",
+            "clip": {
+                "x": 0,
+                "y": 0,
+                "width": int(size[0]),
+                "height": int(size[1]),
+                "scale": 1
+            }
+        })
+        self.renders += 1
+        return base64.b64decode(result["data"])
+
+    def render(self, html_str, size):
+        """
+        Renders html and returns png bytes, nothing
+        gets written to disk but the page itself.
+        """
+
+        self.start()
+        self.set_viewport(size)
+        self.load(html_str)
+        return self.capture(size)
+
+    def evaluate(self, expression):
+        """
+        Evaluates a javascript expression in the loaded page
+        and returns its value, promises are awaited.
+        """
+
+        result = self.send("Runtime.evaluate", {
+            "expression": expression,
+            "awaitPromise": True,
+            "returnByValue": True
+        })
+        if "exceptionDetails" in result:
+            raise BrowserError("Page script failed: {}".format(
+                result["exceptionDetails"].get("text")
+            ))
+        return result.get("result", {}).get("value")
+
+    def update(self, html_str):
+        """
+        Morphs the loaded page into html_str without
+        navigating, see _morph_script.
+        """
+
+        self.evaluate(_morph_script % json.dumps(html_str))
+
+    def render_variants(self, variants):
+        """
+        Renders (html_str, size) variants from a single page
+        load. The first variant loads the page, the next ones
+        only patch the changed DOM nodes and resize the
+        viewport before capturing. Yields png bytes.
+        """
+
+        loaded = False
+        for html_str, size in variants:
+            self.start()
+            self.set_viewport(size)
+            if not loaded:
+                self.load(html_str)
+                loaded = True
+            else:
+                self.update(html_str)
+            yield self.capture(size)
+
+    def screenshot(self, html_str, output_path, size):
+        """
+        Renders html to a png file and returns its path.
+        """
+
+        png = self.render(html_str, size)
+        with open(output_path, "wb") as f:
+            f.write(png)
+        return output_path
+
+
+class RenderPool:
+    """
+    Pool of warm headless browsers shared across renders.
+
+    Workers are started lazily the first time they are needed
+    and stay alive until they reach max_renders, after which
+    they get recycled to keep browser memory in check. Use it
+    as a context manager or call close() to shut every browser
+    down cleanly.
+    Where the DevTools pipe is not available, like on windows,
+    render, render_variants and screenshot fall back to a cold
+    Html2Image browser per render, while worker level calls
+    (acquire, evaluate, burn-ins) raise BrowserError.
+
+    example:
+        with RenderPool(size=4) as pool:
+            slate.set_render_pool(pool)
+            slate.render_slate()
+    """
+
+    def __init__(
+        self,
+        size=1,
+        max_renders=200,
+        browser_executable="",
+        flags=None,
+        timeout=30,
+        log=None
+    ):
+        if size < 1:
+            raise ValueError("Render pool size must be at least 1!")
+
+        self.size = size
+        self.max_renders = max_renders
+        self.flags = flags
+        self.timeout = timeout
+        self.log = log or logging.getLogger("SlateCreator")
+        self._executable = browser_executable
+        self._workers = []
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.devtools = devtools_pipe_available()
+        self._html2image = None
+        self._html2image_dir = ""
+        self._names = itertools.count()
+        for i in range(size):
+            self._idle.put(None)
+        atexit.register(self.close)
+
+    @property
+    def executable(self):
+        """
+        Browser executable, resolved once through html2image
+        if not specified.
+        """
+
+        if not self._executable:
+            self._executable = Html2Image().browser.executable
+        return self._executable
+
+    def _new_worker(self):
+        worker = BrowserWorker(
+            self.executable,
+            flags=self.flags,
+            timeout=self.timeout,
+            log=self.log
+        )
+        with self._lock:
+            if self._closed:
+                raise BrowserError("Render pool is closed.")
+            self._workers.append(worker)
+        return worker
+
+    def _discard(self, worker):
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+
+    @contextmanager
+    def acquire(self):
+        """
+        Checks out a started worker for exclusive use.
+        Broken or exhausted workers are replaced on release.
+        """
+
+        if self._closed:
+            raise BrowserError("Render pool is closed.")
+        if not self.devtools:
+            raise BrowserError(
+                "Page scripts need the DevTools pipe transport, "
+                "not available on this platform."
+            )
+
+        worker = self._idle.get()
+        if self._closed:
+            # closed while waiting, pass the slot on to wake
+            # the next waiter instead of starting a browser
+            if worker is not None:
+                self._discard(worker)
+            self._idle.put(None)
+            raise BrowserError("Render pool is closed.")
+        try:
+            if worker is None or not worker.alive:
+                if worker is not None:
+                    self._discard(worker)
+                worker = self._new_worker()
+                worker.start()
+                if self._closed:
+                    raise BrowserError("Render pool is closed.")
+            yield worker
+        except Exception:
+            if worker is not None:
+                self._discard(worker)
+            self._idle.put(None)
+            raise
+        else:
+            if self._closed:
+                self._discard(worker)
+                self._idle.put(None)
+            elif worker.renders >= self.max_renders:
+                self.log.debug(
+                    "Recycling browser after {} renders".format(
+                        worker.renders
+                    )
+                )
+                self._discard(worker)
+                self._idle.put(None)
+            else:
+                self._idle.put(worker)
+
+    def warm(self):
+        """
+        Starts every browser of the pool now instead of on
+        first use, so no render pays for a browser start.
+        """
+
+        if not self.devtools:
+            return
+        with ExitStack() as stack:
+            for i in range(self.size):
+                stack.enter_context(self.acquire())
+
+    def render(self, html_str, size):
+        """
+        Renders html to png bytes using the first free worker.
+        """
+
+        if not self.devtools:
+            return self._render_html2image(html_str, size)
+        with self.acquire() as worker:
+            return worker.render(html_str, size)
+
+    def render_variants(self, variants):
+        """
+        Renders (html_str, size) variants on a single worker
+        from one page load, returns a list of png bytes.
+        """
+
+        if not self.devtools:
+            return [self._render_html2image(h, s) for h, s in variants]
+        with self.acquire() as worker:
+            return list(worker.render_variants(variants))
+
+    def evaluate(self, html_str, size, expression):
+        """
+        Loads html at the given viewport size and returns the
+        value of a javascript expression evaluated in it.
+        """
+
+        with self.acquire() as worker:
+            worker.set_viewport(size)
+            worker.load(html_str)
+            return worker.evaluate(expression)
+
+    def screenshot(self, html_str, output_path, size):
+        """
+        Renders html to a png file using the first free worker.
+        """
+
+        if not self.devtools:
+            png = self._render_html2image(html_str, size)
+            with open(output_path, "wb") as f:
+                f.write(png)
+            return output_path
+        with self.acquire() as worker:
+            return worker.screenshot(html_str, output_path, size)
+
+    def _render_html2image(self, html_str, size):
+        """
+        Renders html to png bytes through Html2Image, for
+        platforms without the DevTools pipe.
+        """
+
+        if self._closed:
+            raise BrowserError("Render pool is closed.")
+        with self._lock:
+            if self._html2image is None:
+                self._html2image_dir = tempfile.mkdtemp(
+                    prefix="slate_html2image_"
+                )
+                self._html2image = Html2Image(
+                    browser_executable=self._executable or None,
+                    output_path=self._html2image_dir,
+                    temp_path=self._html2image_dir,
+                    custom_flags=self.flags
+                )
+
+        name = "slate_{}.png".format(next(self._names))
+        path = self._html2image.screenshot(
+            html_str=html_str,
+            save_as=name,
+            size=tuple(size)
+        )[0]
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def close(self):
+        """
+        Shuts every browser in the pool down.
+        """
+
+        self._closed = True
+        atexit.unregister(self.close)
+        with self._lock:
+            workers = list(self._workers)
+        for worker in workers:
+            self._discard(worker)
+        if self._html2image_dir:
+            shutil.rmtree(self._html2image_dir, ignore_errors=True)
+            self._html2image_dir = ""
+            self._html2image = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
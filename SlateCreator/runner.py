@@ -0,0 +1,118 @@
+import os
+import asyncio
+import logging
+import weakref
+import subprocess
+
+
+class AsyncRunner:
+    """
+    Runs tool commands as asyncio subprocesses.
+
+    At most max_concurrency commands run at the same time,
+    the others wait for a free slot. stdout and stderr are
+    read while the process runs, optionally handing every
+    chunk to a callback, and the process gets killed if it
+    times out or the awaiting task is cancelled.
+    Results are subprocess.CompletedProcess instances, like
+    the ones returned by the blocking tool calls.
+    """
+
+    def __init__(self, max_concurrency=0, timeout=None, log=None):
+        self.max_concurrency = max_concurrency or os.cpu_count() or 4
+        self.timeout = timeout
+        self.log = log or logging.getLogger("SlateCreator")
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    @staticmethod
+    async def _drain(stream, chunks, callback):
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                return
+            chunks.append(chunk)
+            if callback is not None:
+                callback(chunk)
+
+    async def run(
+        self,
+        cmd,
+        env=None,
+        timeout=None,
+        check=True,
+        on_stdout=None,
+        on_stderr=None
+    ):
+        """
+        Runs cmd and returns the completed process.
+        Raises subprocess.TimeoutExpired on timeout and
+        subprocess.CalledProcessError on failure if check.
+        """
+
+        timeout = timeout if timeout is not None else self.timeout
+
+        async with self._semaphore():
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                env=env,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout = []
+            stderr = []
+            io = asyncio.gather(
+                self._drain(proc.stdout, stdout, on_stdout),
+                self._drain(proc.stderr, stderr, on_stderr),
+                proc.wait()
+            )
+            try:
+                await asyncio.wait_for(io, timeout)
+            except BaseException as err:
+                # consume the outcome of the readers, they were
+                # cancelled along with the wait
+                io.add_done_callback(
+                    lambda f: f.cancelled() or f.exception()
+                )
+                if proc.returncode is None:
+                    proc.kill()
+                    await asyncio.shield(proc.wait())
+                if isinstance(err, asyncio.TimeoutError):
+                    raise subprocess.TimeoutExpired(
+                        cmd,
+                        timeout,
+                        output=b"".join(stdout),
+                        stderr=b"".join(stderr)
+                    ) from None
+                raise
+
+        res = subprocess.CompletedProcess(
+            cmd,
+            proc.returncode,
+            b"".join(stdout),
+            b"".join(stderr)
+        )
+        if check:
+            res.check_returncode()
+
+        return res
+
+    async def run_all(self, cmds, env=None, timeout=None, check=True):
+        """
+        Runs many commands concurrently, returns completed
+        processes or exceptions in the same order.
+        """
+
+        return await asyncio.gather(
+            *(self.run(cmd, env=env, timeout=timeout, check=check)
+              for cmd in cmds),
+            return_exceptions=True
+        )
@@ -0,0 +1,196 @@
+import os
+import re
+import threading
+from .probe import is_movie
+
+
+# printf tokens are %d or zero padded only, so url encoded
+# names like my%20doc.mov don't count
+_frame_token_regex = re.compile(
+    r"(#+|@+|%(0\d+)?d|\$F(\d*))"
+)
+
+
+def _token(path):
+    """
+    Returns the frame token match in the file name of
+    path and the offset of that name, (None, offset) if
+    there is none. Directories never hold frame tokens,
+    like /mnt/user@studio/shot.mov
+    """
+
+    offset = max(path.rfind("/"), path.rfind("\\")) + 1
+    if is_movie(path):
+        return None, offset
+    return _frame_token_regex.search(path, offset), offset
+
+
+def is_sequence(path):
+    """
+    Returns True if the file name of path holds a frame
+    token like ####, @@@@, %04d or $F4.
+    """
+
+    return _token(path)[0] is not None
+
+
+def _padding(m):
+    token = m.group(1)
+    if token[0] in "#@":
+        return len(token)
+    return int(m.group(2) or m.group(3) or 1)
+
+
+def frame_path(pattern, frame):
+    """
+    Expands the frame token of a sequence pattern,
+    example: ("shot.####.exr", 1001) -> "shot.1001.exr"
+    """
+
+    m = _token(pattern)[0]
+    if m is None:
+        raise ValueError(
+            "No frame token in sequence pattern: '{}'".format(pattern)
+        )
+    padding = _padding(m)
+    if frame < 0:
+        number = "-{:0{}d}".format(-frame, padding)
+    else:
+        number = "{:0{}d}".format(frame, padding)
+    return pattern[:m.start()] + number + pattern[m.end():]
+
+
+def frame_token_printf(pattern):
+    """
+    Rewrites the frame token of a sequence pattern in printf
+    form, as read by ffmpeg, example: "shot.####.exr" ->
+    "shot.%04d.exr". Other % get escaped.
+    """
+
+    m = _token(pattern)[0]
+    if m is None:
+        return pattern
+    return "{}%0{}d{}".format(
+        pattern[:m.start()].replace("%", "%%"),
+        _padding(m),
+        pattern[m.end():].replace("%", "%%")
+    )
+
+
+def sequence_regex(pattern):
+    """
+    Returns a regex matching the file names of a sequence
+    pattern, capturing the frame number. Frames longer
+    than the padding match too, like shot.10000.exr for
+    shot.####.exr
+    """
+
+    m, offset = _token(pattern)
+    name = pattern[offset:]
+    if m is None:
+        raise ValueError(
+            "No frame token in sequence pattern: '{}'".format(pattern)
+        )
+    padding = _padding(m)
+    digits = r"\d{{{}}}|[1-9]\d{{{},}}".format(padding, padding)
+    return re.compile("{}(-?(?:{})){}$".format(
+        re.escape(name[:m.start() - offset]),
+        digits,
+        re.escape(name[m.end() - offset:])
+    ))
+
+
+class DirectoryCache:
+    """
+    Process wide cache of directory listings, each one
+    read with a single os.scandir pass and read again only
+    if the directory modification time changed. Frames
+    found for a sequence pattern are kept with the listing,
+    so looking up sequences costs the same however many
+    frames they have.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, directory):
+        directory = os.path.abspath(directory)
+        stamp = os.stat(directory).st_mtime_ns
+
+        with self._lock:
+            entry = self._entries.get(directory)
+            if entry is not None and entry[0] == stamp:
+                return entry
+
+        with os.scandir(directory) as it:
+            names = tuple(e.name for e in it if not e.is_dir())
+        entry = (stamp, names, {})
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[directory] = entry
+
+        return entry
+
+    def listdir(self, directory):
+        """
+        Returns the file names in directory.
+        """
+
+        return self._entry(directory)[1]
+
+    def frames(self, pattern):
+        """
+        Returns the sorted frame numbers on disk
+        of a sequence pattern.
+        """
+
+        directory = os.path.dirname(pattern) or "."
+        stamp, names, found = self._entry(directory)
+        frames = found.get(pattern)
+        if frames is None:
+            regex = sequence_regex(pattern)
+            frames = sorted(
+                int(m.group(1))
+                for m in map(regex.match, names)
+                if m is not None
+            )
+            found[pattern] = frames
+        return frames
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+directory_cache = DirectoryCache()
+
+
+def frame_range(pattern):
+    """
+    Returns (first, last, count) of the frames on disk of
+    a sequence pattern, count is less than last - first + 1
+    if frames are missing.
+    Raises FileNotFoundError if there are none.
+    """
+
+    frames = directory_cache.frames(pattern)
+    if not frames:
+        raise FileNotFoundError(
+            "No frames found for sequence: '{}'".format(pattern)
+        )
+    return frames[0], frames[-1], len(frames)
+
+
+def first_frame(path):
+    """
+    Returns the first frame on disk of a sequence
+    pattern, other paths are returned as they are.
+    """
+
+    if not is_sequence(path):
+        return path
+    return frame_path(path, frame_range(path)[0])
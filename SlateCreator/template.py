@@ -0,0 +1,391 @@
+import os
+import re
+import string
+import threading
+from collections import OrderedDict
+from .bundle import bundle_uri
+
+
+_html_token_regex = re.compile(
+    r"(?P<comment><!--.*?(?:-->|\Z))"
+    r"|(?P<attr>\b(?:src|href)=\")(?P<path>[^\"]*)\""
+    r"|(?P<escape>{{|}})"
+    r"|{(?P<field>[^{}]*)}",
+    re.DOTALL
+)
+_html_field_regex = re.compile(
+    r"{{|}}|{([^{}]*)}"
+)
+_url_scheme_regex = re.compile(
+    r"^[a-zA-Z][a-zA-Z0-9+.-]+:"
+)
+_field_part_regex = re.compile(
+    r"\.([^.\[]+)|\[([^\]]+)\]"
+)
+_conversions = {
+    "s": str,
+    "r": repr,
+    "a": ascii,
+}
+
+hidden_string = "style=\"display:None;\""
+
+
+def split_field(field):
+    """
+    Splits a format field name like str.format does,
+    example: "project[name]" -> ("project", [(False, "name")])
+    Item keys made of digits are converted to int.
+    """
+
+    root = field_root(field)
+    path = []
+    pos = len(root)
+    while pos < len(field):
+        m = _field_part_regex.match(field, pos)
+        if m is None:
+            raise ValueError(
+                "Invalid field name in template: '{}'".format(field)
+            )
+        if m.group(1) is not None:
+            path.append((True, m.group(1)))
+        else:
+            key = m.group(2)
+            path.append((False, int(key) if key.isdigit() else key))
+        pos = m.end()
+    return root, path
+
+
+def field_root(field):
+    """
+    Returns the data key a format field looks up,
+    example: "project[name]!s:>10" -> "project"
+    """
+
+    for i, c in enumerate(field):
+        if c in ".[!:":
+            return field[:i]
+    return field
+
+
+class CompiledTemplate:
+    """
+    Template read from disk with every resource path
+    already absolutized, ready to be formatted.
+
+    Along with the template string it keeps the placeholder
+    metadata collected while compiling:
+        fields: root data keys used by the template
+        optional_fields: keys with a {key_optional} toggle
+        resource_fields: {thumbnail*} keys holding file paths
+        resources: absolute paths of static resources
+        inline: True if resources are embedded as data uris
+    """
+
+    __slots__ = (
+        "path",
+        "resources_path",
+        "string",
+        "fields",
+        "optional_fields",
+        "resource_fields",
+        "resources",
+        "inline",
+        "_parts",
+        "_slots"
+    )
+
+    def __init__(
+        self,
+        path,
+        resources_path,
+        string,
+        fields=(),
+        optional_fields=(),
+        resource_fields=(),
+        resources=(),
+        inline=False
+    ):
+        self.path = path
+        self.resources_path = resources_path
+        self.string = string
+        self.fields = tuple(fields)
+        self.optional_fields = tuple(optional_fields)
+        self.resource_fields = tuple(resource_fields)
+        self.resources = tuple(resources)
+        self.inline = inline
+        self._compile()
+
+    def _compile(self):
+        """
+        Splits the template string once into literal parts and
+        field slots, each slot holding a getter that pulls its
+        value out of the data dict.
+        """
+
+        parts = []
+        slots = []
+        for literal, field, spec, conversion in string.Formatter().parse(
+            self.string
+        ):
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            slots.append((len(parts), self._field_getter(
+                field, spec, conversion
+            )))
+            parts.append(None)
+        self._parts = parts
+        self._slots = slots
+
+    def _field_getter(self, field, spec, conversion):
+        if spec and "{" in spec:
+            # nested replacement fields, leave it to str.format
+            source = "{" + field
+            if conversion:
+                source += "!" + conversion
+            source += ":" + spec + "}"
+            return lambda data, optionals: source.format_map(data)
+
+        root, path = split_field(field)
+        if not root or root.isdigit():
+            raise ValueError(
+                "Positional field '{}' in template is not supported.".format(
+                    field
+                )
+            )
+        convert = _conversions.get(conversion)
+        optional = None
+        if root.endswith("_optional") and not path:
+            base = root[:-len("_optional")]
+            if base in self.optional_fields:
+                optional = base
+        resource = root in self.resource_fields and not path
+        resources_path = self.resources_path
+
+        def _get(data, optionals):
+            if optional is not None and optionals:
+                value = "" if data[optional] else hidden_string
+            else:
+                value = data[root]
+            for is_attr, key in path:
+                value = getattr(value, key) if is_attr else value[key]
+            if resource and value and isinstance(value, str) and not (
+                os.path.isabs(value) or _url_scheme_regex.match(value)
+            ):
+                value = resolve_resource_path(value, resources_path)
+            if convert is not None:
+                value = convert(value)
+            return format(value, spec)
+
+        return _get
+
+    def render(self, data, process_optionals=True):
+        """
+        Formats the template with data in a single join.
+        {key_optional} fields resolve to a hidden style when
+        key is empty, relative paths in {thumbnail*} fields
+        are expanded with the resources path.
+        Missing keys raise KeyError like str.format_map.
+        """
+
+        parts = list(self._parts)
+        for index, getter in self._slots:
+            parts[index] = getter(data, process_optionals)
+        return "".join(parts)
+
+
+def resolve_resource_path(path, resources_path):
+    """
+    Expands a relative resource path using its file
+    name and the resources directory as base.
+    """
+
+    base, file = os.path.split(path)
+
+    if resources_path:
+        return os.path.normpath(
+            os.path.join(
+                resources_path,
+                file
+            )
+        )
+    return os.path.normpath(file)
+
+
+def _is_rewritable(path):
+    return (
+        path
+        and "{" not in path
+        and not path.startswith("#")
+        and _url_scheme_regex.match(path) is None
+    )
+
+
+def compile_template(template_path, resources_path, inline=False):
+    """
+    Reads template from file and normalizes/absolutizes
+    any relative paths in html. The paths gets expanded with
+    the resources directory as base.
+
+    The template is walked once: comments are stripped,
+    every src/href path is rewritten and placeholders are
+    collected as they are met.
+
+    With inline, existing resources are embedded as data
+    uris instead, stylesheets along with their url() and
+    @import references, so rendering needs no file reads.
+    """
+
+    with open(template_path, 'r') as t:
+        template = t.read()
+
+    chunks = []
+    fields = {}
+    resources = {}
+    pos = 0
+
+    def _add_field(field):
+        root = field_root(field)
+        if root:
+            fields[root] = None
+
+    for m in _html_token_regex.finditer(template):
+        kind = m.lastgroup
+        if kind == "field":
+            _add_field(m.group("field"))
+            continue
+        if kind == "escape":
+            continue
+
+        chunks.append(template[pos:m.start()])
+        pos = m.end()
+
+        if kind == "comment":
+            continue
+
+        path = m.group("path")
+        if _is_rewritable(path):
+            path = resolve_resource_path(path, resources_path)
+            resources[path] = None
+            if inline and os.path.isfile(path):
+                path = bundle_uri(path, resources)
+        else:
+            for f in _html_field_regex.finditer(path):
+                if f.group(1) is not None:
+                    _add_field(f.group(1))
+        chunks.append(m.group("attr") + path + "\"")
+
+    chunks.append(template[pos:])
+
+    optional_fields = [
+        f[:-len("_optional")] for f in fields
+        if f.endswith("_optional")
+    ]
+    resource_fields = [
+        f for f in fields
+        if f.startswith("thumbnail")
+    ]
+
+    return CompiledTemplate(
+        template_path,
+        resources_path,
+        "".join(chunks),
+        fields=fields,
+        optional_fields=optional_fields,
+        resource_fields=resource_fields,
+        resources=resources,
+        inline=inline
+    )
+
+
+class TemplateCache:
+    """
+    Process wide LRU cache of compiled templates.
+
+    Entries are keyed by absolute template path, resources
+    path and inline mode, and get compiled again only if the
+    template file size or modification time changed since
+    last compile. Inlined templates are also compiled again
+    when one of their embedded resources changes.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _resources_stamp(self, compiled):
+        if not compiled.inline:
+            return None
+        return tuple(self._stamp(path) for path in compiled.resources)
+
+    def get(self, template_path, resources_path, inline=False):
+        """
+        Returns the CompiledTemplate for the given paths,
+        compiling it if missing or stale.
+        """
+
+        return self.lookup(template_path, resources_path, inline)[0]
+
+    def lookup(self, template_path, resources_path, inline=False):
+        """
+        Same as get, returns (CompiledTemplate, hit) where
+        hit is False if it had to be compiled.
+        """
+
+        key = (
+            os.path.abspath(template_path),
+            os.path.normpath(resources_path),
+            bool(inline)
+        )
+        st = os.stat(key[0])
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp and (
+            entry[2] == self._resources_stamp(entry[1])
+        ):
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            return entry[1], True
+
+        compiled = compile_template(
+            template_path,
+            resources_path,
+            inline=inline
+        )
+        resources_stamp = self._resources_stamp(compiled)
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (stamp, compiled, resources_stamp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return compiled, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+template_cache = TemplateCache()
@@ -0,0 +1,218 @@
+import os
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+from .sequence import is_sequence, frame_path, directory_cache
+from .probe import is_movie
+
+
+# Returns the css box width of every element matching a
+# selector, in css pixels at the current viewport size.
+measure_script = """
+Array.from(document.querySelectorAll(%s)).map(function (e) {
+    return e.getBoundingClientRect().width;
+})
+"""
+
+thumbnail_selector = ".thumb"
+
+class WidthCache:
+    """
+    Bounded LRU of measured thumbnail box widths, keyed by
+    (template path, template html, resolution).
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            width = self._entries.get(key)
+            if width is not None:
+                self._entries.move_to_end(key)
+            return width
+
+    def put(self, key, width):
+        with self._lock:
+            self._entries[key] = width
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+box_widths = WidthCache()
+
+
+def thumbnail_key(input, frames, width, ext):
+    """
+    Content address of a thumbnail set: source path, its
+    size and mtime, extracted frames, width and format.
+    """
+
+    source = input
+    if is_sequence(input):
+        source = os.path.dirname(input) or "."
+    try:
+        st = os.stat(source)
+        stamp = "{}:{}".format(st.st_size, st.st_mtime_ns)
+    except OSError:
+        stamp = ""
+
+    h = hashlib.sha1()
+    h.update("{}|{}|{}|{}|{}".format(
+        os.path.abspath(input),
+        stamp,
+        ",".join(str(f) for f in frames),
+        width,
+        ext
+    ).encode("utf-8"))
+    return h.hexdigest()
+
+
+def thumbnail_command(
+    input,
+    output_pattern,
+    frames,
+    width,
+    fps=None,
+    exec_ext=""
+):
+    """
+    Builds a single ffmpeg command extracting every frame
+    in frames (0 based, relative to the first frame), scaled
+    to width. Outputs are numbered from 1 in frame order
+    through output_pattern, like thumb_%02d.jpg
+    Sequences open only the chosen frame files, counted from
+    the first frame on disk, a missing frame takes the closest
+    one before it. Movies with a known fps seek their input to
+    each frame, so only the frames from the closest keyframe
+    on get decoded, others are read in one select pass.
+    Raises ValueError if a frame is past the end of a sequence.
+    """
+
+    if is_sequence(input):
+        inputs = [
+            ["-i", path] for path in sequence_frame_paths(input, frames)
+        ]
+        return _per_input_command(
+            input, inputs, output_pattern, width, exec_ext
+        )
+
+    if is_movie(input) and fps:
+        inputs = [
+            ["-ss", "{:.6f}".format(max(0.0, (f - 0.5) / float(fps))),
+             "-i", input]
+            for f in sorted(set(frames))
+        ]
+        return _per_input_command(
+            input, inputs, output_pattern, width, exec_ext
+        )
+
+    cmd = ["ffmpeg{}".format(exec_ext), "-v", "error", "-y"]
+    cmd.extend(_input_args(input))
+    cmd.extend(["-i", input])
+
+    select = "+".join(
+        "eq(n\\,{})".format(f) for f in sorted(set(frames))
+    )
+    filters = []
+    if is_movie(input):
+        filters.append("select='{}'".format(select))
+    filters.append("scale={}:-2:flags=lanczos".format(int(width)))
+
+    cmd.extend(["-vf", ",".join(filters)])
+    # keep selected frames as they are, the default sync
+    # fills the gaps by repeating the first one
+    cmd.extend(["-fps_mode", "passthrough"])
+    cmd.extend(["-frames:v", str(len(set(frames)))])
+    cmd.extend(_quality_args(output_pattern))
+    cmd.append(output_pattern)
+    return cmd
+
+
+def sequence_frame_paths(pattern, frames):
+    """
+    Returns the file of each frame in frames (sorted, 0 based
+    from the first frame on disk) of a sequence pattern.
+    Gaps resolve to the closest frame before them.
+    Raises ValueError for frames past the last one on disk.
+    """
+
+    numbers = directory_cache.frames(pattern)
+    if not numbers:
+        raise FileNotFoundError(
+            "No frames found for sequence: '{}'".format(pattern)
+        )
+    paths = []
+    for f in sorted(set(frames)):
+        number = numbers[0] + f
+        if f < 0 or number > numbers[-1]:
+            raise ValueError(
+                "Frame {} out of range for sequence '{}' ({}-{})".format(
+                    f, pattern, numbers[0], numbers[-1]
+                )
+            )
+        number = numbers[bisect.bisect_right(numbers, number) - 1]
+        paths.append(frame_path(pattern, number))
+    return paths
+
+
+def _input_args(input):
+    if os.path.splitext(input)[1].lower() == ".exr":
+        # exr decodes to linear, bring it back to display
+        return ["-apply_trc", "iec61966_2_1"]
+    return []
+
+
+def _quality_args(output):
+    ext = os.path.splitext(output)[1].lower()
+    if ext in (".jpg", ".jpeg"):
+        return ["-q:v", "3"]
+    if ext == ".webp":
+        return ["-quality", "85"]
+    return []
+
+
+def _per_input_command(input, inputs, output_pattern, width, exec_ext=""):
+    """
+    One input per frame, each mapped to an output of its own,
+    so ffmpeg decodes only the frames it is given. Movie inputs
+    seek to half a frame before theirs so accurate seeking
+    lands on it.
+    """
+
+    cmd = ["ffmpeg{}".format(exec_ext), "-v", "error", "-y"]
+    for args in inputs:
+        cmd.extend(_input_args(input))
+        cmd.extend(args)
+    for i in range(len(inputs)):
+        cmd.extend(["-map", "{}:v:0".format(i)])
+        cmd.extend(["-vf", "scale={}:-2:flags=lanczos".format(int(width))])
+        cmd.extend(["-frames:v", "1"])
+        cmd.extend(_quality_args(output_pattern))
+        cmd.append(output_pattern % (i + 1))
+    return cmd
+
+
+def spread_frames(count, length):
+    """
+    Returns count frame indexes evenly spread over length
+    frames, a single frame is taken from the middle.
+    """
+
+    if length <= 1 or count < 1:
+        return [0] * max(count, 1)
+    if count == 1:
+        return [length // 2]
+    step = (length - 1) / float(count - 1)
+    return [int(round(i * step)) for i in range(count)]
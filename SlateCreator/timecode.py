@@ -0,0 +1,201 @@
+import re
+import math
+import functools
+from collections import namedtuple
+
+
+_timecode_regex = re.compile(
+    r"^(\d+)[:;](\d\d)[:;](\d\d)[:;](\d+)$"
+)
+
+# drop frame rates and the frames dropped every minute
+_drop_frame_rates = (
+    (30000 / 1001, 2),
+    (60000 / 1001, 4),
+)
+
+RateParams = namedtuple("RateParams", (
+    "fps",
+    "nominal",
+    "drop",
+    "frames_per_minute",
+    "frames_per_10_minutes",
+    "frames_per_24_hours",
+    "separator",
+))
+
+
+@functools.lru_cache(maxsize=None)
+def rate_params(fps):
+    """
+    Returns the constants used to convert frames at fps,
+    computed once per rate. 29.97 and 59.94 (or their exact
+    NTSC values) are drop frame rates.
+    """
+
+    fps = float(fps)
+    if fps <= 0:
+        raise ValueError("Invalid timecode rate: {}".format(fps))
+
+    nominal = int(math.ceil(fps))
+    drop = 0
+    for rate, frames in _drop_frame_rates:
+        if abs(fps - rate) < 0.001:
+            drop = frames
+            break
+
+    return RateParams(
+        fps,
+        nominal,
+        drop,
+        nominal * 60 - drop,
+        nominal * 600 - drop * 9,
+        (nominal * 3600 - drop * 54) * 24,
+        ";" if drop else ":"
+    )
+
+
+def is_drop_frame_rate(fps):
+    return rate_params(fps).drop > 0
+
+
+@functools.lru_cache(maxsize=None)
+def _frame_labels(nominal):
+    return tuple("{:02d}".format(i) for i in range(max(nominal, 60)))
+
+
+def _components(frames, p):
+    if frames < 0:
+        raise ValueError("Frames can't be negative: {}".format(frames))
+
+    value = int(frames) % p.frames_per_24_hours
+    if p.drop:
+        chunks, rest = divmod(value, p.frames_per_10_minutes)
+        value += p.drop * 9 * chunks
+        if rest > p.drop:
+            value += p.drop * ((rest - p.drop) // p.frames_per_minute)
+
+    seconds, ff = divmod(value, p.nominal)
+    minutes, ss = divmod(seconds, 60)
+    hh, mm = divmod(minutes, 60)
+    return hh, mm, ss, ff
+
+
+def _to_timecode(frames, p, labels):
+    hh, mm, ss, ff = _components(frames, p)
+    return "{:02d}:{}:{}{}{}".format(
+        hh, labels[mm], labels[ss], p.separator, labels[ff]
+    )
+
+
+def frames_to_timecode(frames, fps):
+    """
+    Converts a frame count to a SMPTE timecode string,
+    rolling over after 24 hours. Drop frame rates use
+    ";" as frame separator.
+    example: (86400, 24) -> "01:00:00:00"
+    """
+
+    p = rate_params(fps)
+    return _to_timecode(frames, p, _frame_labels(p.nominal))
+
+
+def frames_to_timecodes(frames, fps):
+    """
+    Converts an iterable of frame counts to timecodes
+    in one call, rate constants are looked up once.
+    """
+
+    p = rate_params(fps)
+    labels = _frame_labels(p.nominal)
+    return [_to_timecode(f, p, labels) for f in frames]
+
+
+def frame_range_to_timecodes(start, end, fps, offset=0):
+    """
+    Returns the timecodes of every frame from start to end
+    included, offset frames are added to each of them.
+    example: frameStartHandle..frameEndHandle of a shot with
+    offset = source timecode frames - frameStartHandle.
+    """
+
+    p = rate_params(fps)
+    labels = _frame_labels(p.nominal)
+    first = int(start) + offset
+    count = int(end) - int(start) + 1
+    if count <= 0:
+        return []
+
+    # count up from the first timecode a second at a time,
+    # every frame of a second shares the same prefix
+    hh, mm, ss, ff = _components(first, p)
+    timecodes = []
+    while True:
+        prefix = "{:02d}:{}:{}{}".format(
+            hh, labels[mm], labels[ss], p.separator
+        )
+        last = min(p.nominal, ff + count - len(timecodes))
+        timecodes.extend([prefix + label for label in labels[ff:last]])
+        if len(timecodes) >= count:
+            return timecodes
+        ff = 0
+        ss += 1
+        if ss == 60:
+            ss = 0
+            mm += 1
+            if mm == 60:
+                mm = 0
+                hh = (hh + 1) % 24
+            if p.drop and mm % 10:
+                ff = p.drop
+
+
+def _to_frames(timecode, p):
+    m = _timecode_regex.match(timecode.strip())
+    if m is None:
+        raise ValueError("Invalid timecode: '{}'".format(timecode))
+    hh, mm, ss, ff = (int(v) for v in m.groups())
+
+    drop = 0
+    if ";" in timecode:
+        if not p.drop:
+            raise ValueError(
+                "Timecode '{}' is drop frame, {} is not a drop frame rate".format(
+                    timecode, p.fps
+                )
+            )
+        drop = p.drop
+    if ff >= p.nominal:
+        raise ValueError(
+            "Timecode '{}' has frames beyond {}".format(timecode, p.nominal - 1)
+        )
+
+    minutes = hh * 60 + mm
+    return (
+        (minutes * 60 + ss) * p.nominal + ff -
+        drop * (minutes - minutes // 10)
+    )
+
+
+def timecode_to_frames(timecode, fps):
+    """
+    Converts a SMPTE timecode string to a frame count, a ";"
+    separator marks drop frame timecodes.
+    example: ("01:00:00:00", 24) -> 86400
+    """
+
+    return _to_frames(timecode, rate_params(fps))
+
+
+def timecodes_to_frames(timecodes, fps):
+    """
+    Converts an iterable of timecodes to frame counts
+    in one call, rate constants are looked up once.
+    """
+
+    p = rate_params(fps)
+    return [_to_frames(tc, p) for tc in timecodes]
+
+
+def frames_to_seconds(frames, fps):
+    return frames / float(fps)
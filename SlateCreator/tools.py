@@ -0,0 +1,169 @@
+import os
+import re
+import shutil
+import logging
+import threading
+import subprocess
+
+
+# oldest releases the generated commands work with,
+# ffmpeg needs 5.1 for -fps_mode
+minimum_versions = {
+    "ffmpeg": (5, 1),
+    "ffprobe": (5, 1),
+    "oiiotool": (2, 0),
+    "iinfo": (2, 0),
+}
+
+_version_args = {
+    "ffmpeg": ["-version"],
+    "ffprobe": ["-version"],
+}
+
+_version_regex = re.compile(r"version\s+n?(\d+)\.(\d+)", re.IGNORECASE)
+_bare_version_regex = re.compile(r"^\s*(\d+)\.(\d+)")
+
+
+class ToolNotFoundError(FileNotFoundError):
+    pass
+
+
+def tool_name(command):
+    """
+    Returns the bare tool name of a command name or
+    path, oiiotool for /usr/bin/oiiotool or oiiotool.exe.
+    """
+
+    name = os.path.basename(command.replace("\\", "/"))
+    stem, ext = os.path.splitext(name)
+    return stem if ext.lower() == ".exe" else name
+
+
+def parse_version(text):
+    """
+    Returns (major, minor) from a tool version output,
+    None if there is none.
+    """
+
+    match = _version_regex.search(text)
+    if match is None:
+        lines = text.strip().splitlines()
+        match = _bare_version_regex.match(lines[0]) if lines else None
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+class Tool:
+    """
+    A tool resolved to its absolute path, its version is
+    read on first access and kept.
+    """
+
+    __slots__ = ("name", "path", "_version", "_lock")
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self._version = False
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        with self._lock:
+            if self._version is False:
+                self._version = self._read_version()
+            return self._version
+
+    def _read_version(self):
+        cmd = [self.path] + _version_args.get(self.name, ["--version"])
+        try:
+            res = subprocess.run(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                timeout=10
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return parse_version(
+            (res.stdout or res.stderr).decode("utf-8", "replace")
+        )
+
+    def __repr__(self):
+        return "<Tool {} {}>".format(self.name, self.path)
+
+
+class ToolRegistry:
+    """
+    Resolves tool names to absolute paths once per PATH,
+    so commands run directly with no shell and no PATH
+    lookup per call. Versions are checked on first
+    resolution, a tool older than minimum_versions logs
+    a warning. Lookups are a dict access afterwards.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or logging.getLogger("SlateCreator")
+        self._tools = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, command, search_path=None):
+        """
+        Returns the Tool for a command name, looked up in
+        search_path or os.environ PATH. Commands already
+        given as paths are kept as they are.
+        Raises ToolNotFoundError if there is no such tool.
+        """
+
+        key = (command, search_path)
+        tool = self._tools.get(key)
+        if tool is not None:
+            return tool
+
+        with self._lock:
+            tool = self._tools.get(key)
+            if tool is not None:
+                return tool
+            path = shutil.which(command, path=search_path)
+            if path is None:
+                raise ToolNotFoundError(
+                    "Tool '{}' not found in PATH".format(command)
+                )
+            tool = Tool(tool_name(command), os.path.abspath(path))
+            self._check(tool)
+            self._tools[key] = tool
+
+        return tool
+
+    def _check(self, tool):
+        minimum = minimum_versions.get(tool.name)
+        if minimum is None:
+            return
+        version = tool.version
+        if version is None:
+            self.log.debug("{}: unknown version".format(tool.path))
+        elif version < minimum:
+            self.log.warning("{} {}.{} is older than {}.{}, "
+                "some commands may fail".format(
+                tool.path, version[0], version[1], minimum[0], minimum[1]
+            ))
+        else:
+            self.log.debug("{}: version {}.{}".format(tool.path, *version))
+
+    def command(self, cmd, env=None):
+        """
+        Returns cmd with its tool replaced by the
+        absolute path resolved with env PATH.
+        """
+
+        path = env.get("PATH") if env else None
+        return [self.resolve(cmd[0], path).path] + list(cmd[1:])
+
+    def clear(self):
+        with self._lock:
+            self._tools = {}
+
+
+# process wide registry, tools resolve once per PATH
+tool_registry = ToolRegistry()
@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import bisect
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+_span_ids = itertools.count(1)
+_current_span = contextvars.ContextVar("slate_span", default=None)
+
+# seconds, upper bounds of the prometheus duration buckets
+default_buckets = (
+    0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+
+class Span:
+    """
+    A timed call: name, attributes, wall time and the error
+    it raised, if any. Events are spans whose duration is None.
+    """
+
+    __slots__ = (
+        "name",
+        "id",
+        "parent",
+        "attributes",
+        "start",
+        "duration",
+        "error"
+    )
+
+    def __init__(self, name, attributes=None, parent=None):
+        self.name = name
+        self.id = next(_span_ids)
+        self.parent = parent
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self.duration = 0.0
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "id": self.id,
+            "parent": self.parent,
+            "start": self.start,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def __repr__(self):
+        return "<Span {} {:.6f}s {}>".format(
+            self.name, self.duration or 0.0, self.attributes
+        )
+
+
+class _NullSpan:
+    """
+    Span handed out when nothing listens, setting
+    attributes on it does nothing.
+    """
+
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+class Tracer:
+    """
+    Times pipeline calls and hands the resulting spans to
+    every registered sink. Sinks are callables taking a Span,
+    see CallbackSink, JsonLinesSink and PrometheusSink.
+    Without sinks spans cost next to nothing.
+
+    example:
+        tracer = Tracer([JsonLinesSink("slate_trace.jsonl")])
+        slate.set_tracer(tracer)
+    """
+
+    def __init__(self, sinks=()):
+        self._sinks = list(sinks)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self._sinks)
+
+    def add_sink(self, sink):
+        with self._lock:
+            self._sinks = self._sinks + [sink]
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self._sinks = [s for s in self._sinks if s is not sink]
+
+    def emit(self, span):
+        for sink in self._sinks:
+            sink(span)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Times the enclosed block as a span, nested spans
+        record the enclosing one as parent.
+        """
+
+        if not self._sinks:
+            yield _null_span
+            return
+
+        parent = _current_span.get()
+        span = Span(
+            name,
+            attributes,
+            parent=parent.id if parent is not None else None
+        )
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as err:
+            span.error = "{}: {}".format(type(err).__name__, err)
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            _current_span.reset(token)
+            self.emit(span)
+
+    def event(self, name, **attributes):
+        """
+        Emits a span with no duration, like cache hits.
+        """
+
+        if not self._sinks:
+            return
+        parent = _current_span.get()
+        span = Span(
+            name,
+            attributes,
+            parent=parent.id if parent is not None else None
+        )
+        span.duration = None
+        self.emit(span)
+
+    def flush(self):
+        for sink in self._sinks:
+            flush = getattr(sink, "flush", None)
+            if flush is not None:
+                flush()
+
+    def close(self):
+        for sink in self._sinks:
+            close = getattr(sink, "close", None)
+            if close is not None:
+                close()
+
+
+class CallbackSink:
+    """
+    Calls fn with every span.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, span):
+        self.fn(span)
+
+
+class JsonLinesSink:
+    """
+    Appends every span as a json line to a file path
+    or to an open text stream.
+    """
+
+    def __init__(self, output):
+        self._lock = threading.Lock()
+        self._own = isinstance(output, str)
+        self._file = open(output, "a") if self._own else output
+
+    def __call__(self, span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._own and not self._file.closed:
+                self._file.close()
+
+
+class PrometheusSink:
+    """
+    Aggregates spans in a Prometheus text exposition file,
+    as read by the node exporter textfile collector:
+        slate_span_duration_seconds histogram by span name
+        slate_span_errors_total counter by span name
+        slate_events_total counter of duration less events
+    Span attributes listed in labels become metric labels.
+    The file is rewritten atomically at most every interval
+    seconds, and on flush.
+    """
+
+    def __init__(
+        self,
+        path,
+        labels=("tool", "cache", "hit"),
+        buckets=default_buckets,
+        interval=10.0
+    ):
+        self.path = path
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._durations = {}
+        self._errors = {}
+        self._events = {}
+        self._written = 0.0
+
+    def _key(self, span):
+        items = [("span", span.name)]
+        for label in self.labels:
+            if label in span.attributes:
+                value = span.attributes[label]
+                if isinstance(value, bool):
+                    value = "true" if value else "false"
+                items.append((label, str(value)))
+        return tuple(items)
+
+    def __call__(self, span):
+        key = self._key(span)
+        with self._lock:
+            if span.duration is not None:
+                entry = self._durations.get(key)
+                if entry is None:
+                    entry = self._durations[key] = [
+                        [0] * (len(self.buckets) + 1), 0.0, 0
+                    ]
+                index = bisect.bisect_left(self.buckets, span.duration)
+                entry[0][index] += 1
+                entry[1] += span.duration
+                entry[2] += 1
+                if span.error:
+                    self._errors[key] = self._errors.get(key, 0) + 1
+            else:
+                self._events[key] = self._events.get(key, 0) + 1
+            due = time.monotonic() - self._written >= self.interval
+        if due:
+            self.flush()
+
+    @staticmethod
+    def _labels(key, extra=()):
+        return "{" + ",".join(
+            "{}=\"{}\"".format(
+                name,
+                value.replace("\\", "\\\\").replace("\"", "\\\"")
+            )
+            for name, value in tuple(key) + tuple(extra)
+        ) + "}"
+
+    def render(self):
+        """
+        Returns the metrics in text exposition format.
+        """
+
+        lines = []
+        with self._lock:
+            lines.append("# TYPE slate_span_duration_seconds histogram")
+            for key, (counts, total, count) in sorted(self._durations.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += n
+                    lines.append("slate_span_duration_seconds_bucket{} {}".format(
+                        self._labels(key, (("le", str(bound)),)),
+                        cumulative
+                    ))
+                lines.append("slate_span_duration_seconds_sum{} {}".format(
+                    self._labels(key), repr(total)
+                ))
+                lines.append("slate_span_duration_seconds_count{} {}".format(
+                    self._labels(key), count
+                ))
+            lines.append("# TYPE slate_span_errors_total counter")
+            for key, count in sorted(self._errors.items()):
+                lines.append("slate_span_errors_total{} {}".format(
+                    self._labels(key), count
+                ))
+            lines.append("# TYPE slate_events_total counter")
+            for key, count in sorted(self._events.items()):
+                lines.append("slate_events_total{} {}".format(
+                    self._labels(key), count
+                ))
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        with self._write_lock:
+            text = self.render()
+            tmp = "{}.{}.tmp".format(self.path, os.getpid())
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, self.path)
+            with self._lock:
+                self._written = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+# process wide tracer used when none is set, sinks added
+# to it see every SlateCreator instance
+default_tracer = Tracer()
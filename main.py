@@ -68,7 +68,7 @@ slate_env = {
 }
 
 data = {}
-with open("data/mock_data.json", "r") as f:
+with open(data_file, "r") as f:
     data = json.loads(f.read())
 
 data["thumbnail"] = thumbnail_file
@@ -0,0 +1,85 @@
+import shutil
+import subprocess
+
+import pytest
+
+from SlateCreator.burnin import burnin_command, write_frames
+
+
+def test_overlay_command():
+    cmd = burnin_command("over.mov", (320, 180), 24, out_args=["-c:v", "png"])
+
+    assert cmd.count("-i") == 1
+    assert cmd[cmd.index("-i") + 1] == "pipe:0"
+    assert "-filter_complex" not in cmd
+    assert cmd[-3:] == ["-c:v", "png", "over.mov"]
+
+
+def test_plate_movie_command():
+    cmd = burnin_command(
+        "out.mov", (320, 180), 24, plate="plate.mov", plate_frame=12
+    )
+
+    inputs = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+    assert inputs == ["plate.mov", "pipe:0"]
+    assert cmd[cmd.index("-ss") + 1] == "0.500000"
+    assert cmd.index("-ss") < cmd.index("plate.mov")
+    assert "overlay" in cmd[cmd.index("-filter_complex") + 1]
+    assert cmd[cmd.index("-map") + 1] == "[v]"
+
+
+def test_plate_sequence_command():
+    cmd = burnin_command(
+        "out.mov", (320, 180), 25, plate="/plates/sh010.####.exr",
+        plate_frame=1001
+    )
+
+    assert cmd[cmd.index("-start_number") + 1] == "1001"
+    assert cmd[cmd.index("-framerate") + 1] == "25"
+    assert "/plates/sh010.%04d.exr" in cmd
+    assert "-apply_trc" in cmd
+    assert "-ss" not in cmd
+
+
+ffmpeg = shutil.which("ffmpeg")
+
+
+@pytest.mark.skipif(not ffmpeg, reason="needs ffmpeg")
+def test_composite_over_plate(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    size = (64, 36)
+    plate = str(tmp_path / "plate.mov")
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y", "-f", "lavfi",
+        "-i", "color=c=black:size=64x36:rate=24:duration=1",
+        "-c:v", "png", plate
+    ], check=True)
+
+    def frames():
+        for i in range(6):
+            image = Image.new("RGBA", size, (0, 0, 0, 0))
+            image.paste((255, 255, 255, 255), (0, 0, 32, 36))
+            yield image
+
+    output = str(tmp_path / "burnt.mov")
+    write_frames(
+        burnin_command(output, size, 24, ["-c:v", "png"], plate=plate,
+                       plate_frame=6),
+        frames()
+    )
+
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y", "-i", output,
+        str(tmp_path / "out_%02d.png")
+    ], check=True)
+    assert sorted(p.name for p in tmp_path.glob("out_*.png")) == [
+        "out_{:02d}.png".format(i) for i in range(1, 7)
+    ]
+    with Image.open(str(tmp_path / "out_06.png")) as image:
+        image = image.convert("RGB")
+        assert image.getpixel((8, 18)) == (255, 255, 255)
+        assert image.getpixel((56, 18)) == (0, 0, 0)
+    res = subprocess.run([
+        "ffmpeg", "-v", "error", "-i", output, "-f", "null", "-"
+    ], capture_output=True, check=True)
+    assert res.stderr == b""
@@ -0,0 +1,162 @@
+import io
+import argparse
+import json
+
+import pytest
+
+from SlateCreator.cli import (
+    Driver,
+    Journal,
+    check_job,
+    env_item,
+    job_key,
+    read_manifest,
+)
+
+
+defaults = {"template": "/t/slate.html", "resources": "/t", "data": {}}
+
+
+def test_job_key_covers_default_data():
+    job = {"id": "sh010", "data": {"shot": "sh010"}}
+
+    a = job_key(job, dict(defaults, data={"show": "A"}))
+    b = job_key(job, dict(defaults, data={"show": "B"}))
+
+    assert a != b
+    assert a == job_key(job, dict(defaults, data={"show": "A"}))
+
+
+def test_job_key_data_merges_like_render():
+    shared = dict(defaults, data={"show": "A", "shot": "x"})
+
+    assert job_key({"data": {"shot": "sh010"}}, shared) == job_key(
+        {"data": {"show": "A", "shot": "sh010"}}, shared
+    )
+
+
+def test_job_key_settings_and_id():
+    job = {"id": "sh010", "output": "sh010.exr"}
+
+    assert job_key(job, defaults) == job_key(dict(job, id="other"), defaults)
+    assert job_key(job, defaults, {"env": {}}) != job_key(
+        job, defaults, {"env": {"PATH": "/opt"}}
+    )
+
+
+@pytest.mark.parametrize("job, valid", [
+    ({}, True),
+    ({"id": 3, "data": {}, "out_args": ["-c", "copy"]}, True),
+    ([], False),
+    ({"id": True}, False),
+    ({"data": "x"}, False),
+    ({"out_args": ["-r", 24]}, False),
+])
+def test_check_job(job, valid):
+    assert (check_job(job) is None) is valid
+
+
+def test_read_manifest_keeps_bad_lines():
+    stream = io.StringIO(
+        '{"id": "a"}\n'
+        "\n"
+        "# comment\n"
+        '{"id": "b", \n'
+        '{"data": []}\n'
+        '{"id": "c"}\n'
+    )
+
+    lines = list(read_manifest(stream))
+
+    assert [(n, e is None) for n, _, e in lines] == [
+        (1, True), (4, False), (5, False), (6, True)
+    ]
+    assert lines[1][1] == '{"id": "b",'
+    assert lines[1][2].startswith("invalid json")
+    assert lines[3][1] == {"id": "c"}
+
+
+def done_entry(key, output):
+    st = output.stat()
+    return {
+        "key": key, "ok": True, "output": str(output),
+        "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+    }
+
+
+def test_journal_resume(tmp_path):
+    output = tmp_path / "sh010.exr"
+    output.write_bytes(b"slate")
+    path = str(tmp_path / "jobs.journal")
+
+    journal = Journal(path)
+    journal.record(done_entry("a", output))
+    journal.record({"key": "b", "ok": False, "error": "boom"})
+    journal.close()
+    # a killed run leaves a truncated last line
+    with open(path, "a") as f:
+        f.write('{"key": "c", "ok": tr')
+
+    journal = Journal(path)
+    try:
+        assert journal.is_done("a")
+        assert not journal.is_done("b")
+        assert not journal.is_done("c")
+        output.write_bytes(b"changed slate")
+        assert not journal.is_done("a")
+    finally:
+        journal.close()
+
+
+def test_journal_empty_or_missing_output(tmp_path):
+    output = tmp_path / "sh010.exr"
+    output.write_bytes(b"")
+    journal = Journal(str(tmp_path / "jobs.journal"))
+    journal.record(done_entry("a", output))
+    try:
+        assert not journal.is_done("a")
+        output.unlink()
+        assert not journal.is_done("a")
+    finally:
+        journal.close()
+
+
+def test_driver_journals_invalid_lines(tmp_path):
+    path = str(tmp_path / "jobs.journal")
+    journal = Journal(path)
+    driver = Driver({}, journal=journal)
+
+    driver._invalid(4, '{"data": []}', "'data' is a list")
+    journal.close()
+
+    assert driver.invalid == driver.failed == 1
+    with open(path) as f:
+        entry = json.loads(f.readline())
+    assert entry["ok"] is False
+    assert entry["stage"] == "manifest"
+    assert entry["line"] == 4
+
+
+def test_driver_key_covers_template_and_options(tmp_path):
+    template = tmp_path / "slate.html"
+    template.write_text("<p>{shot}</p>")
+    options = {
+        "env": {}, "render_backend": "browser",
+        "convert_backend": "oiio", "inline_resources": False,
+    }
+    shared = dict(defaults, template=str(template))
+    job = {"data": {"shot": "sh010"}}
+
+    key = Driver(options)._key(job, shared)
+    assert key == Driver(options)._key(job, shared)
+    assert key != Driver(dict(options, render_backend="raster"))._key(
+        job, shared
+    )
+    template.write_text("<p>{shot} edited</p>")
+    assert key != Driver(options)._key(job, shared)
+
+
+def test_env_item():
+    assert env_item("PATH=/opt/bin") == ("PATH", "/opt/bin")
+    with pytest.raises(argparse.ArgumentTypeError):
+        env_item("PATH")
@@ -0,0 +1,184 @@
+import os
+import stat
+import json
+import socket
+import threading
+import http.client
+
+import pytest
+
+from SlateCreator import daemon
+from SlateCreator.daemon import SlateDaemon, make_server, request
+
+
+template = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "templates", "generic_slate", "generic_slate.html"
+)
+token = "secret-token"
+
+
+@pytest.fixture
+def slate_daemon(tmp_path):
+    # never started, submitted jobs stay queued
+    return SlateDaemon(template, staging_dir=str(tmp_path / "staging"))
+
+
+def serve(server):
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def http_server(slate_daemon):
+    server = make_server(slate_daemon, port=0, token=token)
+    serve(server)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def socket_path():
+    # AF_UNIX paths are short, tmp_path can be too long
+    directory = daemon.runtime_dir()
+    path = os.path.join(directory, "test_{}.sock".format(os.getpid()))
+    yield path
+    if os.path.lexists(path):
+        os.remove(path)
+
+
+def raw(server, method, path, body=b"", headers=None):
+    connection = http.client.HTTPConnection(*server.server_address[:2])
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode("utf-8"))
+    finally:
+        connection.close()
+
+
+def test_http_needs_token(slate_daemon):
+    with pytest.raises(ValueError):
+        make_server(slate_daemon, port=0)
+
+
+@pytest.mark.parametrize("sent", [None, "wrong", token + "x"])
+def test_wrong_token_is_rejected(http_server, sent):
+    port = http_server.server_address[1]
+
+    status, reply = request("GET", "/health", port=port, token=sent)
+
+    assert status == 401
+    assert "X-Slate-Token" in reply["error"]
+
+
+def test_render_is_queued(http_server, slate_daemon):
+    port = http_server.server_address[1]
+
+    status, reply = request(
+        "POST", "/render", {"output": "sh010.exr"}, port=port, token=token
+    )
+    assert status == 202
+    assert reply["status"] == "queued"
+
+    status, reply = request(
+        "GET", "/status/" + reply["id"], port=port, token=token
+    )
+    assert status == 200
+    assert slate_daemon.stats()["requests"]["queued"] == 1
+
+
+@pytest.mark.parametrize("content_type", [None, "text/plain", "form"])
+def test_post_needs_json_content_type(http_server, content_type):
+    headers = {"X-Slate-Token": token}
+    if content_type == "form":
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    elif content_type:
+        headers["Content-Type"] = content_type
+
+    status, reply = raw(http_server, "POST", "/render", b"{}", headers)
+
+    assert status == 415
+
+
+@pytest.mark.parametrize("body, error", [
+    (b"{", "Invalid json"),
+    (b"[" * 200000, "Invalid json"),
+    (b"[]", "json object"),
+    (b'{"wait": "yes"}', "'wait'"),
+    (b'{"timeout": -1}', "'timeout'"),
+    (b'{"data": "x"}', "Invalid slate job"),
+    (b'{"thumbnails": 1}', "'thumbnails'"),
+])
+def test_invalid_bodies(http_server, body, error):
+    status, reply = raw(http_server, "POST", "/render", body, {
+        "X-Slate-Token": token, "Content-Type": "application/json"
+    })
+
+    assert status == 400
+    assert error in reply["error"]
+
+
+def test_body_too_large(http_server):
+    connection = http.client.HTTPConnection(*http_server.server_address[:2])
+    try:
+        connection.putrequest("POST", "/render")
+        connection.putheader("X-Slate-Token", token)
+        connection.putheader("Content-Type", "application/json")
+        connection.putheader("Content-Length", str(daemon.max_body + 1))
+        connection.endheaders()
+        response = connection.getresponse()
+        assert response.status == 400
+    finally:
+        connection.close()
+
+
+def test_unix_socket(slate_daemon, socket_path):
+    server = make_server(slate_daemon, socket_path=socket_path)
+    serve(server)
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        status, reply = request("GET", "/health", socket_path=socket_path)
+        assert status == 200
+        assert reply["ok"]
+
+        # a live socket is never replaced
+        with pytest.raises(OSError):
+            make_server(slate_daemon, socket_path=socket_path)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_stale_socket_is_replaced(slate_daemon, socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    server = make_server(slate_daemon, socket_path=socket_path)
+    server.server_close()
+
+
+def test_other_files_are_not_replaced(slate_daemon, socket_path):
+    with open(socket_path, "w") as f:
+        f.write("not a socket")
+
+    with pytest.raises(FileExistsError):
+        make_server(slate_daemon, socket_path=socket_path)
+
+
+def test_runtime_dir_is_private(monkeypatch, tmp_path):
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(daemon.tempfile, "gettempdir", lambda: str(tmp_path))
+
+    path = daemon.runtime_dir()
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+    assert daemon.default_socket() == os.path.join(path, daemon.socket_name)
+
+    os.chmod(path, 0o777)
+    with pytest.raises(PermissionError):
+        daemon.runtime_dir()
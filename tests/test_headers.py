@@ -0,0 +1,171 @@
+import struct
+
+import pytest
+
+from SlateCreator.headers import (
+    HeaderError,
+    exr_magic,
+    read_dpx_header,
+    read_exr_header,
+    read_header,
+)
+
+
+def _exr_attribute(name, type_name, value):
+    return (
+        name.encode() + b"\0" +
+        type_name.encode() + b"\0" +
+        struct.pack("<i", len(value)) +
+        value
+    )
+
+
+def _bcd(value):
+    return ((value // 10) << 4) | (value % 10)
+
+
+def _exr_timecode(hh, mm, ss, ff, drop=False):
+    return struct.pack(
+        "<II",
+        _bcd(ff) | (drop << 6) | (_bcd(ss) << 8) |
+        (_bcd(mm) << 16) | (_bcd(hh) << 24),
+        0
+    )
+
+
+def write_exr(path, window=(0, 0, 1919, 1079), extra=b"", padding=0):
+    attributes = [
+        _exr_attribute("channels", "chlist", b"\0"),
+        _exr_attribute("dataWindow", "box2i", struct.pack("<4i", *window)),
+    ]
+    if padding:
+        attributes.insert(0, _exr_attribute("comments", "string", b"x" * padding))
+    header = struct.pack("<ii", exr_magic, 2) + b"".join(attributes) + extra
+    path.write_bytes(header + b"\0" + b"\0" * 64)
+    return str(path)
+
+
+def test_exr_resolution_from_data_window(tmp_path):
+    path = write_exr(tmp_path / "a.exr", window=(-10, 20, 1909, 1099))
+
+    result = read_exr_header(path)
+
+    assert (result.width, result.height) == (1920, 1080)
+    assert result.source == "exr"
+    assert result.timecode is None
+
+
+def test_exr_timecode_fps_and_aspect(tmp_path):
+    extra = (
+        _exr_attribute("timeCode", "timecode", _exr_timecode(1, 2, 3, 4)) +
+        _exr_attribute("framesPerSecond", "rational", struct.pack("<iI", 24000, 1001)) +
+        _exr_attribute("pixelAspectRatio", "float", struct.pack("<f", 2.0))
+    )
+    path = write_exr(tmp_path / "a.exr", extra=extra)
+
+    result = read_exr_header(path)
+
+    assert result.timecode == "01:02:03:04"
+    assert result.fps == 23.976
+    assert result.pixel_aspect == 2.0
+
+
+def test_exr_drop_frame_timecode(tmp_path):
+    extra = _exr_attribute(
+        "timeCode", "timecode", _exr_timecode(10, 59, 59, 29, drop=True)
+    )
+    path = write_exr(tmp_path / "a.exr", extra=extra)
+
+    assert read_exr_header(path).timecode == "10:59:59;29"
+
+
+def test_exr_header_larger_than_first_read(tmp_path):
+    path = write_exr(tmp_path / "a.exr", padding=200000)
+
+    assert read_exr_header(path).width == 1920
+
+
+def test_exr_bad_magic(tmp_path):
+    path = tmp_path / "a.exr"
+    path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(HeaderError):
+        read_exr_header(str(path))
+
+
+def test_exr_truncated(tmp_path):
+    path = tmp_path / "a.exr"
+    path.write_bytes(
+        struct.pack("<ii", exr_magic, 2) +
+        _exr_attribute("dataWindow", "box2i", struct.pack("<4i", 0, 0, 9, 9))[:-8]
+    )
+
+    with pytest.raises(HeaderError):
+        read_exr_header(str(path))
+
+
+def write_dpx(path, endian, width=2048, height=1556, timecode=0x01020304,
+              tv_fps=25.0, film_fps=24.0, aspect=(1, 1)):
+    buf = bytearray(2048)
+    buf[0:4] = b"SDPX" if endian == ">" else b"XPDS"
+    struct.pack_into(endian + "2I", buf, 772, width, height)
+    struct.pack_into(endian + "2I", buf, 1628, *aspect)
+    struct.pack_into(endian + "f", buf, 1724, film_fps)
+    struct.pack_into(endian + "I", buf, 1920, timecode)
+    struct.pack_into(endian + "f", buf, 1940, tv_fps)
+    path.write_bytes(bytes(buf))
+    return str(path)
+
+
+@pytest.mark.parametrize("endian", [">", "<"])
+def test_dpx_header_both_endians(tmp_path, endian):
+    path = write_dpx(tmp_path / "a.dpx", endian, aspect=(2, 1))
+
+    result = read_dpx_header(path)
+
+    assert (result.width, result.height) == (2048, 1556)
+    assert result.timecode == "01:02:03:04"
+    assert result.fps == 25.0
+    assert result.pixel_aspect == 2.0
+    assert result.source == "dpx"
+
+
+def test_dpx_film_fps_when_tv_fps_undefined(tmp_path):
+    path = write_dpx(tmp_path / "a.dpx", ">", tv_fps=float("nan"))
+
+    assert read_dpx_header(path).fps == 24.0
+
+
+def test_dpx_undefined_fields(tmp_path):
+    path = write_dpx(
+        tmp_path / "a.dpx", "<",
+        timecode=0xFFFFFFFF,
+        tv_fps=0.0,
+        film_fps=0.0,
+        aspect=(0xFFFFFFFF, 0xFFFFFFFF)
+    )
+
+    result = read_dpx_header(path)
+
+    assert result.timecode is None
+    assert result.fps is None
+    assert result.pixel_aspect is None
+
+
+def test_dpx_truncated(tmp_path):
+    path = tmp_path / "a.dpx"
+    path.write_bytes(b"SDPX" + b"\0" * 100)
+
+    with pytest.raises(HeaderError):
+        read_dpx_header(str(path))
+
+
+def test_read_header_dispatch(tmp_path):
+    exr = write_exr(tmp_path / "a.EXR")
+    dpx = write_dpx(tmp_path / "a.dpx", ">")
+    other = tmp_path / "a.png"
+    other.write_bytes(b"")
+
+    assert read_header(exr).source == "exr"
+    assert read_header(dpx).source == "dpx"
+    assert read_header(str(other)) is None
@@ -0,0 +1,189 @@
+import os
+import json
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from SlateCreator.SlateCreator import SlateCreator
+from SlateCreator.prepend import (
+    can_stream_copy,
+    concat_command,
+    encoder_profile,
+    reencode_command,
+    segment_command,
+)
+
+
+template = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "templates", "generic_slate", "generic_slate.html"
+)
+
+prores = {
+    "codec_name": "prores", "profile": "HQ", "pix_fmt": "yuv422p10le",
+    "width": 320, "height": 180, "r_frame_rate": "24/1",
+    "time_base": "1/12288",
+}
+h264 = dict(prores, codec_name="h264", profile="High", pix_fmt="yuv420p")
+pcm = {"codec_name": "pcm_s16le", "sample_rate": "48000", "channels": 2}
+aac = dict(pcm, codec_name="aac")
+
+
+@pytest.mark.parametrize("video, audio, expected", [
+    (prores, None, True),
+    (prores, pcm, True),
+    (prores, aac, False),
+    (h264, None, False),
+    (dict(prores, codec_name="hevc"), None, False),
+    (dict(prores, codec_name="dnxhd"), pcm, True),
+])
+def test_can_stream_copy(video, audio, expected):
+    assert can_stream_copy(video, audio) is expected
+
+
+@pytest.mark.parametrize("codec, profile, expected", [
+    ("dnxhd", "DNXHR HQX", "dnxhr_hqx"),
+    ("h264", "High 4:2:2", "high422"),
+    ("h264", "Constrained Baseline", "baseline"),
+    ("prores", "HQ", "hq"),
+])
+def test_encoder_profile(codec, profile, expected):
+    assert encoder_profile(codec, profile) == expected
+
+
+def test_segment_command_matches_movie():
+    cmd = segment_command("slate.png", "seg.mov", prores, audio=pcm)
+
+    assert cmd[cmd.index("-c:v") + 1] == "prores_ks"
+    assert cmd[cmd.index("-profile:v") + 1] == "hq"
+    assert cmd[cmd.index("-s") + 1] == "320x180"
+    assert cmd[cmd.index("-video_track_timescale") + 1] == "12288"
+    assert cmd[cmd.index("-c:a") + 1] == "pcm_s16le"
+    assert cmd[-1] == "seg.mov"
+
+
+def test_reencode_command_joins_in_one_pass():
+    cmd = reencode_command(
+        "slate.png", "in.mp4", "out.mov", h264, audio=aac, frames=2,
+        timecode="00:59:59:22"
+    )
+
+    assert cmd.count("-i") == 3
+    assert cmd[cmd.index("-t") + 1] == "0.083333"
+    assert "concat=n=2:v=1:a=1[v][a]" in cmd[cmd.index("-filter_complex") + 1]
+    assert cmd[cmd.index("-crf") + 1] == "16"
+    assert cmd[cmd.index("-timecode") + 1] == "00:59:59:22"
+    assert "copy" not in cmd
+
+
+def test_concat_command_copies():
+    cmd = concat_command("list.txt", "out.mp4", timecode="01:00:00:00")
+
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert "-timecode" not in cmd
+
+
+def make_creator(tmp_path, streams):
+    slate = SlateCreator(staging_dir=str(tmp_path), template_path=template)
+    commands = []
+    lock = threading.Lock()
+
+    def _run(cmd, input, env={}, stdin=None):
+        with lock:
+            commands.append(cmd)
+        if cmd[0].startswith("ffprobe"):
+            return subprocess.CompletedProcess(
+                cmd, 0, json.dumps({"streams": streams}).encode("utf-8")
+            )
+        return subprocess.CompletedProcess(cmd, 0, b"")
+
+    slate._run = _run
+    return slate, commands
+
+
+def test_prepend_segments_are_unique(tmp_path):
+    slate, commands = make_creator(tmp_path, [dict(prores, codec_type="video")])
+    clones = [slate.clone() for _ in range(8)]
+    threads = [
+        threading.Thread(
+            target=c.prepend_slate_to_movie,
+            args=("slate.png", "in.mov", "out_{}.mov".format(i))
+        )
+        for i, c in enumerate(clones)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    segments = [cmd[-1] for cmd in commands if "-loop" in cmd]
+    lists = [cmd[cmd.index("-i") + 1] for cmd in commands if "concat" in cmd]
+    assert len(set(segments)) == len(set(lists)) == 8
+    assert not [f for f in os.listdir(str(tmp_path)) if "_prepend_" in f]
+
+
+def test_prepend_reencodes_long_gop(tmp_path):
+    slate, commands = make_creator(tmp_path, [dict(h264, codec_type="video")])
+
+    slate.prepend_slate_to_movie("slate.png", "in.mp4", "out.mp4")
+
+    assert len(commands) == 2
+    assert "-filter_complex" in commands[1]
+
+
+ffmpeg = shutil.which("ffmpeg") and shutil.which("ffprobe")
+
+
+def _encoders():
+    res = subprocess.run(
+        ["ffmpeg", "-v", "error", "-encoders"], capture_output=True
+    )
+    return res.stdout.decode("utf-8", "replace")
+
+
+def _frames(path):
+    res = subprocess.run([
+        "ffprobe", "-v", "error", "-count_frames", "-select_streams", "v:0",
+        "-show_entries", "stream=nb_read_frames", "-of", "csv=p=0", path
+    ], capture_output=True, check=True)
+    return int(res.stdout.strip())
+
+
+def _decode_errors(path):
+    res = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-f", "null", "-"],
+        capture_output=True
+    )
+    return res.returncode, res.stderr.strip()
+
+
+@pytest.mark.skipif(not ffmpeg, reason="needs ffmpeg and ffprobe")
+@pytest.mark.parametrize("codec, ext, audio", [
+    ("prores_ks", ".mov", "pcm_s16le"),
+    ("libx264", ".mp4", "aac"),
+])
+def test_prepend_generated_clip(tmp_path, codec, ext, audio):
+    if " {} ".format(codec) not in _encoders():
+        pytest.skip("ffmpeg has no {} encoder".format(codec))
+    Image = pytest.importorskip("PIL.Image")
+
+    movie = str(tmp_path / ("clip" + ext))
+    subprocess.run([
+        "ffmpeg", "-v", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc2=size=320x180:rate=24:duration=1",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000:duration=1",
+        "-c:v", codec, "-pix_fmt",
+        "yuv422p10le" if codec == "prores_ks" else "yuv420p",
+        "-c:a", audio, "-shortest", movie
+    ], check=True, capture_output=True)
+    slate_png = str(tmp_path / "slate.png")
+    Image.new("RGB", (320, 180), (40, 40, 40)).save(slate_png)
+
+    slate = SlateCreator(staging_dir=str(tmp_path), template_path=template)
+    output = str(tmp_path / ("slated" + ext))
+    slate.prepend_slate_to_movie(slate_png, movie, output, frames=2)
+
+    assert _frames(output) == _frames(movie) + 2
+    assert _decode_errors(output) == (0, b"")
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+
+import pytest
+
+from SlateCreator.probe import ProbeResult
+from SlateCreator.probe_cache import ProbeCache, get_probe_cache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ProbeCache(str(tmp_path / "cache" / "probes.db"))
+    yield cache
+    cache.close()
+
+
+def media(tmp_path, name, content=b"frames"):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def result(path, width=1920):
+    return ProbeResult(
+        path, width=width, height=1080, fps=24.0, frame_count=48
+    )
+
+
+def accessed(cache):
+    return dict(sqlite3.connect(cache.path).execute(
+        "SELECT path, accessed FROM probes"
+    ).fetchall())
+
+
+def test_hit_and_miss(tmp_path, cache):
+    path = media(tmp_path, "sh010.mov")
+
+    assert cache.get(path) is None
+    cache.put(path, result(path))
+    hit = cache.get(path)
+
+    assert hit.to_dict() == result(path).to_dict()
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.get(str(tmp_path / "missing.mov")) is None
+
+
+def test_changed_file_is_stale(tmp_path, cache):
+    path = media(tmp_path, "sh010.mov")
+    cache.put(path, result(path))
+
+    media(tmp_path, "sh010.mov", b"longer frames")
+    assert cache.get(path) is None
+
+    os.utime(path, ns=(1, 1))
+    cache.put(path, result(path, width=3840))
+    assert cache.get(path).width == 3840
+
+
+def test_evicts_least_recently_accessed(tmp_path):
+    cache = ProbeCache(
+        str(tmp_path / "probes.db"), max_entries=2, access_interval=0
+    )
+    try:
+        a, b, c = (media(tmp_path, n) for n in ("a.mov", "b.mov", "c.mov"))
+        cache.put(a, result(a))
+        cache.put(b, result(b))
+        assert cache.get(a) is not None
+        cache.put(c, result(c))
+
+        assert cache.get(b) is None
+        assert cache.get(a) is not None
+        assert cache.get(c) is not None
+    finally:
+        cache.close()
+
+
+def test_hits_defer_access_writes(tmp_path, cache, monkeypatch):
+    path = os.path.abspath(media(tmp_path, "sh010.mov"))
+    cache.put(path, result(path))
+    stored = accessed(cache)
+    later = stored[path] + 120.0
+    monkeypatch.setattr("SlateCreator.probe_cache.time.time", lambda: later)
+    # no interval flush during the test
+    cache._flushed = float("inf")
+
+    cache.get(path)
+    cache.get(path)
+    assert accessed(cache) == stored
+    assert cache._accessed == {path: later}
+
+    cache.flush()
+    assert accessed(cache) == {path: later}
+    assert cache._accessed == {}
+
+
+def test_recent_hits_are_not_recorded(tmp_path, cache):
+    path = media(tmp_path, "sh010.mov")
+    cache.put(path, result(path))
+
+    cache.get(path)
+
+    assert cache._accessed == {}
+
+
+def test_close_flushes(tmp_path):
+    cache = ProbeCache(str(tmp_path / "probes.db"))
+    path = media(tmp_path, "sh010.mov")
+    cache.put(path, result(path))
+    cache._accessed[os.path.abspath(path)] = 12345.0
+
+    cache.close()
+    cache.flush()
+
+    assert accessed(cache) == {os.path.abspath(path): 12345.0}
+
+
+def test_persists_across_instances(tmp_path):
+    path = media(tmp_path, "sh010.mov")
+    first = ProbeCache(str(tmp_path / "probes.db"))
+    first.put(path, result(path))
+    first.close()
+
+    second = ProbeCache(str(tmp_path / "probes.db"))
+    try:
+        assert second.get(path).width == 1920
+    finally:
+        second.close()
+
+
+def test_get_probe_cache_is_shared(tmp_path):
+    path = str(tmp_path / "probes.db")
+
+    assert get_probe_cache(path) is get_probe_cache(path)
@@ -0,0 +1,115 @@
+import os
+import threading
+
+from SlateCreator.render_cache import RenderCache, get_render_cache
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_key_follows_referenced_files(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    css = write(tmp_path / "res" / "slate.css", b"body {}")
+    html = '<link href="{}"><p>sh010</p>'.format(css)
+
+    key = cache.key(html, (1920, 1080))
+    assert key.endswith(".png")
+    assert key == cache.key(html, (1920, 1080))
+    assert key != cache.key(html, (3840, 2160))
+    assert key != cache.key(html.replace("sh010", "sh020"), (1920, 1080))
+
+    os.utime(css, ns=(0, 0))
+    write(tmp_path / "res" / "slate.css", b"body { color: red }")
+    assert key != cache.key(html, (1920, 1080))
+
+
+def test_key_with_resources_list(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    thumb = write(tmp_path / "thumb.jpg", b"a")
+
+    key = cache.key("ops", (10, 10), resources=[thumb])
+    write(tmp_path / "thumb.jpg", b"bb")
+
+    assert key != cache.key("ops", (10, 10), resources=[thumb])
+
+
+def test_store_and_fetch_hardlink(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    rendered = write(tmp_path / "render.png", b"slate")
+    key = cache.key("<p>a</p>", (4, 4))
+
+    assert not cache.fetch(key, str(tmp_path / "out.png"))
+    cache.store(key, rendered)
+    output = str(tmp_path / "out" / "slate.png")
+    os.makedirs(os.path.dirname(output))
+    write(tmp_path / "out" / "slate.png", b"old")
+
+    assert cache.fetch(key, output)
+    assert cache.fetch(key, output)
+    assert os.path.samefile(output, cache._path(key))
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert os.listdir(os.path.dirname(output)) == ["slate.png"]
+    assert os.listdir(os.path.dirname(cache._path(key))) == [key]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=250)
+    keys = []
+    for i in range(3):
+        rendered = write(tmp_path / "r{}.png".format(i), b"x" * 100)
+        key = cache.key(str(i), (4, 4))
+        cache.store(key, rendered)
+        os.utime(cache._path(key), (i, i))
+        keys.append(key)
+
+    assert not os.path.exists(cache._path(keys[0]))
+    assert os.path.exists(cache._path(keys[1]))
+    assert os.path.exists(cache._path(keys[2]))
+    assert cache._size == 200
+
+
+def test_size_is_tracked_without_rescans(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path / "cache"), max_bytes=10 ** 6)
+    cache.store(cache.key("a", (4, 4)), write(tmp_path / "a.png", b"x" * 10))
+    scans = []
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1))
+
+    cache.store(cache.key("b", (4, 4)), write(tmp_path / "b.png", b"x" * 20))
+    cache.store(cache.key("b", (4, 4)), write(tmp_path / "c.png", b"x" * 5))
+
+    assert scans == []
+    assert cache._size == 15
+
+
+def test_concurrent_stores_of_one_key(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    key = cache.key("same", (4, 4))
+    errors = []
+
+    def store(i):
+        rendered = write(tmp_path / "r{}.png".format(i), b"slate")
+        output = str(tmp_path / "o{}.png".format(i))
+        try:
+            for _ in range(50):
+                cache.store(key, rendered)
+                assert cache.fetch(key, output)
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=store, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert os.listdir(os.path.dirname(cache._path(key))) == [key]
+
+
+def test_get_render_cache_is_shared(tmp_path):
+    directory = str(tmp_path / "cache")
+
+    assert get_render_cache(directory) is get_render_cache(directory + "/")
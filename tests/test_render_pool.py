@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from SlateCreator import render_pool
+from SlateCreator.render_pool import BrowserError, RenderPool
+
+
+class FakeWorker:
+
+    started = []
+
+    def __init__(self, executable, flags=None, timeout=30, log=None):
+        self.renders = 0
+        self.alive = False
+
+    def start(self):
+        self.alive = True
+        FakeWorker.started.append(self)
+
+    def close(self):
+        self.alive = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeWorker.started = []
+    monkeypatch.setattr(render_pool, "BrowserWorker", FakeWorker)
+    pool = RenderPool(size=1, browser_executable="chrome")
+    pool.devtools = True
+    yield pool
+    pool.close()
+
+
+def test_acquire_reuses_workers(pool):
+    with pool.acquire() as a:
+        pass
+    with pool.acquire() as b:
+        pass
+
+    assert a is b
+    assert FakeWorker.started == [a]
+
+
+def test_close_wakes_waiters_without_starting_browsers(pool):
+    holding = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def hold():
+        with pool.acquire():
+            holding.set()
+            release.wait(5)
+
+    def wait():
+        try:
+            with pool.acquire():
+                pass
+        except BrowserError as err:
+            errors.append(err)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(5)
+    waiters = [threading.Thread(target=wait) for _ in range(3)]
+    for t in waiters:
+        t.start()
+
+    pool.close()
+    release.set()
+    holder.join(5)
+    for t in waiters:
+        t.join(5)
+
+    assert len(errors) == 3
+    assert len(FakeWorker.started) == 1
+    assert not any(w.alive for w in FakeWorker.started)
+
+
+def test_acquire_after_close(pool):
+    pool.close()
+
+    with pytest.raises(BrowserError):
+        with pool.acquire():
+            pass
@@ -0,0 +1,125 @@
+import pytest
+
+from SlateCreator.sequence import (
+    DirectoryCache,
+    first_frame,
+    frame_path,
+    frame_range,
+    frame_token_printf,
+    is_sequence,
+    sequence_regex,
+)
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("shot.####.exr", True),
+    ("shot.@@@@.dpx", True),
+    ("shot.%04d.exr", True),
+    ("shot.%d.exr", True),
+    ("shot.$F4.exr", True),
+    ("/mnt/show/sh010/comp.1001.exr", False),
+    ("/mnt/user@studio/shot.mov", False),
+    ("/mnt/user@studio/shot.png", False),
+    ("C:\\jobs\\#1\\shot.png", False),
+    ("/mnt/#1/shot.####.exr", True),
+    ("my%20doc.png", False),
+    ("shot.####.mov", False),
+])
+def test_is_sequence(path, expected):
+    assert is_sequence(path) is expected
+
+
+@pytest.mark.parametrize("pattern, frame, expected", [
+    ("shot.####.exr", 1001, "shot.1001.exr"),
+    ("shot.####.exr", 12, "shot.0012.exr"),
+    ("shot.####.exr", 123456, "shot.123456.exr"),
+    ("shot.####.exr", -5, "shot.-0005.exr"),
+    ("shot.@@.dpx", 7, "shot.07.dpx"),
+    ("shot.%04d.exr", 1, "shot.0001.exr"),
+    ("shot.%d.exr", 42, "shot.42.exr"),
+    ("shot.$F3.exr", 9, "shot.009.exr"),
+    ("shot.$F.exr", 9, "shot.9.exr"),
+    ("/mnt/#1/shot.##.exr", 3, "/mnt/#1/shot.03.exr"),
+])
+def test_frame_path(pattern, frame, expected):
+    assert frame_path(pattern, frame) == expected
+
+
+def test_frame_path_without_token():
+    with pytest.raises(ValueError):
+        frame_path("/mnt/user@studio/shot.exr", 1)
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("shot.####.exr", "shot.%04d.exr"),
+    ("shot.$F2.exr", "shot.%02d.exr"),
+    ("shot.%d.exr", "shot.%01d.exr"),
+    ("/mnt/100%/shot.@@@.exr", "/mnt/100%%/shot.%03d.exr"),
+    ("my%20doc.####.png", "my%%20doc.%04d.png"),
+    ("shot.mov", "shot.mov"),
+])
+def test_frame_token_printf(pattern, expected):
+    assert frame_token_printf(pattern) == expected
+
+
+def test_sequence_regex():
+    regex = sequence_regex("/mnt/show.v1/shot.####.exr")
+
+    assert regex.match("shot.1001.exr").group(1) == "1001"
+    assert regex.match("shot.0001.exr").group(1) == "0001"
+    assert regex.match("shot.10000.exr").group(1) == "10000"
+    assert regex.match("shot.-0001.exr").group(1) == "-0001"
+    assert regex.match("shot.001.exr") is None
+    assert regex.match("shot.01001.exr") is None
+    assert regex.match("shotX1001.exr") is None
+    assert regex.match("shot.1001.exr.bak") is None
+
+
+def test_sequence_regex_without_token():
+    with pytest.raises(ValueError):
+        sequence_regex("shot.exr")
+
+
+def make_frames(directory, names):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (directory / name).write_bytes(b"")
+
+
+def test_directory_cache_frames(tmp_path):
+    make_frames(tmp_path, [
+        "shot.1001.exr", "shot.1003.exr", "shot.1002.exr",
+        "shot.1001.exr.tmp", "other.1001.exr", "shot.10000.exr",
+    ])
+    (tmp_path / "shot.0999.exr").mkdir()
+    cache = DirectoryCache()
+    pattern = str(tmp_path / "shot.####.exr")
+
+    assert cache.frames(pattern) == [1001, 1002, 1003, 10000]
+    assert cache.frames(pattern) is cache.frames(pattern)
+    assert "shot.0999.exr" not in cache.listdir(str(tmp_path))
+
+
+def test_directory_cache_evicts(tmp_path):
+    cache = DirectoryCache(max_entries=2)
+    for name in "abc":
+        make_frames(tmp_path / name, ["f.0001.png"])
+        assert cache.frames(str(tmp_path / name / "f.####.png")) == [1]
+
+    assert len(cache._entries) == 2
+
+
+def test_frame_range_and_first_frame(tmp_path):
+    make_frames(tmp_path, ["shot.1001.exr", "shot.1002.exr", "shot.1005.exr"])
+    pattern = str(tmp_path / "shot.####.exr")
+
+    assert frame_range(pattern) == (1001, 1005, 3)
+    assert first_frame(pattern) == str(tmp_path / "shot.1001.exr")
+    assert first_frame(str(tmp_path / "shot.mov")) == str(
+        tmp_path / "shot.mov"
+    )
+
+
+def test_frame_range_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        frame_range(str(tmp_path / "shot.####.exr"))
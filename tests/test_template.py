@@ -0,0 +1,173 @@
+import os
+import re
+
+import pytest
+
+from SlateCreator.template import (
+    compile_template,
+    field_root,
+    hidden_string,
+    split_field,
+)
+
+
+def compute_template(template, data, process_optionals=True):
+    # the formatting SlateCreator.compute_template did before
+    # templates were compiled, kept as the reference output
+    data = dict(data)
+    if process_optionals:
+        for m in re.findall(r"{(.*?)_optional}", template):
+            data["{}_optional".format(m)] = ""
+            if not data[m]:
+                data["{}_optional".format(m)] = hidden_string
+    return template.format_map(data)
+
+
+def write_template(tmp_path, text, name="slate.html"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+template_body = (
+    "<div {scope_optional}>{scope}</div>\n"
+    "<div {notes_optional}><p>{notes}</p></div>\n"
+    "<span>{project[name]} {frames[0]} {fps:.3f} {shot!r:>12}</span>\n"
+    "<style>.a {{ color: red; }}</style>\n"
+)
+
+datas = [
+    {
+        "scope": "comp", "notes": "", "project": {"name": "show"},
+        "frames": [1001, 1100], "fps": 24, "shot": "sh010",
+    },
+    {
+        "scope": "", "notes": "v002 fixes", "project": {"name": "other"},
+        "frames": [0], "fps": 23.976, "shot": "",
+    },
+    {
+        "scope": 0, "notes": [], "project": {"name": ""},
+        "frames": [-1], "fps": 29.97, "shot": None,
+    },
+]
+
+
+@pytest.mark.parametrize("data", datas)
+@pytest.mark.parametrize("process_optionals", [True, False])
+def test_render_matches_compute_template(tmp_path, data, process_optionals):
+    compiled = compile_template(write_template(tmp_path, template_body), "")
+    if not process_optionals:
+        data = dict(data, scope_optional="x", notes_optional="y")
+
+    assert compiled.render(data, process_optionals) == compute_template(
+        template_body, data, process_optionals
+    )
+
+
+def test_collected_fields(tmp_path):
+    compiled = compile_template(write_template(tmp_path, template_body), "")
+
+    assert compiled.fields == (
+        "scope_optional", "scope", "notes_optional", "notes",
+        "project", "frames", "fps", "shot",
+    )
+    assert compiled.optional_fields == ("scope", "notes")
+    assert compiled.resource_fields == ()
+
+
+def test_optional_without_base_key_uses_data(tmp_path):
+    text = "<div {extra_optional}></div>"
+    compiled = compile_template(write_template(tmp_path, text), "")
+
+    with pytest.raises(KeyError):
+        compiled.render({})
+    assert compiled.render({"extra": "x"}) == compute_template(
+        text, {"extra": "x"}
+    )
+
+
+def test_missing_key_raises(tmp_path):
+    compiled = compile_template(write_template(tmp_path, template_body), "")
+
+    with pytest.raises(KeyError):
+        compiled.render({"scope": "comp", "notes": ""})
+
+
+def test_nested_spec_is_formatted(tmp_path):
+    text = "<p>{name:>{width}}</p>"
+    compiled = compile_template(write_template(tmp_path, text), "")
+    data = {"name": "ab", "width": 5}
+
+    assert compiled.render(data) == compute_template(text, data)
+
+
+def test_positional_fields_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        compile_template(write_template(tmp_path, "<p>{}</p>"), "")
+    with pytest.raises(ValueError):
+        compile_template(write_template(tmp_path, "<p>{0}</p>"), "")
+
+
+def test_comments_are_stripped(tmp_path):
+    text = (
+        "<p>a</p><!-- {missing} <img src=\"x.png\"> -->\n"
+        "<!--\nmulti\nline {other}\n--><p>{b}</p>"
+    )
+    compiled = compile_template(write_template(tmp_path, text), "")
+
+    assert compiled.render({"b": 1}) == "<p>a</p>\n<p>1</p>"
+    assert compiled.fields == ("b",)
+    assert compiled.resources == ()
+
+
+def test_resource_paths_are_rewritten(tmp_path):
+    resources = str(tmp_path / "resources")
+    text = (
+        "<link href=\"css/style.css\">"
+        "<img src=\"../images/logo.png\">"
+        "<img src=\"{thumbnail}\">"
+        "<a href=\"#top\"></a>"
+        "<img src=\"https://example.com/a.png\">"
+    )
+    compiled = compile_template(write_template(tmp_path, text), resources)
+    css = os.path.normpath(os.path.join(resources, "style.css"))
+    logo = os.path.normpath(os.path.join(resources, "logo.png"))
+
+    assert compiled.resources == (css, logo)
+    assert compiled.fields == ("thumbnail",)
+    assert compiled.resource_fields == ("thumbnail",)
+    assert compiled.render({"thumbnail": "thumbs/t_0001.png"}) == (
+        "<link href=\"{}\">"
+        "<img src=\"{}\">"
+        "<img src=\"{}\">"
+        "<a href=\"#top\"></a>"
+        "<img src=\"https://example.com/a.png\">"
+    ).format(css, logo, os.path.join(resources, "t_0001.png"))
+
+
+def test_absolute_thumbnail_is_kept(tmp_path):
+    compiled = compile_template(
+        write_template(tmp_path, "<img src=\"{thumbnail_a}\">"), "/res"
+    )
+    path = str(tmp_path / "thumb.png")
+
+    assert compiled.render({"thumbnail_a": path}) == (
+        "<img src=\"{}\">".format(path)
+    )
+    assert compiled.render({"thumbnail_a": ""}) == "<img src=\"\">"
+
+
+@pytest.mark.parametrize("field, root, path", [
+    ("name", "name", []),
+    ("project[name]", "project", [(False, "name")]),
+    ("frames[0]", "frames", [(False, 0)]),
+    ("item.attr[key]", "item", [(True, "attr"), (False, "key")]),
+])
+def test_split_field(field, root, path):
+    assert split_field(field) == (root, path)
+    assert field_root(field + "!s:>10") == root
+
+
+def test_split_field_invalid():
+    with pytest.raises(ValueError):
+        split_field("project[name]x")
@@ -0,0 +1,87 @@
+import pytest
+
+from SlateCreator.sequence import directory_cache
+from SlateCreator.thumbnail import (
+    WidthCache,
+    sequence_frame_paths,
+    spread_frames,
+    thumbnail_command,
+)
+
+
+@pytest.fixture
+def sequence(tmp_path):
+    directory_cache.clear()
+    for frame in (1001, 1002, 1003, 1005, 1006):
+        (tmp_path / "shot.{:04d}.exr".format(frame)).write_bytes(b"")
+    yield str(tmp_path / "shot.####.exr")
+    directory_cache.clear()
+
+
+def inputs(cmd):
+    return [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-i"]
+
+
+def test_sequence_opens_only_chosen_frames(sequence, tmp_path):
+    cmd = thumbnail_command(sequence, "thumb_%02d.jpg", [2, 0], 320)
+
+    assert inputs(cmd) == [
+        str(tmp_path / "shot.1001.exr"),
+        str(tmp_path / "shot.1003.exr"),
+    ]
+    assert "image2" not in cmd
+    assert not any("select" in arg for arg in cmd)
+    assert cmd.count("-apply_trc") == 2
+    assert cmd[-1] == "thumb_02.jpg"
+    assert "thumb_01.jpg" in cmd
+
+
+def test_sequence_gap_takes_previous_frame(sequence, tmp_path):
+    assert sequence_frame_paths(sequence, [3, 5]) == [
+        str(tmp_path / "shot.1003.exr"),
+        str(tmp_path / "shot.1006.exr"),
+    ]
+
+
+def test_sequence_frame_out_of_range(sequence):
+    with pytest.raises(ValueError):
+        sequence_frame_paths(sequence, [6])
+    with pytest.raises(ValueError):
+        sequence_frame_paths(sequence, [-1])
+
+
+def test_movie_seeks_each_frame():
+    cmd = thumbnail_command("shot.mov", "t_%02d.png", [48, 0], 200, fps=24)
+
+    assert inputs(cmd) == ["shot.mov", "shot.mov"]
+    seeks = [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-ss"]
+    assert seeks == ["0.000000", "1.979167"]
+    assert cmd.count("-map") == 2
+
+
+def test_movie_without_fps_selects():
+    cmd = thumbnail_command("shot.mov", "t_%02d.png", [10, 2], 200)
+
+    assert inputs(cmd) == ["shot.mov"]
+    assert "select='eq(n\\,2)+eq(n\\,10)',scale=200:-2:flags=lanczos" in cmd
+
+
+@pytest.mark.parametrize("count, length, expected", [
+    (1, 100, [50]),
+    (3, 101, [0, 50, 100]),
+    (2, 1, [0, 0]),
+])
+def test_spread_frames(count, length, expected):
+    assert spread_frames(count, length) == expected
+
+
+def test_width_cache_is_lru():
+    cache = WidthCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert len(cache) == 2
@@ -0,0 +1,101 @@
+import pytest
+
+from SlateCreator.timecode import (
+    frame_range_to_timecodes,
+    frames_to_timecode,
+    frames_to_timecodes,
+    is_drop_frame_rate,
+    timecode_to_frames,
+    timecodes_to_frames,
+)
+
+
+@pytest.mark.parametrize("fps, frames, timecode", [
+    (24, 0, "00:00:00:00"),
+    (24, 86400, "01:00:00:00"),
+    (25, 90000 + 24, "01:00:00:24"),
+    (29.97, 1799, "00:00:59;29"),
+    (29.97, 1800, "00:01:00;02"),
+    (29.97, 17982, "00:10:00;00"),
+    (29.97, 107892, "01:00:00;00"),
+    (59.94, 3599, "00:00:59;59"),
+    (59.94, 3600, "00:01:00;04"),
+    (59.94, 35964, "00:10:00;00"),
+    (59.94, 215784, "01:00:00;00"),
+])
+def test_known_timecodes(fps, frames, timecode):
+    assert frames_to_timecode(frames, fps) == timecode
+    assert timecode_to_frames(timecode, fps) == frames
+
+
+@pytest.mark.parametrize("fps", [29.97, 30000 / 1001, 59.94, 60000 / 1001])
+def test_drop_frame_round_trip(fps):
+    frames = list(range(0, 40000, 7)) + list(range(107880, 107900))
+    timecodes = frames_to_timecodes(frames, fps)
+
+    assert timecodes_to_frames(timecodes, fps) == frames
+    assert all(";" in tc for tc in timecodes)
+
+
+@pytest.mark.parametrize("fps", [29.97, 59.94])
+def test_drop_frame_skips_labels(fps):
+    drop = 2 if fps < 30 else 4
+    labels = set(
+        tc[3:]
+        for tc in frames_to_timecodes(range(0, 20 * 60 * 60), fps)
+    )
+
+    for minute in range(20):
+        for ff in range(drop):
+            label = "{:02d}:00;{:02d}".format(minute, ff)
+            assert (label in labels) == (minute % 10 == 0)
+
+
+@pytest.mark.parametrize("fps, start", [
+    (24, 86390),
+    (25, 0),
+    (29.97, 1780),
+    (29.97, 17970),
+    (59.94, 3590),
+])
+def test_frame_range_matches_single_conversions(fps, start):
+    timecodes = frame_range_to_timecodes(start, start + 250, fps)
+
+    assert timecodes == frames_to_timecodes(range(start, start + 251), fps)
+
+
+def test_frame_range_offset_and_empty():
+    assert frame_range_to_timecodes(1001, 1002, 24, offset=86400 - 1001) == [
+        "01:00:00:00", "01:00:00:01"
+    ]
+    assert frame_range_to_timecodes(10, 9, 24) == []
+
+
+def test_rolls_over_after_24_hours():
+    assert frames_to_timecode(24 * 3600 * 24, 24) == "00:00:00:00"
+    assert frames_to_timecode(2589408, 29.97) == "00:00:00;00"
+
+
+def test_drop_frame_rates():
+    assert is_drop_frame_rate(29.97)
+    assert is_drop_frame_rate(60000 / 1001)
+    assert not is_drop_frame_rate(30)
+    assert not is_drop_frame_rate(23.976)
+
+
+@pytest.mark.parametrize("timecode, fps", [
+    ("01:00:00;00", 24),
+    ("01:00:00:24", 24),
+    ("1:00:00", 24),
+    ("aa:00:00:00", 24),
+])
+def test_invalid_timecodes(timecode, fps):
+    with pytest.raises(ValueError):
+        timecode_to_frames(timecode, fps)
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        frames_to_timecode(-1, 24)
+    with pytest.raises(ValueError):
+        frames_to_timecode(0, 0)